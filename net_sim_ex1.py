@@ -8,26 +8,38 @@ Created on Mon Mar  9 10:05:26 2020
 from collections import defaultdict
 import os
 import sys
-import random
-sys.path.append(os.getcwd()+'\\v0_5')
+import time
+import argparse
+from functools import partial
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_FILES = (os.path.join(HERE, 'data', '1minIntSolrad-07-2006.csv'),
+              os.path.join(HERE, 'data', '1MinIntSumProfiles-Apparent-2workingpeople.csv'))
+sys.path.append(os.path.join(HERE, 'v0_5'))
 
-import pandapower as pp
-from pandapower import timeseries as ts
-from pandapower import control
 import pandas as pd
 import numpy as np
-import time
 
-from v0_5.Prosumer import Prosumer
 from v0_5.centralcpu import CPU
-from Storage import BatterySimple, BatterySimple
-from PVgen import PVgen
+from v0_5.pflow import LazyPowerFlow, PowerFlowCache, runpp
+from v0_5.feeders import FeederPowerFlow
+from PVgen import SharedPV
+from v0_5.recorder import TimeAxis
+from results import NeighborhoodResults
+from v0_5.pipeline import run_pipeline
+from v0_5.analytics import violation_report, curtailed_energy
+from v0_5.profiles import ProfileGenerator
+from v0_5.netgen import radial_net, populate_neighborhood
+from v0_5.scenarios import ScenarioCache, scenario_key, code_version
+from v0_5.output import ResultWriter
+from v0_5.kpi import GridKPI, neighborhood_kpis
+from v0_5.forks import Snapshot, run_branches, compare_branches
 from utils.function_repo import parse_hours, timegrid
 
 # ============================================================================
 # Create NETWORK
 
 def simple_net():
+    import pandapower as pp
     net = pp.create_empty_network()
     # Create buses
     pp.create_bus(net, name='Bus ext grid', vn_kv=10., type='b')
@@ -65,7 +77,7 @@ def simple_net():
 
 def import_data():
     irr = pd.read_csv(
-                      filepath_or_buffer = 'data/1minIntSolrad-07-2006.csv',
+                      filepath_or_buffer = DATA_FILES[0],
                       sep                = ';',
                       skiprows           = 25,
                       parse_dates        = [[0,1]],
@@ -73,7 +85,7 @@ def import_data():
                       )
     # Import load_profile test data
     load_data = pd.read_csv(
-                            filepath_or_buffer = 'data/1MinIntSumProfiles-Apparent-2workingpeople.csv',
+                            filepath_or_buffer = DATA_FILES[1],
                             sep                = ';',
                             usecols            = [1,2],
                             parse_dates        = [1],
@@ -91,92 +103,482 @@ def import_data():
 
     return irrad_data, load_demand
 
-def neighborhood(net):
-
-    _, load_demand = import_data()
-    neighborhood = {}
-    for b in net.bus.index[1:]:
-
-        # Randomly generate a variation of a prosumer pv peak within +/- 30 %
-        ft = random.randint(1,30)/100
-        ld = load_demand*(1-ft)
-        # Install a PV power around the magnitude of the peak demand of Prosumer X
-        pk = np.max(ld)
-        # stantiate a Prosumer X
-        pvgen   = PVgen(installed_pv = pk*0.7)
-        battery = BatterySimple(battery_capacity = 3.5,
-                                initial_SOC = 60,
-                                min_max_SOC = (20,80))
-        p = Prosumer(pvgen = pvgen, battery=battery)
-        # Store Prosumer X in Neighborhood dictionary
-        neighborhood['%s' % net.bus.name[b]] = p
-
-    return neighborhood
+def neighborhood(net, profiles):
+    """
+    Creates one Prosumer per load of net. profiles is the (time x
+    prosumer) array of household load profiles in kW, one column per
+    Prosumer
+    """
+    # Install a PV power around the magnitude of the peak demand of every Prosumer
+    return populate_neighborhood(net, profiles,
+                                 pv_ratio           = 0.7,
+                                 battery_capacity   = 3.5,
+                                 initial_SOC        = 60,
+                                 min_max_SOC        = (20,80))
 
 # Initialize results storage
-def create_output_writer(net, time_steps, output_dir):
-    ow = ts.OutputWriter(net, time_steps, output_path=output_dir,
-                         output_file_type=".xls", log_variables=list())
-    # these variables are saved to the harddisk after / during the time series loop
-    ow.log_variable('res_ext_grid', 'p_mw')
-    # ow.log_variable('res_load', 'p_mw')
-    ow.log_variable('res_bus', 'vm_pu')
-    ow.log_variable('res_line', 'loading_percent')
-    # ow.log_variable('res_line', 'i_ka')
+PROSUMER_OUTPUT = ('p_grid_flow', 'p_battery_flow', 'p_pv', 'battery_SOC')
+
+def create_output_writer(net, neighborhood, output_path, fmt='parquet', chunk_size=1440):
+    """
+    Returns a ResultWriter that streams bus voltages, line loadings, slack
+    power and prosumer flows to output_path in chunks of chunk_size
+    timesteps while the simulation runs
+    """
+    ow = ResultWriter(output_path, chunk_size=chunk_size, fmt=fmt)
+    ow.add_table('slack_p', net.ext_grid.index)
+    ow.add_table('vm_pu', net.bus.index)
+    ow.add_table('th_overload', net.line.index)
+    for key in PROSUMER_OUTPUT:
+        ow.add_table(key, neighborhood.keys())
     return ow
 
 # ============================================================================
 # RUN example
-# Load data
-irr, load = import_data()
-# Extract timestep size
-timestep = timegrid(load)
-# create network
-net = simple_net()
-# create neighborhood
-nh = neighborhood(net)
-# create central CPU that monitors and commands prosumers
-cpu = CPU()
-
-now=time.time()
-t           = []
-th_overload = pd.DataFrame()
-vm_pu       = pd.DataFrame()
-slack_p     = pd.DataFrame()
-# Run stepwise simulation extracting load and irradiation
-for i, (ir, ld) in enumerate(zip(irr[:1230], load[:1230]*10)):
-    # Instantiate a controller unit for each Prosumer's load
-    for j, (key, val) in enumerate(nh.items()):
-        d = pd.DataFrame(index=[0])
-        # Randomly generate a variation of a prosumer load within +/- 30 %
-        ld = ld*(1-random.randint(1,30)/1000)
-        val.run_pflow(ir, ld, timestep, timestamp=irr[:1440].index[i])
-        net.load.at[j, "p_mw"] = -val.recorder.meta['p_grid_flow'][-1]/1000
-        # d[key] = -val.recorder.meta['p_grid_flow'][-1]/1000
-        # ds = ts.DFData(d)
-        # control.ConstControl(net, element='load',
-        #                       element_index=[j],
-        #                       variable='p_mw',  data_source=ds,
-        #                       profile_name=[key])
-        # print("net_load",net.load.loc[j,"p_mw"], "pros_SOC", val.recorder.meta['battery_SOC'][-1])
-    # Run power flow calculation at every timestep iteration
-    # ow = create_output_writer(net,[], "E:/Temp")
-    # ts.run_timeseries(net, verbose=False)
-    pp.runpp(net)
-    cpu.control_prosumers(net, nh, bypass_control=False)
-    # Store line overload, voltage at buses and slack power balance
-    # res['Time'].append(irr.index[i])
-    # res['load'].append(net.load.p_mw.tolist())
-    # res['th_overload'].append(net.res_line.loading_percent.tolist())
-    # res['vm_pu_bus'].append(net.res_bus.vm_pu.tolist())
-    # res['slack_p'].append(net.res_ext_grid.p_mw.tolist())
-    # print('Time since beginning of simulation: ', time.time() - now)
-    t.append(irr.index[i])
-    th_overload = th_overload.append(net.res_line.loading_percent.transpose(), ignore_index=True)
-    vm_pu = vm_pu.append(net.res_bus.vm_pu.transpose(), ignore_index=True)
-    slack_p = slack_p.append(net.res_ext_grid.p_mw, ignore_index=True)
-    # print('Time since beginning of simulation: ', time.time() - now)
-th_overload.index = t
-vm_pu.index = t
-slack_p.index = t
-# results = pd.DataFrame(res)
\ No newline at end of file
+
+def build_simulation(
+                     net,
+                     irr,
+                     profiles,
+                     timestep,
+                     n_steps,
+                     use_sensitivities  = False,
+                     pf_tol             = None,
+                     pf_cache_res       = None,
+                     feeder_workers     = None,
+                     ):
+    """
+    Creates the neighborhood, CPU and power flow helpers of a run of
+    n_steps timesteps on net. Returns the simulation state as a dictionary
+    """
+    # create neighborhood
+    nh = neighborhood(net, profiles)
+    # create central CPU that monitors and commands prosumers
+    cpu = CPU(use_sensitivities=use_sensitivities)
+    # every recorder of the run is indexed by a single shared time axis
+    time_axis = TimeAxis.from_index(irr.index[:n_steps])
+    for p in nh.values():
+        p.set_time_axis(time_axis)
+    cpu.set_time_axis(time_axis)
+    solve = runpp
+    pflow, pf_cache, feeder_pf = None, None, None
+    if feeder_workers:
+        feeder_pf = FeederPowerFlow(n_workers=feeder_workers)
+        solve = feeder_pf.run
+    if pf_tol:
+        pflow = LazyPowerFlow(tol=pf_tol)
+        pflow.recorder.set_time_axis(time_axis)
+        solve = pflow.run
+    if pf_cache_res:
+        pf_cache = PowerFlowCache(resolution=pf_cache_res, solver=solve)
+        solve = pf_cache.run
+
+    # PV yield is computed once for the whole neighborhood and irradiance series
+    shared_pv = SharedPV([p.pvgen for p in nh.values()], n_steps)
+    shared_pv.compute(irr[:n_steps], timestep)
+
+    return {
+            'net'           : net,
+            'neighborhood'  : nh,
+            'cpu'           : cpu,
+            'time_axis'     : time_axis,
+            'shared_pv'     : shared_pv,
+            'solve'         : solve,
+            'pflow'         : pflow,
+            'pf_cache'      : pf_cache,
+            'feeder_pf'     : feeder_pf,
+            'n'             : 0,    # simulated timesteps
+            'grid_kpi'      : GridKPI(),
+            'grid'          : {
+                               'th_overload': np.empty((n_steps, len(net.line))),
+                               'vm_pu'      : np.empty((n_steps, len(net.bus))),
+                               'slack_p'    : np.empty((n_steps, len(net.ext_grid))),
+                               },
+            }
+
+def household_profiles(load, n, seed):
+    """
+    Returns n distinct household load profiles, one column per prosumer,
+    generated from the base profile with a seeded random generator
+    """
+    return ProfileGenerator(load, seed=seed).generate(n)
+
+def extend_simulation(sim, irr, timestep, n_steps):
+    """
+    Extends the horizon of a simulation state to n_steps timesteps
+    """
+    n_old = len(sim['time_axis'])
+    sim['time_axis'].extend(irr.index[n_old:n_steps])
+    sim['shared_pv'].resize(n_steps)
+    sim['shared_pv'].compute(irr[:n_steps], timestep)
+    for k, arr in sim['grid'].items():
+        grown           = np.empty((n_steps, arr.shape[1]))
+        grown[:len(arr)] = arr
+        sim['grid'][k]  = grown
+
+def advance(sim, irr, load_matrix, timestep, stop, bypass_control=False, writer=None):
+    """
+    Runs the stepwise co-simulation of a simulation state from its last
+    simulated timestep up to stop. Results of every timestep are streamed
+    to writer, if given
+    """
+    net, nh, cpu, grid = sim['net'], sim['neighborhood'], sim['cpu'], sim['grid']
+    # Run stepwise simulation extracting load and irradiation
+    for i in range(sim['n'], stop):
+        ir, loads = irr.iloc[i], load_matrix[i]
+        for j, p in enumerate(nh.values()):
+            p.run_pflow(ir, loads[j], timestep, timestamp=irr.index[i])
+            net.load.at[j, "p_mw"] = -p.recorder.meta['p_grid_flow'][-1]/1000
+        # Run power flow calculation at every timestep iteration
+        sim['solve'](net)
+        cpu.control_prosumers(net, nh, bypass_control=bypass_control)
+        # Store line overload, voltage at buses and slack power balance
+        grid['th_overload'][i]  = net.res_line.loading_percent.values
+        grid['vm_pu'][i]        = net.res_bus.vm_pu.values
+        grid['slack_p'][i]      = net.res_ext_grid.p_mw.values
+        sim['grid_kpi'].update(grid['vm_pu'][i], grid['th_overload'][i],
+                               grid['slack_p'][i], timestep/3600)
+        if writer is not None:
+            for key in grid:
+                writer.record(key, irr.index[i], grid[key][i])
+            for key in PROSUMER_OUTPUT:
+                writer.record(key, irr.index[i], [p.recorder.meta[key][-1] for p in nh.values()])
+        sim['n'] = i + 1
+
+def run_simulation(
+                   n_steps              = 1230,
+                   seed                 = 42,
+                   use_sensitivities    = False,
+                   pf_tol               = None,
+                   pf_cache_res         = None,
+                   bypass_control       = False,
+                   two_phase            = False,
+                   n_workers            = None,
+                   cache                = None,
+                   net_params           = None,
+                   feeder_workers       = None,
+                   output               = None,
+                   output_format        = 'parquet',
+                   ):
+    """
+    Runs the co-simulation of the example neighborhood and grid
+
+    Parameters
+    ----------
+    n_steps : int, default 1230
+        number of simulated timesteps
+
+    seed : int, default 42
+        seed of the household load profile generator
+
+    use_sensitivities : bool, default False
+        if True, the CPU only switches the prosumers needed to clear a risk.
+        Not available with pf_tol or pf_cache_res
+
+    pf_tol : float, default None
+        re-solve the power flow only when load injections move more than
+        pf_tol MW since the last solve. None solves it at every timestep
+
+    pf_cache_res : float, default None
+        serve repeated operating points from a cache of power flow results
+        keyed by load injections quantized to pf_cache_res MW. None
+        disables the cache
+
+    bypass_control : bool, default False
+        uncontrolled run, grid results are not fed back to the prosumers
+
+    two_phase : bool, default False
+        with bypass_control, all prosumers are simulated over the horizon
+        first and the power flows are then solved in parallel time chunks
+
+    n_workers : int, default None
+        number of worker processes of the two-phase power flows
+
+    cache : ScenarioCache, default None
+        if given, a run of the same scenario and horizon is served from the
+        cache, and a stepwise run resumes from the longest cached prefix of
+        its horizon. Completed runs are stored in the cache
+
+    net_params : dict, default None
+        keyword arguments of v0_5.netgen.radial_net to run on a synthetic
+        radial network instead of simple_net
+
+    feeder_workers : int, default None
+        solve the feeders of the net in this many parallel worker processes
+        at every timestep of a stepwise run. None solves the whole net at
+        once. The first timestep times both ways and the whole net is
+        still solved at once if that is faster. Not available with
+        use_sensitivities or pf_tol, which need the Jacobian of the whole
+        net
+
+    output : str, default None
+        directory (parquet) or file (hdf5) the results of the run are
+        streamed to. Timesteps served from the cache are not written
+
+    output_format : str, default 'parquet'
+        'parquet' (needs pyarrow) or 'hdf5' (needs tables)
+
+    Returns
+    -------
+    dict
+        simulation state (net, neighborhood, cpu, power flow helpers), grid
+        result DataFrames (th_overload, vm_pu, slack_p) and the results cube
+    """
+    two_phase   = bypass_control and two_phase
+    key         = None
+    if feeder_workers and (use_sensitivities or pf_tol):
+        raise AttributeError('Feeder-partitioned power flow does not provide ' +
+                             'the Jacobian of the whole net needed by ' +
+                             'use_sensitivities and pf_tol')
+    if use_sensitivities and (pf_tol or pf_cache_res):
+        raise AttributeError('use_sensitivities needs the Jacobian of a power ' +
+                             'flow solved at every timestep, which pf_tol and ' +
+                             'pf_cache_res skip')
+    if cache is not None:
+        key = scenario_key(
+                           params = {
+                                     'seed'             : seed,
+                                     'use_sensitivities': use_sensitivities,
+                                     'pf_tol'           : pf_tol,
+                                     'pf_cache_res'     : pf_cache_res,
+                                     'bypass_control'   : bypass_control,
+                                     'two_phase'        : two_phase,
+                                     'net'              : net_params,
+                                     'feeder_workers'   : feeder_workers,
+                                     'cpu'              : {k: getattr(CPU, k) for k in
+                                                           ('vm_max', 'vm_min', 'loading_max',
+                                                            'slack_p_max', 'stats_window',
+                                                            'persistence', 'behaviors')},
+                                     },
+                           files  = DATA_FILES,
+                           code   = code_version(__file__, os.path.join(HERE, 'v0_5'),
+                                                 os.path.join(HERE, 'utils')),
+                           )
+        n_cached = cache.longest_prefix(key, n_steps)
+        if n_cached == n_steps:
+            return cache.get(key, n_steps)
+
+    # Load data
+    irr, load   = import_data()
+    # Extract timestep size
+    timestep    = timegrid(load)
+    sim         = None
+    if cache is not None and n_cached and not two_phase:
+        sim = cache.get(key, n_cached)
+        extend_simulation(sim, irr, timestep, n_steps)
+    if sim is not None:
+        net     = sim['net']
+    else:
+        net     = radial_net(**net_params) if net_params else simple_net()
+    profiles    = household_profiles(load, len(net.load), seed)
+    load_matrix = profiles*10
+    if sim is None:
+        sim = build_simulation(net, irr, profiles, timestep, n_steps,
+                               use_sensitivities=use_sensitivities,
+                               pf_tol=pf_tol, pf_cache_res=pf_cache_res,
+                               feeder_workers=feeder_workers)
+
+    writer = None
+    if output:
+        writer = create_output_writer(net, sim['neighborhood'], output, fmt=output_format)
+
+    if two_phase:
+        th_overload, vm_pu, slack_p = run_pipeline(net, sim['neighborhood'], irr[:n_steps],
+                                                   load_matrix[:n_steps], timestep,
+                                                   time_axis=sim['time_axis'],
+                                                   n_workers=n_workers)
+        sim['grid'] = {
+                       'th_overload': th_overload.values,
+                       'vm_pu'      : vm_pu.values,
+                       'slack_p'    : slack_p.values,
+                       }
+        sim['n'] = n_steps
+        sim['grid_kpi'].update(sim['grid']['vm_pu'], sim['grid']['th_overload'],
+                               sim['grid']['slack_p'], timestep/3600)
+        if writer is not None:
+            index = sim['time_axis'].index(n_steps)
+            for key, arr in sim['grid'].items():
+                writer.append(key, index, arr)
+            for key in PROSUMER_OUTPUT:
+                writer.append(key, index, np.column_stack([p.recorder.meta[key][-n_steps:]
+                                                           for p in sim['neighborhood'].values()]))
+    else:
+        try:
+            advance(sim, irr, load_matrix, timestep, n_steps,
+                    bypass_control=bypass_control, writer=writer)
+        finally:
+            if sim['feeder_pf'] is not None:
+                sim['feeder_pf'].close()
+    if writer is not None:
+        writer.close()
+
+    collect_results(sim)
+    if cache is not None:
+        cache.put(key, n_steps, sim)
+    return sim
+
+def collect_results(sim):
+    """
+    Adds the grid result DataFrames (th_overload, vm_pu, slack_p) and the
+    results cube of the simulated timesteps to a simulation state
+    """
+    net, n = sim['net'], sim['n']
+    index = sim['time_axis'].index(n)
+    sim['th_overload']  = pd.DataFrame(sim['grid']['th_overload'][:n], index=index, columns=net.line.index)
+    sim['vm_pu']        = pd.DataFrame(sim['grid']['vm_pu'][:n], index=index, columns=net.bus.index)
+    sim['slack_p']      = pd.DataFrame(sim['grid']['slack_p'][:n], index=index, columns=net.ext_grid.index)
+    # all prosumer, PV and battery results as a (time x prosumer x variable) cube
+    sim['results']      = NeighborhoodResults.from_neighborhood(sim['neighborhood'])
+
+def continue_branch(sim, irr, load_matrix, timestep, n_steps, bypass_control=False):
+    """
+    Continues a forked simulation state up to n_steps timesteps and
+    returns its grid results, KPIs and CPU recorder
+    """
+    extend_simulation(sim, irr, timestep, n_steps)
+    try:
+        advance(sim, irr, load_matrix, timestep, n_steps, bypass_control=bypass_control)
+    finally:
+        if sim['feeder_pf'] is not None:
+            sim['feeder_pf'].close()
+    collect_results(sim)
+    return {
+            'th_overload'   : sim['th_overload'],
+            'vm_pu'         : sim['vm_pu'],
+            'slack_p'       : sim['slack_p'],
+            'grid_kpi'      : sim['grid_kpi'].get_kpis(),
+            'prosumer_kpis' : neighborhood_kpis(sim['neighborhood']),
+            'cpu'           : sim['cpu'].get_cpu_data(),
+            }
+
+def run_policies(policies, fork_at, n_steps=1230, seed=42, n_workers=None,
+                 bypass_control=False, **kwargs):
+    """
+    Compares CPU policies from a common history. The run is simulated once
+    up to fork_at timesteps, a Snapshot of its state is taken and one fork
+    per policy continues it up to n_steps in parallel worker processes
+
+    Parameters
+    ----------
+    policies : dict
+        policy name: keyword arguments of CPU.set_policy, e.g.
+        {'tight': {'vm_max': 1.02}, 'loose': {'loading_max': 90}}
+
+    fork_at : int
+        number of timesteps of the shared history
+
+    n_workers : int, default None
+        number of worker processes running the branches
+
+    **kwargs
+        further arguments of run_simulation for the shared history
+
+    Returns
+    -------
+    tuple
+        (dict of policy name: branch results, DataFrame of the grid KPIs
+        of every policy side by side)
+    """
+    sim         = run_simulation(n_steps=fork_at, seed=seed,
+                                 bypass_control=bypass_control, **kwargs)
+    irr, load   = import_data()
+    timestep    = timegrid(load)
+    load_matrix = household_profiles(load, len(sim['net'].load), seed)*10
+    step        = partial(continue_branch, irr=irr, load_matrix=load_matrix,
+                          timestep=timestep, n_steps=n_steps, bypass_control=bypass_control)
+    branches    = run_branches(Snapshot(sim), policies, step, n_workers=n_workers)
+    return branches, compare_branches(branches)
+
+def report(sim):
+    """
+    Prints power flow statistics and the violation analysis of a run
+    """
+    cpu, net = sim['cpu'], sim['net']
+    if sim['pflow'] is not None:
+        print('Power flow skip rate: %.3f, largest voltage error of a reuse: %.2e pu'
+              % (sim['pflow'].skip_rate(), sim['pflow'].max_error()))
+    if sim['pf_cache'] is not None:
+        print('Power flow cache: ', sim['pf_cache'].get_stats())
+    if sim.get('feeder_pf') is not None:
+        print('Feeder power flow: ', sim['feeder_pf'].get_stats())
+    if cpu.stats is not None:
+        # timesteps each bus spent above vm_max / below vm_min during the run
+        print(cpu.get_grid_stats('vm_pu')[['rolling_max', 'above_total', 'below_total']])
+    # over/undervoltage and overload events of every bus and line of the run
+    events, violations, slack_energy = violation_report(sim['vm_pu'], sim['th_overload'],
+                                                       sim['slack_p'],
+                                                       vm_max=cpu.vm_max, vm_min=cpu.vm_min,
+                                                       loading_max=cpu.loading_max,
+                                                       p_max=net.trafo.sn_mva.sum())
+    print(violations)
+    print(slack_energy)
+    print('Curtailed pv energy [kWh]: %.3f' % curtailed_energy(sim['results']).sum())
+    print(neighborhood_kpis(sim['neighborhood']))
+    print('Grid: ', sim['grid_kpi'].get_kpis())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Neighborhood and LV grid co-simulation')
+    parser.add_argument('--steps', type=int, default=1230, help='number of simulated timesteps')
+    parser.add_argument('--seed', type=int, default=42, help='seed of the load profiles')
+    parser.add_argument('--sensitivities', action='store_true',
+                        help='switch only the prosumers needed to clear a risk')
+    parser.add_argument('--pf-tol', type=float, default=None,
+                        help='injection change in MW that triggers a new power flow')
+    parser.add_argument('--pf-cache', type=float, default=None,
+                        help='resolution in MW of the power flow result cache')
+    parser.add_argument('--bypass-control', action='store_true', help='uncontrolled run')
+    parser.add_argument('--two-phase', action='store_true',
+                        help='decoupled pipeline for uncontrolled runs')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes of the two-phase power flows')
+    parser.add_argument('--cache-dir', default=None,
+                        help='directory of the scenario result cache')
+    parser.add_argument('--feeders', type=int, default=None,
+                        help='run on a synthetic radial network with this many feeders')
+    parser.add_argument('--feeder-depth', type=int, default=10,
+                        help='buses along each feeder of the synthetic network')
+    parser.add_argument('--branches', type=int, default=1,
+                        help='side branches per feeder bus of the synthetic network')
+    parser.add_argument('--branch-depth', type=int, default=3,
+                        help='buses along each side branch of the synthetic network')
+    parser.add_argument('--per-bus', type=int, default=1,
+                        help='households per bus of the synthetic network')
+    parser.add_argument('--feeder-workers', type=int, default=None,
+                        help='worker processes of the feeder-partitioned power flow')
+    parser.add_argument('--output', default=None,
+                        help='directory (parquet) or file (hdf5) results are streamed to')
+    parser.add_argument('--output-format', default='parquet', choices=('parquet', 'hdf5'),
+                        help='format of the streamed results')
+    args = parser.parse_args(argv)
+    net_params = None
+    if args.feeders:
+        net_params = {
+                      'n_feeders'           : args.feeders,
+                      'feeder_depth'        : args.feeder_depth,
+                      'branches'            : args.branches,
+                      'branch_depth'        : args.branch_depth,
+                      'prosumers_per_bus'   : args.per_bus,
+                      }
+
+    now = time.time()
+    sim = run_simulation(
+                         n_steps            = args.steps,
+                         seed               = args.seed,
+                         use_sensitivities  = args.sensitivities,
+                         pf_tol             = args.pf_tol,
+                         pf_cache_res       = args.pf_cache,
+                         bypass_control     = args.bypass_control,
+                         two_phase          = args.two_phase,
+                         n_workers          = args.workers,
+                         cache              = ScenarioCache(args.cache_dir) if args.cache_dir else None,
+                         net_params         = net_params,
+                         feeder_workers     = args.feeder_workers,
+                         output             = args.output,
+                         output_format      = args.output_format,
+                         )
+    print('Simulation time: %.2f s' % (time.time() - now))
+    report(sim)
+    return sim
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+for path in (ROOT, os.path.join(ROOT, 'v0_5')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
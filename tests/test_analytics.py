@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from v0_5.analytics import (run_length_events, violation_report, slack_energy,
+                            curtailed_energy, timestep_hours)
+from v0_5.results import NeighborhoodResults
+
+def frame(values, freq='15min'):
+    values  = np.asarray(values, dtype=float)
+    index   = pd.date_range('2006-07-01', periods=len(values), freq=freq)
+    return pd.DataFrame(values, index=index, columns=['x%s' % j for j in range(values.shape[1])])
+
+def test_runs_touching_both_ends():
+    vm      = frame([[1.05, 1.00],
+                     [1.04, 1.00],
+                     [1.00, 1.03],
+                     [1.06, 1.00],
+                     [1.04, 1.04]])
+    ev      = run_length_events(vm, upper=1.03)
+    assert list(ev.element) == ['x0', 'x0', 'x1', 'x1']
+    np.testing.assert_array_equal(ev.n_steps, [2, 2, 1, 1])
+    assert ev.start.iloc[0] == vm.index[0] and ev.end.iloc[1] == vm.index[-1]
+    # a run at the end of x0 is followed by a run of x1 at the start of
+    # the flattened matrix: the extrema of each stay separate
+    np.testing.assert_allclose(ev.max_excess, [0.02, 0.03, 0., 0.01], atol=1e-12)
+    np.testing.assert_allclose(ev.excess_h, [0.03*0.25, 0.04*0.25, 0., 0.01*0.25], atol=1e-12)
+    np.testing.assert_allclose(ev.duration_h, ev.n_steps * 0.25)
+
+def test_lower_limit():
+    vm      = frame([[0.96], [0.97], [0.98], [0.95]])
+    ev      = run_length_events(vm, lower=0.97, kind='undervoltage')
+    np.testing.assert_array_equal(ev.n_steps, [2, 1])
+    np.testing.assert_allclose(ev.max_excess, [0.01, 0.02], atol=1e-12)
+    assert (ev.kind == 'undervoltage').all()
+
+@pytest.mark.parametrize('shape', [(0, 2), (3, 0), (0, 0)])
+def test_empty(shape):
+    ev      = run_length_events(frame(np.zeros(shape)), upper=1.)
+    assert len(ev) == 0
+    events, summary, energy = violation_report(frame(np.ones(shape)), frame(np.zeros(shape)),
+                                               slack_p=frame(np.zeros((shape[0], 1))))
+    assert len(events) == 0 and len(summary) == 0
+    assert energy.sum() == 0
+
+def test_no_events():
+    assert len(run_length_events(frame([[1.], [1.]]), upper=1.03)) == 0
+
+def test_slack_energy():
+    slack   = frame([[0.2, 0.1], [-0.1, -0.3], [0.5, 0.], [0., 0.]], freq='30min')
+    e       = slack_energy(slack, p_max=0.25)
+    assert e.e_import == pytest.approx((0.3 + 0.5) * 0.5)
+    assert e.e_export == pytest.approx(0.4 * 0.5)
+    assert e.e_import_over_limit == pytest.approx((0.05 + 0.25) * 0.5)
+    assert e.e_export_over_limit == pytest.approx(0.15 * 0.5)
+
+def test_curtailed_energy():
+    index   = pd.date_range('2006-07-01', periods=4, freq='min')
+    data    = np.zeros((4, 2, 1))
+    data[:, :, 0] = [[1., 0.], [2., 0.], [0., 0.], [3., 6.]]
+    res     = NeighborhoodResults(data, index, ['a', 'b'], ['p_curtail'])
+    np.testing.assert_allclose(curtailed_energy(res), [6/60, 6/60])
+
+def test_timestep_hours():
+    assert timestep_hours(pd.date_range('2006-07-01', periods=3, freq='15min')) == 0.25
+    assert timestep_hours(pd.RangeIndex(3)) == 1.
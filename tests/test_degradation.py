@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from v0_5.degradation import Rainflow
+
+# ASTM E1049-85 (2017), rainflow counting example: load history in units
+# and counted cycles per range, half cycles of the residue included
+ASTM_HISTORY = [-2, 1, -3, 5, -1, 3, -4, 4, -2]
+ASTM_CYCLES = {3: 0.5, 4: 1.5, 6: 0.5, 8: 1.0, 9: 0.5}
+
+def count(history, bins=100, **kwargs):
+    rf = Rainflow(bins=bins, **kwargs)
+    for x in history:
+        rf.update(50 + x)       # shifted into the SOC range
+    return rf
+
+def cycles(rf, residue=True):
+    h = rf.get_histogram(residue)
+    return {int(i.left): c for i, c in h[h > 0].items()}
+
+def test_astm_example():
+    rf = count(ASTM_HISTORY)
+    assert cycles(rf) == ASTM_CYCLES
+    # closed while streaming: the full cycle of 4 and the half cycles
+    # through the starting point of 3, 4 and 8
+    assert cycles(rf, residue=False) == {3: 0.5, 4: 1.5, 8: 0.5}
+    # the residue 5, -4, 4, -2 holds the half cycles of 9, 8 and 6
+    assert np.diff(rf.stack).tolist() == [-9, 8, -6]
+
+def test_intermediate_samples_and_repeats():
+    # samples along a ramp and repeated samples do not change the count
+    dense = []
+    for a, b in zip(ASTM_HISTORY[:-1], ASTM_HISTORY[1:]):
+        dense.extend(np.linspace(a, b, 5)[:-1])
+        dense.append(b)
+    dense.append(ASTM_HISTORY[-1])
+    assert cycles(count(dense)) == ASTM_CYCLES
+
+def test_damage():
+    rf      = count(ASTM_HISTORY, cycle_life=1000, exponent=2)
+    expect  = sum(c * (d/100)**2 / 1000 for d, c in ASTM_CYCLES.items())
+    assert rf.get_damage() == pytest.approx(expect)
+    assert rf.get_damage(residue=False) == pytest.approx(expect - 0.5*(0.09**2 + 0.08**2 + 0.06**2)/1000)
+    assert rf.get_soh() == pytest.approx(100 - 20*expect)
+
+def test_full_cycles():
+    # a repeated 20-80 % cycle: one full cycle per period, one half cycle open
+    rf      = count([-30, 30] * 10)
+    assert cycles(rf) == {60: 9.5}
+    assert cycles(rf, residue=False) == {60: 9.}
+
+def test_converging_residue_grows():
+    history = [x for k in range(20) for x in (-40 + k, 40 - k)]
+    rf      = count(history)
+    assert len(rf.stack) == len(history)
+    assert sum(cycles(rf, residue=False).values()) == 0
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import copy
+import numpy as np
+import pytest
+
+pytest.importorskip('pandapower')
+from v0_5.netgen import radial_net
+from v0_5.pflow import runpp
+from v0_5.feeders import FeederPowerFlow
+
+def _check(part, net, tol):
+    np.testing.assert_allclose(part.res_bus.vm_pu, net.res_bus.vm_pu, atol=10*tol)
+    np.testing.assert_allclose(part.res_line.loading_percent,
+                               net.res_line.loading_percent, rtol=1e-4, atol=1e-6)
+    np.testing.assert_allclose(part.res_ext_grid.p_mw, net.res_ext_grid.p_mw, atol=1e-5)
+
+@pytest.mark.parametrize('n_workers', [1, 2])
+def test_matches_runpp(n_workers):
+    net     = radial_net(n_feeders=3, feeder_depth=5, seed=1)
+    part    = copy.deepcopy(net)
+    fp      = FeederPowerFlow(n_workers=n_workers, min_buses=0)
+    rng     = np.random.default_rng(0)
+    for row in rng.uniform(-0.004, 0.006, (3, len(net.load))):
+        net.load['p_mw'], part.load['p_mw'] = row, row
+        runpp(net)
+        fp.run(part)
+        assert fp.partitioned and part.converged
+        _check(part, net, fp.tol)
+    assert len(fp.sizes) == 3 and len(fp.iterations) == 3
+    fp.close()
+
+def test_min_buses():
+    net     = radial_net(n_feeders=3, feeder_depth=5, seed=1)
+    fp      = FeederPowerFlow(n_workers=1, min_buses=len(net.bus) + 1)
+    fp.run(net)
+    assert not fp.partitioned and fp.feeders is None and net.converged
+
+def test_measured_choice():
+    net     = radial_net(n_feeders=3, feeder_depth=5, seed=1)
+    ref     = copy.deepcopy(net)
+    fp      = FeederPowerFlow(n_workers=1, repeat=2)
+    fp.run(net)
+    runpp(ref)
+    stats   = fp.get_stats()
+    assert stats['partitioned'] == (stats['partitioned_time'] < stats['whole_time'])
+    assert (fp.feeders is not None) == fp.partitioned
+    _check(net, ref, fp.tol)
@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+pytest.importorskip('pandapower')
+import net_sim_ex1
+
+def test_policies_give_different_kpis():
+    branches, grid_kpis = net_sim_ex1.run_policies({'tight': {'loading_max': 0.001}, 'default': {}},
+                                                   fork_at=30, n_steps=60, n_workers=1)
+    tight, default = branches['tight'], branches['default']
+    assert tight['cpu']['thermal_overload'].sum() > 0
+    assert default['cpu']['thermal_overload'].sum() == 0
+    # energy-saving prosumers of the tight branch consume less
+    assert tight['prosumer_kpis']['e_load'].sum() < default['prosumer_kpis']['e_load'].sum()
+
+def test_risks_at_buses_without_prosumers():
+    # the overvoltage risk includes the external grid bus, which has no prosumer
+    branches, grid_kpis = net_sim_ex1.run_policies({'vm': {'vm_max': 1.0}},
+                                                   fork_at=5, n_steps=10, n_workers=1)
+    assert branches['vm']['cpu']['overvoltage'].sum() > 0
+
+def test_set_policy_merges_behaviors():
+    from v0_5.centralcpu import CPU
+    cpu = CPU()
+    cpu.set_policy(vm_max=1.02, behaviors={'overvoltage': {'battery_mode': 'buffer-grid'}})
+    assert cpu.vm_max == 1.02
+    assert cpu.behaviors['overvoltage'] == {'battery_mode': 'buffer-grid',
+                                            'pv_strategy': 'curtailment'}
+    assert cpu.behaviors['to_default'] == CPU.behaviors['to_default']
+    assert CPU.behaviors['overvoltage']['battery_mode'] == 'self-consumption'
+    for attr in ('recorder', 'stats_window'):
+        with pytest.raises(AttributeError):
+            cpu.set_policy(**{attr: None})
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from v0_5.gridstats import Exceedance, RollingWindow
+
+@pytest.mark.parametrize('window, n_steps', [(4, 11), (4, 8), (10, 3), (1, 5)])
+def test_rolling_matches_pandas(window, n_steps):
+    rng     = np.random.default_rng(window)
+    x       = rng.normal(size=(n_steps, 3))
+    rw      = RollingWindow(['a', 'b', 'c'], window=window)
+    ref     = pd.DataFrame(x).rolling(window, min_periods=1)
+    r_max, r_min, r_mean = ref.max().values, ref.min().values, ref.mean().values
+    for t in range(n_steps):
+        rw.update(x[t])
+        np.testing.assert_allclose(rw.max, r_max[t])
+        np.testing.assert_allclose(rw.min, r_min[t])
+        np.testing.assert_allclose(rw.mean, r_mean[t])
+    data    = rw.get_data()
+    np.testing.assert_array_equal(data['last'].values, x[-1])
+    assert list(data.index) == ['a', 'b', 'c']
+
+def test_exceedance_runs():
+    # runs touching both ends of the series and a single-sample run
+    x       = np.array([[1, 1, 0, 1, 0, 0, 1, 1, 1],
+                        [0, 0, 0, 0, 0, 0, 0, 0, 0]], dtype=float).T
+    e       = Exceedance(2, 1., above=True)
+    for row in x:
+        e.update(row)
+    np.testing.assert_array_equal(e.events, [3, 0])
+    np.testing.assert_array_equal(e.total, [6, 0])
+    np.testing.assert_array_equal(e.longest, [3, 0])
+    np.testing.assert_array_equal(e.run, [3, 0])
+    below   = Exceedance(1, 0.97, above=False)
+    for v in (0.97, 0.98, 0.96):
+        below.update(np.array([v]))
+    np.testing.assert_array_equal(below.events, [2])
+    np.testing.assert_array_equal(below.run, [1])
+
+def test_exceedance_in_window():
+    rw      = RollingWindow([0], window=2, upper=1., lower=0.)
+    for v in (1., 2., 0.5, -1.):
+        rw.update([v])
+    data    = rw.get_data()
+    assert data.above_events[0] == 1 and data.above_longest[0] == 2
+    assert data.below_run[0] == 1 and data.below_total[0] == 1
+    assert rw.max[0] == 0.5 and rw.min[0] == -1.
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from Storage import BatterySimple
+from PVgen import PVgen
+from v0_5.Prosumer import Prosumer
+from v0_5.kpi import GridKPI, ProsumerKPI, neighborhood_kpis
+
+TIMESTEP = 60
+
+def recorder_totals(p):
+    h       = TIMESTEP / 3600
+    meta    = p.recorder.meta
+    grid    = np.array(meta['p_grid_flow'], dtype=float)
+    return {
+            'steps'     : len(grid),
+            'e_load'    : sum(meta['p_load']) * h,
+            'e_pv'      : sum(meta['p_pv']) * h,
+            'e_feed_in' : np.clip(grid, 0, None).sum() * h,
+            'e_import'  : np.clip(-grid, 0, None).sum() * h,
+            'e_curtail' : sum(p.pvgen.recorder.meta['p_curtail']) * h,
+            'e_battery' : np.abs(meta['p_battery_flow']).sum() * h,
+            }
+
+@pytest.mark.parametrize('pv_strategy', ['self-consumption', 'curtailment'])
+def test_prosumer_kpis_match_recorder(pv_strategy):
+    rng     = np.random.default_rng(0)
+    day     = np.sin(np.linspace(0, 2*np.pi, 300)).clip(0)
+    p       = Prosumer(PVgen(installed_pv=5.), BatterySimple(battery_capacity=1.,
+                                                             initial_SOC=50),
+                       pv_strategy=pv_strategy)
+    for irr, load in zip(1000/60*day, rng.uniform(0.2, 3., len(day))):
+        p.control(irr, load, TIMESTEP)
+    kpis    = p.get_kpis()
+    totals  = recorder_totals(p)
+    for key, val in totals.items():
+        assert kpis[key] == pytest.approx(val, rel=1e-12, abs=1e-12), key
+    assert totals['e_feed_in' if pv_strategy == 'self-consumption' else 'e_curtail'] > 0
+    assert kpis['self_consumption'] == pytest.approx(
+        (totals['e_pv'] - totals['e_feed_in'] - totals['e_curtail']) / totals['e_pv'])
+    assert kpis['autarky'] == pytest.approx(1 - totals['e_import'] / totals['e_load'])
+    assert neighborhood_kpis({'p': p}).loc['p', 'e_load'] == pytest.approx(totals['e_load'])
+
+def test_empty_kpis():
+    kpis = ProsumerKPI().get_kpis()
+    assert kpis['steps'] == 0 and np.isnan(kpis['self_consumption']) and np.isnan(kpis['autarky'])
+
+def test_grid_kpi_steps_and_blocks():
+    rng     = np.random.default_rng(1)
+    vm      = rng.uniform(0.95, 1.05, (20, 5))
+    loading = rng.uniform(0, 100, (20, 4))
+    slack   = rng.uniform(-0.2, 0.2, (20, 1))
+    stepwise, block = GridKPI(), GridKPI()
+    for t in range(20):
+        stepwise.update(vm[t], loading[t], slack[t], 0.25)
+    block.update(vm[:8], loading[:8], slack[:8], 0.25)
+    block.update(vm[8:], loading[8:], slack[8:], 0.25)
+    for kpi in (stepwise, block):
+        kpis = kpi.get_kpis()
+        assert kpis['steps'] == 20
+        assert kpis['e_import'] == pytest.approx(slack[slack > 0].sum() * 0.25)
+        assert kpis['e_export'] == pytest.approx(-slack[slack < 0].sum() * 0.25)
+        assert (kpis['vm_max'], kpis['vm_min']) == (vm.max(), vm.min())
+        assert kpis['loading_max'] == loading.max()
+
+def test_run_kpis():
+    pytest.importorskip('pandapower')
+    import net_sim_ex1
+    sim     = net_sim_ex1.run_simulation(n_steps=20)
+    grid    = sim['grid_kpi'].get_kpis()
+    h       = 1 / 60
+    slack   = sim['slack_p'].values.sum(axis=1)
+    assert grid['steps'] == 20
+    assert grid['e_import'] == pytest.approx(slack[slack > 0].sum() * h)
+    assert grid['vm_max'] == sim['vm_pu'].values.max()
+    assert grid['loading_max'] == sim['th_overload'].values.max()
+    for p in sim['neighborhood'].values():
+        kpis = p.get_kpis()
+        for key, val in recorder_totals(p).items():
+            assert kpis[key] == pytest.approx(val, rel=1e-12, abs=1e-12), key
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+pytest.importorskip('pandapower')
+from v0_5.netgen import radial_net, populate_neighborhood
+from v0_5.pflow import runpp
+
+def test_one_prosumer_per_bus():
+    net     = radial_net(n_feeders=2, feeder_depth=3, branches=1, branch_depth=2)
+    # MV bus, LV bus and 2 feeders x 3 trunk buses x (1 + 2 branch buses)
+    assert len(net.bus) == 2 + 2*3*3
+    assert len(net.line) == len(net.load) == 2*3*3
+    assert set(net.line.std_type) == {'NAYY 4x120 SE', '15-AL1/3-ST1A 0.4'}
+    assert net.bus.name.loc[net.load.bus].tolist()[:4] == ['Bus LV1.1', 'Bus LV1.1.1.1',
+                                                          'Bus LV1.1.1.2', 'Bus LV1.2']
+    assert (net.load.name == 'Prosumer ' + net.bus.name.loc[net.load.bus].values).all()
+    assert net.ext_grid.vm_pu.tolist() == [1.] and 'm_pu' not in net.ext_grid
+    runpp(net)
+    assert net.converged
+
+def test_service_buses():
+    net     = radial_net(n_feeders=2, feeder_depth=2, branches=1, branch_depth=1,
+                         prosumers_per_bus=3)
+    supply  = 2*2*2
+    assert len(net.bus) == 2 + supply + 3*supply
+    assert len(net.load) == 3*supply
+    service = net.line[net.line.std_type == 'NAYY 4x50 SE']
+    # every household has its own service bus and line
+    assert len(service) == 3*supply
+    assert sorted(service.to_bus) == sorted(net.load.bus)
+    assert service.length_km.tolist() == [0.02] * len(service)
+    names   = net.bus.name
+    for _, line in service.iterrows():
+        assert names[line.to_bus].rsplit('.', 1)[0] == names[line.from_bus]
+    assert names.loc[net.load.bus].tolist()[:4] == ['Bus LV1.1.1', 'Bus LV1.1.2',
+                                                   'Bus LV1.1.3', 'Bus LV1.1.1.1.1']
+    # no load on the supply buses
+    assert not net.load.bus.isin(service.from_bus).any()
+    assert net.trafo.sn_mva.iloc[0] == 0.4
+    runpp(net)
+    assert net.converged
+
+def test_neighborhood_keys():
+    net     = radial_net(n_feeders=2, feeder_depth=2, branches=0, prosumers_per_bus=2)
+    profiles = np.tile(np.linspace(0.5, 3., len(net.load)), (10, 1))
+    nh      = populate_neighborhood(net, profiles, pv_ratio=1.)
+    # keyed by load bus name, in the order of net.load
+    assert list(nh) == net.bus.name.loc[net.load.bus].tolist()
+    assert len(set(nh)) == len(net.load)
+    last    = nh[list(nh)[-1]]
+    assert last.pvgen.installed_pv == pytest.approx(3., abs=last.pvgen.panel_peak_p)
+    assert nh[list(nh)[0]].battery is not last.battery
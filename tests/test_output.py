@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+from v0_5.output import ResultWriter, read_results
+
+def requires(fmt):
+    pytest.importorskip('pyarrow' if fmt == 'parquet' else 'tables')
+
+def results(n_steps=50, n_columns=4, seed=0):
+    index   = pd.date_range('2006-07-01', periods=n_steps, freq='min', name='timestamp')
+    values  = np.random.default_rng(seed).normal(size=(n_steps, n_columns))
+    return pd.DataFrame(values, index=index, columns=['bus %s' % j for j in range(n_columns)])
+
+def write(path, fmt, df):
+    with ResultWriter(path, chunk_size=16, fmt=fmt) as writer:
+        writer.add_table('vm_pu', df.columns)
+        # a partial chunk, a block and timesteps spanning several chunks
+        for t, row in df.iloc[:10].iterrows():
+            writer.record('vm_pu', t, row.values)
+        writer.append('vm_pu', df.index[10:30], df.values[10:30])
+        for t, row in df.iloc[30:].iterrows():
+            writer.record('vm_pu', t, row.values)
+
+@pytest.mark.parametrize('fmt', ['parquet', 'hdf5'])
+def test_round_trip(tmp_path, fmt):
+    requires(fmt)
+    df      = results()
+    path    = os.path.join(str(tmp_path), 'out' if fmt == 'parquet' else 'out.h5')
+    write(path, fmt, df)
+    pd.testing.assert_frame_equal(read_results(path, 'vm_pu'), df, check_freq=False)
+
+@pytest.mark.parametrize('fmt', ['parquet', 'hdf5'])
+def test_column_and_time_filters(tmp_path, fmt):
+    requires(fmt)
+    df      = results()
+    path    = os.path.join(str(tmp_path), 'out' if fmt == 'parquet' else 'out.h5')
+    write(path, fmt, df)
+    start, stop = df.index[12], df.index[40]
+    res     = read_results(path, 'vm_pu', columns=['bus 3', 'bus 1'], start=start, stop=stop)
+    # start is included, stop is not
+    expected = df.loc[df.index[12:40], ['bus 3', 'bus 1']]
+    pd.testing.assert_frame_equal(res[expected.columns], expected, check_freq=False)
+    assert len(read_results(path, 'vm_pu', start=df.index[-1])) == 1
+    assert len(read_results(path, 'vm_pu', stop=df.index[0])) == 0
+
+def test_unknown_format(tmp_path):
+    with pytest.raises(AttributeError):
+        ResultWriter(str(tmp_path), fmt='xls')
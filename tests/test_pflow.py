@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import copy
+import numpy as np
+import pytest
+
+pytest.importorskip('pandapower')
+from v0_5.netgen import radial_net
+from v0_5.pflow import (LazyPowerFlow, PowerFlowCache, linear_response, linearize,
+                        runpp, sensitivity_matrices)
+
+def test_cache_follows_topology():
+    net     = radial_net(n_feeders=2, feeder_depth=3, seed=1)
+    cache   = PowerFlowCache(resolution=1e-4)
+    cache.run(net)
+    closed  = net.res_line.loading_percent.copy()
+    net.line.loc[net.line.index[-1], 'in_service'] = False
+    cache.run(net)
+    assert cache.misses == 2
+    assert not np.allclose(net.res_line.loading_percent.fillna(0), closed)
+    net.line.loc[net.line.index[-1], 'in_service'] = True
+    net['_ppc'] = None
+    cache.run(net)
+    assert cache.hits == 1 and net._ppc is not None
+    np.testing.assert_allclose(net.res_line.loading_percent, closed)
+
+def test_lazy_reuse_is_not_cached():
+    net     = radial_net(n_feeders=2, feeder_depth=3, seed=1)
+    lazy    = LazyPowerFlow(tol=1e-3)
+    cache   = PowerFlowCache(resolution=1e-6, solver=lazy.run)
+    cache.run(net)
+    net.load['p_mw'] += 1e-4
+    cache.run(net)
+    assert not lazy.solved
+    assert len(cache.entries) == 1
+
+def test_linear_response_matches_matrices():
+    net     = radial_net(n_feeders=2, feeder_depth=4, seed=1)
+    runpp(net)
+    dvm_dp, dld_dp  = sensitivity_matrices(net)
+    dp      = np.zeros(len(net.bus))
+    dp[[3, 7]]      = [1e-3, -2e-3]
+    dvm, dld        = linear_response(linearize(net), dp)
+    np.testing.assert_allclose(dvm, dvm_dp.values @ dp, atol=1e-12)
+    np.testing.assert_allclose(dld, dld_dp.values @ dp, atol=1e-9)
+
+@pytest.mark.parametrize('correct', [True, False])
+def test_lazy_error_measured_at_next_solve(correct):
+    net     = radial_net(n_feeders=2, feeder_depth=4, seed=1)
+    ref     = copy.deepcopy(net)
+    lazy    = LazyPowerFlow(tol=1e-3, correct=correct)
+    lazy.run(net)
+    net.load['p_mw'] += 5e-4
+    ref.load['p_mw'] += 5e-4
+    lazy.run(net)
+    runpp(ref)
+    assert not lazy.solved
+    # the Jacobian is only factorized for a correction
+    assert (lazy._lin is not None) == correct
+    first   = np.max(np.abs(net.res_bus.vm_pu - ref.res_bus.vm_pu))
+    net.load['p_mw'] += 1e-3
+    ref.load['p_mw'] += 1e-3
+    lazy.run(net)
+    runpp(ref)
+    assert lazy.solved
+    np.testing.assert_allclose(net.res_bus.vm_pu, ref.res_bus.vm_pu, atol=1e-9)
+    # measured at injections that moved further than those of the reuse
+    assert lazy.max_error() >= first
+    assert np.isnan(lazy.get_data().error.iloc[1])
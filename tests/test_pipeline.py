@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+import copy
+import numpy as np
+import pytest
+
+pytest.importorskip('pandapower')
+from v0_5.netgen import radial_net
+from v0_5.pflow import runpp
+from v0_5.pipeline import solve_power_flows
+
+@pytest.fixture(scope='module')
+def case():
+    net         = radial_net(n_feeders=2, feeder_depth=4, seed=1)
+    injections  = np.random.default_rng(0).uniform(-0.004, 0.006, (5, len(net.load)))
+    ref         = copy.deepcopy(net)
+    vm_pu, loading, slack = [], [], []
+    for row in injections:
+        ref.load['p_mw'] = row
+        runpp(ref)
+        vm_pu.append(ref.res_bus.vm_pu.values.copy())
+        loading.append(ref.res_line.loading_percent.values.copy())
+        slack.append(ref.res_ext_grid.p_mw.values.copy())
+    return net, injections, (np.array(vm_pu), np.array(loading), np.array(slack))
+
+@pytest.mark.parametrize('chunk_size', [None, 2])
+@pytest.mark.parametrize('backend', ['runpp', 'timeseries'])
+def test_backends_match_runpp(case, backend, chunk_size):
+    net, injections, ref = case
+    res = solve_power_flows(net, injections, n_workers=1, chunk_size=chunk_size,
+                            backend=backend)
+    vm_pu, loading, slack = res
+    assert vm_pu.shape == ref[0].shape and loading.shape == ref[1].shape
+    np.testing.assert_allclose(vm_pu, ref[0], atol=1e-6)
+    np.testing.assert_allclose(loading, ref[1], rtol=1e-4, atol=1e-6)
+    np.testing.assert_allclose(slack, ref[2], atol=1e-5)
+    # the net of the caller is left untouched
+    assert len(net.controller) == 0
+
+def test_backends_agree_on_pool(case):
+    net, injections, _ = case
+    a = solve_power_flows(net, injections, n_workers=2, backend='runpp')
+    b = solve_power_flows(net, injections, n_workers=2, backend='timeseries')
+    for x, y in zip(a, b):
+        np.testing.assert_allclose(x, y, rtol=1e-4, atol=1e-6)
+
+def test_rejects_unknown_backend(case):
+    net, injections, _ = case
+    with pytest.raises(AttributeError):
+        solve_power_flows(net, injections, n_workers=1, backend='opendss')
@@ -0,0 +1,23 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+
+from v0_5.plotting import Pyramid
+
+def test_window_keeps_extrema():
+    x           = np.zeros(4096)
+    x[1000]     = 10
+    window      = Pyramid(pd.DataFrame({'a': x})).window(600, 3000, 8)
+    assert window.a.max() == 10
+
+def test_random_windows():
+    rng         = np.random.default_rng(0)
+    y           = rng.normal(size=(10007, 3))
+    pyramid     = Pyramid(pd.DataFrame(y))
+    for _ in range(200):
+        start   = int(rng.integers(0, 10000))
+        stop    = int(rng.integers(start + 1, 10008))
+        window  = pyramid.window(start, stop, 100)
+        assert len(window) <= max(100, 3 * (100 + 4))
+        np.testing.assert_array_equal(window.max().values, y[start:stop].max(axis=0))
+        np.testing.assert_array_equal(window.min().values, y[start:stop].min(axis=0))
@@ -0,0 +1,44 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from v0_5.profiles import ProfileGenerator
+
+def base(days=3, freq='min'):
+    index   = pd.date_range('2006-07-01', periods=days*(1440 if freq == 'min' else 24),
+                            freq=freq)
+    hour    = np.asarray(index.hour + index.minute/60)
+    return pd.Series(1 + np.sin(2*np.pi*hour/24).clip(0) + (hour > 18), index=index)
+
+def test_shape_and_steps_per_day():
+    gen     = ProfileGenerator(base(), seed=1)
+    assert gen.steps_per_day == 1440
+    p       = gen.generate(5)
+    assert p.shape == (3*1440, 5)
+    assert ProfileGenerator(base(), seed=1).generate(4, n_steps=5000).shape == (5000, 4)
+    assert (p >= 0).all()
+
+def test_seed_reproducibility():
+    a       = ProfileGenerator(base(), seed=7).generate(6, n_steps=2000)
+    b       = ProfileGenerator(base(), seed=7).generate(6, n_steps=2000)
+    c       = ProfileGenerator(base(), seed=8).generate(6, n_steps=2000)
+    np.testing.assert_array_equal(a, b)
+    assert not np.allclose(a, c)
+    # a longer horizon extends a shorter one unchanged
+    longer  = ProfileGenerator(base(), seed=7).generate(6, n_steps=3000)
+    np.testing.assert_array_equal(longer[:2000], a)
+    # households are distinct
+    assert not np.allclose(a[:, 0], a[:, 1])
+
+@pytest.mark.parametrize('max_shift', [0, 23, 24, 60])
+def test_shift_beyond_a_day(max_shift):
+    hourly  = base(days=4, freq='h')
+    gen     = ProfileGenerator(hourly, seed=3, max_shift=max_shift, noise=0., scale=(1., 1.),
+                               bootstrap=False)
+    assert gen.steps_per_day == 24
+    p       = gen.generate(8, n_steps=50)
+    assert p.shape == (50, 8)
+    if max_shift == 0:
+        # no shift, scaling or noise: the base days in order
+        np.testing.assert_array_equal(p, np.repeat(hourly.values[:50, None], 8, axis=1))
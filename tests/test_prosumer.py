@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*-
+import pytest
+
+from Storage import BatterySimple
+from PVgen import PVgen
+from v0_5.Prosumer import Prosumer
+
+def prosumer(**kwargs):
+    return Prosumer(PVgen(installed_pv=5.), BatterySimple(battery_capacity=1.5,
+                                                          initial_SOC=50), **kwargs)
+
+def test_rejects_unknown_pv_strategy():
+    with pytest.raises(ValueError):
+        prosumer(pv_strategy='full-curtailment')
+    p = prosumer(pv_strategy='curtailment')
+    assert p.pv_strategy == p.pvgen.strategy == 'curtailment'
+    with pytest.raises(ValueError):
+        p.set_pvgen_strategy('reactive feed-in')
+    # set directly, as CPU behaviors do
+    p.pv_strategy = 'partial-curtailment'
+    with pytest.raises(ValueError):
+        p.control(10., 1., 60)
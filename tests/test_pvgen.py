@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from PVgen import PVgen, SharedPV
+
+KW = (2., 5., 7.5)
+
+def irradiance(n=96, seed=0):
+    irr = np.random.default_rng(seed).uniform(0., 250., n)
+    irr[:20] = 0.
+    return irr
+
+def produce(pvgens, x):
+    """Produces one timestep and records p_curtail as Prosumer.control does"""
+    p = [pv.production(x, 900) for pv in pvgens]
+    for pv in pvgens:
+        pv.recorder.record(p_curtail=0.)
+    return p
+
+def run(pvgens, irr, resize=None):
+    """Steps every installation through irr, resizing pvgens[0] at resize"""
+    out = []
+    for k, x in enumerate(irr):
+        if k == resize:
+            pvgens[0].set_installed_pv_power(10.)
+        out.append(produce(pvgens, x))
+    return np.array(out)
+
+@pytest.mark.parametrize('mode', ['compute', 'step'])
+@pytest.mark.parametrize('resize', [None, 40])
+def test_shared_matches_standalone(mode, resize):
+    irr = irradiance()
+    alone = [PVgen(installed_pv=kw) for kw in KW]
+    bound = [PVgen(installed_pv=kw) for kw in KW]
+    shared = SharedPV(bound, len(irr))
+    if mode == 'compute':
+        shared.compute(irr, 900)
+        p_bound = run(bound, irr, resize)
+    else:
+        p_bound = []
+        for k, x in enumerate(irr):
+            if k == resize:
+                bound[0].set_installed_pv_power(10.)
+            shared.step(x, 900)
+            p_bound.append(produce(bound, x))
+        p_bound = np.array(p_bound)
+    p_alone = run(alone, irr, resize)
+
+    np.testing.assert_allclose(p_bound, p_alone, rtol=1e-12)
+    for a, b in zip(alone, bound):
+        np.testing.assert_allclose(b.get_p_prod(), a.get_p_prod(), rtol=1e-12)
+        da, db = a.get_pv_data(), b.get_pv_data()
+        pd.testing.assert_frame_equal(db[da.columns], da,
+                                      check_dtype=False, rtol=1e-12)
+
+def test_shared_checks_reads():
+    irr = irradiance(8)
+    pv = PVgen(installed_pv=5.)
+    shared = SharedPV([pv], len(irr))
+    shared.compute(irr[:4], 900)
+    with pytest.raises(AttributeError):
+        pv.production(irr[0] + 1., 900)
+    for x in irr[:4]:
+        pv.production(x, 900)
+    with pytest.raises(AttributeError):
+        pv.production(irr[4], 900)
+    # extending the series keeps the production already read
+    read = pv.get_p_prod().copy()
+    shared.compute(irr, 900)
+    np.testing.assert_array_equal(pv.get_p_prod(), read)
+    assert pv.production(irr[4], 900) == pytest.approx(
+        PVgen(installed_pv=5.).production(irr[4], 900))
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+import sys
+import numpy as np
+import pandas as pd
+
+from v0_5.recorder import CODES, CodeTable, Recorder, TimeAxis
+
+def test_codes_keep_types_apart():
+    table   = CodeTable()
+    codes   = [table.encode(v) for v in (0, 0.0, False, 1, True, 'a', 0)]
+    assert codes == [0, 1, 2, 3, 4, 5, 0]
+    assert [type(table.decode(c)) for c in codes[:3]] == [int, float, bool]
+    r       = Recorder('status', categorical=('status',), code_table=table)
+    for v in (0, False, 0.0, False):
+        r.record(status=v)
+    assert [type(v) for v in r.get_categorical('status')] == [int, bool, float, bool]
+
+def test_run_length_round_trip():
+    r       = Recorder('log', 'p', categorical=('log',), run_length=True, code_table=CodeTable())
+    logs    = ['a', 'a', 'b', 'b', 'b', 'a', 'c']
+    for i, log in enumerate(logs):
+        r.record(log=log, p=float(i))
+    assert len(r.meta['log']) == 4
+    assert list(r.get_data().log) == logs
+    assert r.last_occurrence() == {'log': 'c', 'p': 6.}
+
+def test_single_shared_table():
+    import net_sim_ex1
+    from Storage import BatterySimple
+    from PVgen import PVgen
+    from v0_5.Prosumer import Prosumer
+    from v0_5.centralcpu import CPU
+    # every module records through the same recorder module and table
+    assert 'recorder' not in sys.modules
+    p       = Prosumer(PVgen(installed_pv=3.), BatterySimple())
+    for recorder in (p.recorder, p.pvgen.recorder, p.battery.recorder, CPU().recorder):
+        assert type(recorder) is Recorder and recorder.code_table is CODES
+    assert net_sim_ex1.TimeAxis is TimeAxis
+
+def test_time_axis():
+    index   = pd.date_range('2006-07-01', periods=5, freq='min')
+    axis    = TimeAxis(2)
+    for t in index[:3]:
+        axis.append(t)
+    axis.extend(index[3:])
+    assert len(axis) == 5
+    assert (axis.index() == index).all()
+    np.testing.assert_array_equal(axis.values, index.values)
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+from Storage import BatterySimple
+from PVgen import PVgen
+from v0_5.Prosumer import Prosumer
+from v0_5.recorder import TimeAxis
+from v0_5.results import NeighborhoodResults
+
+def cube(n_steps=30):
+    index   = pd.date_range('2006-07-01 10:00', periods=n_steps, freq='min', name='timestamp')
+    axis    = TimeAxis.from_index(index)
+    rng     = np.random.default_rng(0)
+    nh      = {}
+    for name in ('Bus LV1.1', 'Bus LV1.2', 'Bus LV2.1'):
+        p   = Prosumer(PVgen(installed_pv=3.), BatterySimple(battery_capacity=2.,
+                                                             initial_SOC=50))
+        p.set_time_axis(axis)
+        for i in range(n_steps):
+            p.control(12., rng.uniform(0.2, 3.), 60)
+        nh[name] = p
+    return NeighborhoodResults.from_neighborhood(nh), nh
+
+def test_from_neighborhood():
+    res, nh = cube()
+    assert res.shape == (30, 3, len(res.variables))
+    data    = nh['Bus LV1.2'].get_prosumer_data()
+    np.testing.assert_allclose(res.variable('p_grid_flow')['Bus LV1.2'], data.p_grid_flow)
+    np.testing.assert_allclose(res.household('Bus LV1.2').grid_status,
+                               data.grid_status.astype(float))
+
+@pytest.mark.parametrize('ext, module', [('.parquet', 'pyarrow'), ('.h5', 'tables')])
+def test_file_round_trip(tmp_path, ext, module):
+    pytest.importorskip(module)
+    res, _  = cube()
+    path    = os.path.join(str(tmp_path), 'cube' + ext)
+    res.to_file(path)
+    back    = NeighborhoodResults.from_file(path)
+    assert back.prosumers == res.prosumers and back.variables == res.variables
+    np.testing.assert_array_equal(back.data, res.data)
+    pd.testing.assert_index_equal(pd.DatetimeIndex(back.time), pd.DatetimeIndex(res.time),
+                                  exact=False, check_names=False)
+    prosumers, variables = ['Bus LV2.1', 'Bus LV1.1'], ['battery_SOC', 'p_pv']
+    part    = NeighborhoodResults.from_file(path, prosumers=prosumers, variables=variables)
+    np.testing.assert_array_equal(part.data,
+                                  res.sel(prosumers=prosumers, variables=variables).data)
+
+def test_unsupported_file(tmp_path):
+    res, _  = cube(2)
+    with pytest.raises(AttributeError):
+        res.to_file(os.path.join(str(tmp_path), 'cube.xls'))
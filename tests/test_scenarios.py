@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import os
+import numpy as np
+import pytest
+
+from v0_5.scenarios import ScenarioCache, scenario_key, code_version
+
+def write(path, text):
+    with open(path, 'w') as f:
+        f.write(text)
+    return path
+
+def test_key_stability(tmp_path):
+    data    = write(os.path.join(str(tmp_path), 'load.csv'), 'a,b\n1,2\n')
+    code    = write(os.path.join(str(tmp_path), 'model.py'), 'x = 1\n')
+    params  = {'seed': 42, 'cpu': {'vm_max': 1.03, 'vm_min': 0.97}, 'pf_tol': None}
+    key     = scenario_key(params, files=[data], code=code_version(code))
+    # same inputs in another order give the same key
+    swapped = {'pf_tol': None, 'cpu': {'vm_min': 0.97, 'vm_max': 1.03}, 'seed': 42}
+    assert scenario_key(swapped, files=[data], code=code_version(code)) == key
+    assert scenario_key(dict(params, seed=43), files=[data], code=code_version(code)) != key
+    # a changed input file misses
+    write(data, 'a,b\n1,3\n10,20\n')
+    assert scenario_key(params, files=[data], code=code_version(code)) != key
+    write(data, 'a,b\n1,2\n')
+    assert scenario_key(params, files=[data], code=code_version(code)) == key
+    # so does a changed source file of the code version
+    write(code, 'x = 2  # changed\n')
+    assert scenario_key(params, files=[data], code=code_version(code)) != key
+    assert code_version(str(tmp_path)) == code_version(code)
+
+def test_cache_horizons(tmp_path):
+    cache   = ScenarioCache(str(tmp_path))
+    for n in (10, 30):
+        cache.put('k', n, {'n': n})
+    assert cache.horizons('k') == [10, 30]
+    assert cache.longest_prefix('k', 25) == 10
+    assert cache.longest_prefix('k', 30) == 30
+    assert cache.longest_prefix('k', 5) is None
+    assert cache.get('k', 30) == {'n': 30} and cache.get('k', 20) is None
+    assert cache.horizons('other') == []
+    cache.clear('k')
+    assert cache.horizons('k') == [] and not os.listdir(str(tmp_path))
+
+def test_resume_matches_cold_run(tmp_path):
+    pytest.importorskip('pandapower')
+    import net_sim_ex1
+    cache   = ScenarioCache(str(tmp_path))
+    net_sim_ex1.run_simulation(n_steps=15, cache=cache)
+    key     = os.listdir(str(tmp_path))[0]
+    resumed = net_sim_ex1.run_simulation(n_steps=30, cache=cache)
+    assert cache.horizons(key) == [15, 30]
+    cold    = net_sim_ex1.run_simulation(n_steps=30)
+    for k in ('vm_pu', 'th_overload', 'slack_p'):
+        np.testing.assert_array_equal(resumed[k].values, cold[k].values)
+        assert (resumed[k].index == cold[k].index).all()
+    np.testing.assert_array_equal(resumed['results'].data, cold['results'].data)
+    assert resumed['grid_kpi'].get_kpis() == cold['grid_kpi'].get_kpis()
+    # a whole cached horizon is served as is
+    served  = net_sim_ex1.run_simulation(n_steps=30, cache=cache)
+    np.testing.assert_array_equal(served['vm_pu'].values, cold['vm_pu'].values)
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pandas as pd
+import pytest
+
+from Storage import BatterySimple
+from PVgen import PVgen
+from v0_5.Prosumer import Prosumer
+from v0_5.sizing import SizingOptimizer
+
+TIMESTEP = 60
+
+def inputs(n_steps=600, seed=0):
+    rng     = np.random.default_rng(seed)
+    day     = np.sin(np.linspace(0, 2*np.pi, n_steps)).clip(0)
+    irr     = 1000/60*day
+    load    = rng.uniform(0.2, 3., n_steps)
+    return irr, load
+
+def run_pair(irr, load, installed_pv, capacity, battery_mode, pv_strategy, initial_SOC,
+             min_max_SOC):
+    p = Prosumer(PVgen(installed_pv=installed_pv),
+                 BatterySimple(battery_capacity=capacity, initial_SOC=initial_SOC,
+                               min_max_SOC=min_max_SOC),
+                 pv_strategy=pv_strategy)
+    p.set_battery_mode(battery_mode)
+    for i in range(len(irr)):
+        p.control(irr[i], load[i], TIMESTEP)
+    h       = TIMESTEP / 3600
+    data    = p.recorder.meta
+    grid    = np.array(data['p_grid_flow'])
+    return {
+            'e_pv'      : sum(data['p_pv']) * h,
+            'e_import'  : np.maximum(-grid, 0).sum() * h,
+            'e_export'  : np.maximum(grid, 0).sum() * h,
+            'e_curtail' : sum(p.pvgen.recorder.meta['p_curtail']) * h,
+            'e_battery' : np.abs(data['p_battery_flow']).sum() * h,
+            }
+
+@pytest.mark.parametrize('battery_mode, pv_strategy', [
+                         ('self-consumption', 'self-consumption'),
+                         ('buffer-grid', 'curtailment'),
+                         ])
+def test_matches_prosumer_runs(battery_mode, pv_strategy):
+    irr, load   = inputs()
+    kwargs      = dict(battery_mode=battery_mode, pv_strategy=pv_strategy,
+                       initial_SOC=60, min_max_SOC=(20, 80))
+    opt         = SizingOptimizer(irr, load, TIMESTEP, **kwargs)
+    res         = opt.evaluate([2., 4.5], [0.5, 2., 6.])
+    assert len(res) == 6
+    for (installed_pv, capacity), row in res.iterrows():
+        ref = run_pair(irr, load, installed_pv, capacity, **kwargs)
+        for key, val in ref.items():
+            assert row[key] == pytest.approx(val, rel=1e-9, abs=1e-9), key
+
+def test_refinement_bounds():
+    irr, load   = inputs()
+    opt         = SizingOptimizer(irr, load, TIMESTEP)
+    pv_range, battery_range = (1., 6.), (0., 8.)
+    target      = (3.3, 5.2)
+    def objective(df):
+        pv, c   = df.index.get_level_values(0), df.index.get_level_values(1)
+        return pd.Series(-(pv - target[0])**2 - (c - target[1])**2, index=df.index)
+    n           = (6, 5)
+    best, res   = opt.optimize(pv_range, battery_range, objective=objective, n=n, levels=3)
+    pv          = res.index.get_level_values(0)
+    c           = res.index.get_level_values(1)
+    # evaluated pairs never leave the ranges (6 kW is a whole number of panels)
+    assert pv.min() >= pv_range[0] and pv.max() <= pv_range[1]
+    assert c.min() >= battery_range[0] and c.max() <= battery_range[1]
+    # every level narrows the capacity range to two spacings around the best
+    d_c         = (battery_range[1] - battery_range[0]) / (n[1] - 1)
+    finest      = d_c * (2 / (n[1] - 1))**2
+    assert np.diff(np.unique(c)).min() == pytest.approx(finest)
+    assert abs(best[1] - target[1]) <= finest / 2 + 1e-12
+    assert best == objective(res).idxmax()
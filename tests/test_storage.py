@@ -0,0 +1,32 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+import pytest
+
+from Storage import Battery
+
+# +-3 kW on a 5 kWh battery, 40 steps of 15 min
+P = np.random.default_rng(0).uniform(-3., 3., 40)
+
+def soc(p, timestep, **kwargs):
+    b = Battery(battery_capacity=5., initial_SOC=50, **kwargs)
+    return np.array([b.process(x, timestep).battery_SOC for x in p])
+
+@pytest.fixture(scope='module')
+def reference():
+    """SOC at the end of every 15 min step, integrated in 1 s steps"""
+    return soc(np.repeat(P, 900), 1)[899::900]
+
+def test_converges_to_fine_step_reference(reference):
+    errors = [np.abs(soc(P, 900, max_dsoc=d) - reference).max()
+              for d in (4., 2., 1., .5, .1, .01)]
+    # first order in max_dsoc, down to the error of the 1 s reference
+    assert all(a > b for a, b in zip(errors, errors[1:]))
+    assert errors[-1] < .05
+    assert errors[1] < 6.
+    # integrating in 60 s steps agrees with the reference as well
+    fine = soc(np.repeat(P, 15), 60, max_dsoc=.01)[14::15]
+    assert np.abs(fine - reference).max() < .05
+
+def test_default_at_60s_stays_close(reference):
+    coarse = soc(np.repeat(P, 15), 60)[14::15]
+    assert np.abs(coarse - reference).max() < 3.
@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import copy
+import numpy as np
+import pandas as pd
+import pytest
+
+from Storage import BatterySimple, Battery
+from PVgen import PVgen
+from v0_5.Prosumer import Prosumer
+from v0_5.pipeline import simulate_prosumers
+from v0_5.timeparallel import ParallelInTime
+
+N_STEPS = 720
+TIMESTEP = 60
+
+def inputs(n_prosumers, seed=0):
+    rng     = np.random.default_rng(seed)
+    index   = pd.date_range('2006-07-01', periods=N_STEPS, freq='min')
+    day     = np.sin(np.linspace(0, 3*np.pi, N_STEPS)).clip(0)
+    irr     = pd.Series(1000/60*day, index=index)
+    load    = rng.uniform(0.2, 3., (N_STEPS, n_prosumers))
+    return irr, load
+
+def neighborhood(battery, n_prosumers=2):
+    return {'p%s' % j: Prosumer(PVgen(installed_pv=5.), battery(battery_capacity=1.5,
+                                                                initial_SOC=50))
+            for j in range(n_prosumers)}
+
+def test_matches_serial_run_with_battery_simple():
+    nh          = neighborhood(BatterySimple)
+    irr, load   = inputs(len(nh))
+    serial      = -1000 * simulate_prosumers(copy.deepcopy(nh), irr, load, TIMESTEP)
+    pit         = ParallelInTime(nh, window=120, n_workers=1)
+    p_grid, soc = pit.run(irr, load, TIMESTEP)
+    assert pit.stats['converged']
+    np.testing.assert_allclose(p_grid.values, serial, atol=1e-9)
+
+def test_rejects_battery():
+    with pytest.raises(AttributeError):
+        ParallelInTime(neighborhood(Battery), window=120)
+
+def test_rejects_simulated_template():
+    nh          = neighborhood(BatterySimple)
+    irr, load   = inputs(len(nh))
+    simulate_prosumers(nh, irr[:10], load[:10], TIMESTEP)
+    with pytest.raises(AttributeError):
+        ParallelInTime(nh, window=120)
@@ -8,13 +8,38 @@ Created on Sat Feb 29 20:12:09 2020
 import math
 import decimal
 import warnings
-from recorder import Recorder
+import numpy as np
+import pandas as pd
+from v0_5.recorder import Recorder
 from panels import SolarPanel
 
+class PVStep(object):
+    """
+    Result of the last timestep produced by a PV installation
+
+    irr_sol : float
+        irradiance in Wh/m2
+
+    p_prod : float
+        power yield of the installation before losses in kW
+
+    p_pv : float
+        power output of the installation after losses in kW
+    """
+
+    __slots__ = ('irr_sol', 'p_prod', 'p_pv')
+
+    def __init__(self, irr_sol, p_prod, p_pv):
+        self.irr_sol    = irr_sol
+        self.p_prod     = p_prod
+        self.p_pv       = p_pv
+
 class PVgen(SolarPanel):
     """
     """
     strategy = 'self-consumption' # also: 'curtailment'
+    last     = None # PVStep of last produced timestep
+    shared   = None # SharedPV stage the installation is bound to
 
     def __init__(self,
                  installed_pv   = None,
@@ -33,13 +58,40 @@ class PVgen(SolarPanel):
                                         'irr_sol',
                                         'p_curtail',
                                         )
+        self.size_installation()
 
     def get_pv_data(self):
         """
         Returns pandas dataframe composed by object's meta dictionray of data
         """
+        if self.shared is not None:
+            return self.recorder.with_time_axis(pd.DataFrame({
+                                 'p_prod'   : self.get_p_prod(),
+                                 'irr_sol'  : self.shared.irr_sol[:self._k],
+                                 'p_curtail': self.recorder.meta['p_curtail'],
+                                 }))
         return self.recorder.get_data()
 
+    def get_p_prod(self):
+        """
+        Returns the recorded power yield of the installation before losses.
+        For installations bound to a SharedPV stage this is a view of the
+        shared production matrix
+        """
+        if self.shared is not None:
+            return self.shared.p_prod[:self._k, self._column]
+        return self.recorder.meta['p_prod']
+
+    def bind(self, shared, column):
+        """
+        Binds the installation to column of a SharedPV stage. production
+        then reads the yield computed by the stage instead of computing
+        and recording its own
+        """
+        self.shared     = shared
+        self._column    = column
+        self._k         = 0
+
     def get_pv_sys_loss(self):
         """
         Returns the PV total power loss in per unit
@@ -53,7 +105,12 @@ class PVgen(SolarPanel):
         characteristics. Make sure to set a power that is multiple of
         panel_peak_p attribute
         """
-        self.installed_pv = installed_pv
+        self.installed_pv   = installed_pv
+        self.num_panels     = None
+        self.size_installation()
+        if self.shared is not None:
+            # production not yet read follows the new number of panels
+            self.shared.set_panels(self._column, self._panels, self._k)
 
 
     def _readjust_pv_kw(self, verbose=False):
@@ -63,24 +120,18 @@ class PVgen(SolarPanel):
                           '%s kW. See class default args' % self.installed_pv)
         self.installed_pv = self.num_panels * self.panel_peak_p
 
-    def production(self, irr_sol, timestep):
+    def size_installation(self):
         """
-        A simple model of the PV power pordocution is executed by this function
-
-        Parameters
-        ----------
-        irr_sol : float
-            Irradiance characterizes the amount of power output that can be
-            generated by the PV installation. It is expected to receive an
-            irradiance in Wh/m2 for a time interval
+        Quantizes the installed pv power to a whole number of panels of
+        panel_peak_p, readjusting installed_pv upwards if needed. Called at
+        construction and whenever the installed power is set, the result
+        is cached in num_panels and p_rated
 
         Returns
         -------
         float
-            Power generation from PV installation at a given timestamp
-
+            number of panels of the installation
         """
-
         if self.installed_pv and not self.num_panels:
             if self.installed_pv < 0:
                 raise AttributeError('PV installed power cannot be a negative number')
@@ -94,10 +145,156 @@ class PVgen(SolarPanel):
             if self.num_panels * self.panel_peak_p != self.installed_pv:
                 raise AttributeError('PV installed power and number of panels' +
                                      'do not match for given panel characteristics')
+        self._panels    = self.num_panels or 0
+        self.p_rated    = self._panels * self.panel_peak_p  # effective rating [kW]
+        return self.num_panels
+
+    def production(self, irr_sol, timestep):
+        """
+        A simple model of the PV power pordocution is executed by this function
+
+        Parameters
+        ----------
+        irr_sol : float
+            Irradiance characterizes the amount of power output that can be
+            generated by the PV installation. It is expected to receive an
+            irradiance in Wh/m2 for a time interval
+
+        Returns
+        -------
+        float
+            Power generation from PV installation at a given timestamp
+
+        """
+
+        if self.shared is not None:
+            if self._k >= self.shared.n:
+                raise AttributeError('SharedPV stage has no production computed ' +
+                                     'for timestep %s' % self._k)
+            irr = self.shared.irr_sol[self._k]
+            if irr_sol != irr and not (np.isnan(irr_sol) and np.isnan(irr)):
+                raise AttributeError('Irradiance %s differs from the %s of the ' % (irr_sol, irr) +
+                                     'SharedPV stage at timestep %s' % self._k)
+            installation_power_yield = self.shared.p_prod[self._k, self._column]
+            self._k += 1
+            self.last = PVStep(irr_sol  = irr_sol,
+                               p_prod   = installation_power_yield,
+                               p_pv     = installation_power_yield * (1 - self.pv_total_loss))
+            return self.last.p_pv
 
         p_yield = super(PVgen, self).production(irr_sol, timestep)
-        installation_power_yield = self.num_panels * p_yield
+        installation_power_yield = self._panels * p_yield
 
+        self.last = PVStep(irr_sol  = irr_sol,
+                           p_prod   = installation_power_yield,
+                           p_pv     = installation_power_yield * (1 - self.pv_total_loss))
         self.recorder.record(irr_sol    = irr_sol,
                               p_prod    = installation_power_yield)
-        return installation_power_yield * (1 - self.pv_total_loss)
+        return self.last.p_pv
+
+    def production_series(self, irr_sol, timestep):
+        """
+        Vectorized PV power production of the installation over a whole
+        irradiance series. Nothing is recorded
+
+        Parameters
+        ----------
+        irr_sol : array-like
+            irradiance in Wh/m2 at every timestep
+
+        timestep : int
+            time resolution of irradiation data in seconds
+
+        Returns
+        -------
+        numpy array
+            power generation from PV installation after losses in kW
+        """
+        p_yield = super(PVgen, self).production_series(irr_sol, timestep)
+        return self._panels * p_yield * (1 - self.pv_total_loss)
+
+class SharedPV(object):
+    """
+    Neighborhood-level PV stage. All PV installations of a neighborhood see
+    the same irradiance and only differ in their number of panels, so the
+    yield of a single panel is computed once per timestep (or once for the
+    whole series) and scaled by the panel count of every installation as
+    a single outer product. Bound installations read their production from
+    the resulting (time x installation) matrix
+
+    Parameters
+    ----------
+    pvgens : list
+        PVgen instances sharing the same panel characteristics
+
+    n_steps : int
+        number of timesteps of the simulation
+
+    Returns
+    ----------
+
+    """
+
+    def __init__(self, pvgens, n_steps):
+
+        self.pvgens     = list(pvgens)
+        self.panel      = self.pvgens[0]
+        for pv in self.pvgens:
+            if (pv.panel_peak_p, pv.module_area, pv.pv_efficiency) != \
+               (self.panel.panel_peak_p, self.panel.module_area, self.panel.pv_efficiency):
+                raise AttributeError('PV installations of a SharedPV stage must ' +
+                                     'share the same panel characteristics')
+        self.panels     = np.array([pv._panels for pv in self.pvgens], dtype=float)
+        self.irr_sol    = np.zeros(n_steps)
+        self.p_yield    = np.zeros(n_steps)     # yield of a single panel
+        # column-major so that every installation trace is a contiguous view
+        self.p_prod     = np.zeros((n_steps, len(self.pvgens)), order='F')
+        self.n          = 0     # number of computed timesteps
+        for j, pv in enumerate(self.pvgens):
+            pv.bind(self, j)
+
+    def resize(self, n_steps):
+        """
+        Grows the stage to n_steps timesteps keeping the computed ones
+        """
+        if n_steps > len(self.irr_sol):
+            irr_sol             = np.zeros(n_steps)
+            p_yield             = np.zeros(n_steps)
+            p_prod              = np.zeros((n_steps, len(self.pvgens)), order='F')
+            irr_sol[:self.n]    = self.irr_sol[:self.n]
+            p_yield[:self.n]    = self.p_yield[:self.n]
+            p_prod[:self.n]     = self.p_prod[:self.n]
+            self.irr_sol, self.p_yield, self.p_prod = irr_sol, p_yield, p_prod
+
+    def compute(self, irr_sol, timestep):
+        """
+        Computes the production of every installation for a whole
+        irradiance series in Wh/m2. Timesteps already computed are kept
+        """
+        irr                 = np.asarray(irr_sol, dtype=float)[:len(self.irr_sol)]
+        s, e                = self.n, len(irr)
+        if e <= s:
+            return
+        self.p_yield[s:e]   = SolarPanel.production_series(self.panel, irr[s:], timestep)
+        self.irr_sol[s:e]   = irr[s:]
+        self.p_prod[s:e]    = np.outer(self.p_yield[s:e], self.panels)
+        self.n              = e
+
+    def set_panels(self, column, panels, start=0):
+        """
+        Sets the number of panels of installation column and recomputes its
+        production from timestep start on
+        """
+        self.panels[column]             = panels
+        self.p_prod[start:self.n, column] = self.p_yield[start:self.n] * panels
+
+    def step(self, irr_sol, timestep):
+        """
+        Computes the production of every installation for the next
+        timestep of the simulation given irradiance in Wh/m2
+        """
+        p_yield             = SolarPanel.production(self.panel, irr_sol, timestep)
+        self.irr_sol[self.n] = irr_sol
+        self.p_yield[self.n] = p_yield
+        self.p_prod[self.n] = p_yield * self.panels
+        self.n              += 1
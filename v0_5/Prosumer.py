@@ -7,11 +7,11 @@ Created on Sat Feb 29 20:13:35 2020
 import sys
 sys.path.append('..')
 import pandas as pd
-import matplotlib.pyplot as plt
 from utils.function_repo import timegrid, parse_hours
 from Storage import BatterySimple, Battery
 from PVgen import PVgen
-from recorder import Recorder
+from v0_5.recorder import Recorder
+from kpi import ProsumerKPI
 
 class Prosumer(object):
 
@@ -31,6 +31,9 @@ class Prosumer(object):
     battery: object, dafault None
         instance of a class BatterySimple or Battery that can be fully
         characterized by its own default attributes. See documentation
+
+    pv_strategy: str, default None
+        one of Prosumer.pv_strategies. The class default if None
     
     Return
     ----------
@@ -40,17 +43,21 @@ class Prosumer(object):
     # battery_mode is passed to the battery for consequent operation mode
     battery_mode   = 'self-consumption'   # also: 'buffer-grid' 
     # Strategy is passed to the pv system for consequent operation mode
-    pv_strategy = 'self-consumption'   # also: 'full-curtailment', 'partial-curtailment', 'reactive feed-in'
+    pv_strategy = 'self-consumption'   # also: 'curtailment'
+    pv_strategies = ('self-consumption', 'curtailment')
     # Prosumer activity can be regular or energy saving
     prosumer_profile = 'self-consumption' # also: energy-saving
 
     def __init__(self,
                 pvgen,
                 battery,
+                pv_strategy = None,
                 ):
 
         self.battery    = battery
         self.pvgen      = pvgen
+        if pv_strategy is not None:
+            self.set_pvgen_strategy(pv_strategy)
         self.recorder   = Recorder(
                                 'timestamp',
                                 'p_load',
@@ -61,7 +68,11 @@ class Prosumer(object):
                                 'p_grid_flow',
                                 'grid_status',
                                 'log',
+                                categorical = ('battery_status',
+                                               'grid_status',
+                                               'log'),
                                 )
+        self.kpi        = ProsumerKPI()     # running energy totals
 
     def get_prosumer_data(self):
         """
@@ -70,6 +81,13 @@ class Prosumer(object):
         """
         return self.recorder.get_data()
 
+    def get_kpis(self):
+        """
+        Returns a dictionary with self-consumption, autarky and the energy
+        totals of the Prosumer up to the last simulated timestep
+        """
+        return self.kpi.get_kpis()
+
     def set_battery_capacity(self, c):
         """
         init parent Battery battery capacity with desired value c in kWh
@@ -83,7 +101,7 @@ class Prosumer(object):
         characteristics. Make sure to set a power that is multiple of
         PVgen panel_peak_p attribute
         """
-        self.pvgen.installed_pv = installed_pv
+        self.pvgen.set_installed_pv_power(installed_pv)
 
     def set_prosumer_profile(self, profile):
         self.prosumer_profile = profile
@@ -93,21 +111,35 @@ class Prosumer(object):
         self.battery_mode = mode
 
     def set_pvgen_strategy(self, strategy):
+        if strategy not in self.pv_strategies:
+            raise ValueError('Unknown PV strategy %r, expected one of %s'
+                             % (strategy, ', '.join(self.pv_strategies)))
         self.pvgen.strategy = strategy
         self.pv_strategy = strategy
 
+    def set_time_axis(self, time_axis):
+        """
+        Attaches the Prosumer, PV and battery recorders to a TimeAxis shared
+        by the simulation run. Timestamps are then no longer recorded per
+        Prosumer and get_prosumer_data is indexed by the time axis
+        """
+        self.recorder.meta.pop('timestamp', None)
+        for recorder in (self.recorder, self.pvgen.recorder, self.battery.recorder):
+            recorder.set_time_axis(time_axis)
+
     def add_timestamp(self, timestamp):
         """
         Extracts the datetime string at every time step of the simulation and
         appends it to object's recorder meta dictionary of data for final call
-        to results
+        to results. Skipped if the Prosumer is attached to a shared TimeAxis
         
         Parameters
         ----------
         timestep : float, default None
             number of seconds between every time step of the simulation
         """
-        self.recorder.record(timestamp = timestamp)
+        if self.recorder.time_axis is None:
+            self.recorder.record(timestamp = timestamp)
 
     def control(self, irr_sun, p_load, timestep):
         """
@@ -132,50 +164,65 @@ class Prosumer(object):
             p_load = 0.7 * p_load
         p_flow  = p_load - p_pv
 
-        self.battery.process(p_flow, timestep)
-        self.recorder.record(p_pv   = p_pv,
-                             p_load = p_load)
+        step        = self.battery.process(p_flow, timestep)
+        p_reject    = step.p_reject
+        p_battery   = step.P
         if self.pv_strategy == 'self-consumption':
-            self.recorder.record(p_grid_flow = self.battery.recorder.meta['p_reject'][-1])
-            self.pvgen.recorder.record(p_curtail = 0)
+            p_grid      = p_reject
+            p_curtail   = 0
         elif self.pv_strategy == 'curtailment':
-            if self.battery.recorder.meta['p_reject'][-1] >= 0:
-                self.recorder.record(p_grid_flow = 0)
-                self.pvgen.recorder.record(p_curtail = self.battery.recorder.meta['p_reject'][-1])
+            if p_reject >= 0:
+                p_grid      = 0
+                p_curtail   = p_reject
             else:
-                self.recorder.record(p_grid_flow = self.battery.recorder.meta['p_reject'][-1])
-                self.pvgen.recorder.record(p_curtail = 0)
-        self.recorder.record(p_battery_flow = self.battery.recorder.meta['P'][-1],
-                             battery_SOC = self.battery.recorder.meta['battery_SOC'][-1])
-
-        if p_flow > 0 and self.battery.recorder.meta['p_reject'][-1] < 0: # battery rejects discharging
-            self.recorder.record(grid_status = -1)
-            if self.recorder.meta['p_battery_flow'][-1] == 0:
-                self.recorder.record(battery_status = 0,
-                                     log            = 'supply from grid')
+                p_grid      = p_reject
+                p_curtail   = 0
+        else: # e.g. set by a CPU behavior without set_pvgen_strategy
+            raise ValueError('Unknown PV strategy %r' % self.pv_strategy)
+        self.pvgen.recorder.record(p_curtail = p_curtail)
+        self.kpi.update(p_load, p_pv, p_battery, p_grid, p_curtail, timestep/3600)
+
+        if p_flow > 0 and p_reject < 0: # battery rejects discharging
+            grid_status = -1
+            if p_battery == 0:
+                battery_status  = 0
+                log             = 'supply from grid'
             else:
-                self.recorder.record(battery_status = -1,
-                                     log            = 'battery discharge and supply from grid')
-        elif p_flow > 0 and not self.battery.recorder.meta['p_reject'][-1]: # battery accepts discharging
-            self.recorder.record(grid_status    = 0,
-                                 battery_status = -1,
-                                 log            = 'demand satisfied by battery. No grid flow')
-        elif p_flow < 0 and self.battery.recorder.meta['p_reject'][-1] > 0: # battery rejects charging
-            self.recorder.record(grid_status = 1)
-            if self.recorder.meta['p_battery_flow'][-1] == 0:
-                self.recorder.record(battery_status = 0,
-                                     log            = 'grid feed-in')
+                battery_status  = -1
+                log             = 'battery discharge and supply from grid'
+        elif p_flow > 0 and not p_reject: # battery accepts discharging
+            grid_status     = 0
+            battery_status  = -1
+            log             = 'demand satisfied by battery. No grid flow'
+        elif p_flow < 0 and p_reject > 0: # battery rejects charging
+            grid_status = 1
+            if p_battery == 0:
+                battery_status  = 0
+                log             = 'grid feed-in'
             else:
-                self.recorder.record(battery_status = 1,
-                                     log = 'battery charge and grid feed-in')
-        elif p_flow < 0 and not self.battery.recorder.meta['p_reject'][-1]: # battery accepts charging
-            self.recorder.record(grid_status    = 0,
-                                 battery_status = 1,
-                                 log            = 'surplus absorbed by battery. No grid flow')
+                battery_status  = 1
+                log             = 'battery charge and grid feed-in'
+        elif p_flow < 0 and not p_reject: # battery accepts charging
+            grid_status     = 0
+            battery_status  = 1
+            log             = 'surplus absorbed by battery. No grid flow'
         elif not p_flow:
-            self.recorder.record(grid_status    = 0,
-                                 battery_status = 0,
-                                 log            = 'demand matches pv yield')
+            grid_status     = 0
+            battery_status  = 0
+            log             = 'demand matches pv yield'
+        else: # nan flows, which match none of the cases above
+            grid_status     = 0
+            battery_status  = 0
+            log             = 'undefined power flow'
+
+        self.recorder.record(p_pv           = p_pv,
+                             p_load         = p_load,
+                             p_grid_flow    = p_grid,
+                             p_battery_flow = p_battery,
+                             battery_SOC    = step.battery_SOC,
+                             grid_status    = grid_status,
+                             battery_status = battery_status,
+                             log            = log)
 
     def run_static_sim(self, irrad_data, load_data, timestep):
         """
@@ -232,6 +279,8 @@ class Prosumer(object):
 
 if __name__ == "__main__":
 
+    from plotting import Pyramid, plot_prosumer
+
     # ========================================================================
     # Data preparation
     # Import irradiance test data
@@ -315,63 +364,7 @@ if __name__ == "__main__":
     # ========================================================================
     # Show some results
     for val in prosumer_dict.values():
-        
-        fig, ax1 = plt.subplots(figsize=(12,12))
-    
-        ln1 = ax1.plot(val.p_load[:480], 'orange', label='load')
-        ln2 = ax1.plot(val.p_pv[:480], 'r', label='pv')
-        ln3 = ax1.plot(val.p_battery_flow[:480], 'g', label='batt')
-        ln4 = ax1.plot(val.p_grid_flow[:480], 'b', label='grid')
-        ax2 = ax1.twinx()
-        ln5 = ax2.plot(val.battery_SOC[:480], 'black', label='SOC')
-        lns = ln1+ln2+ln3+ln4+ln5
-        labs = [l.get_label() for l in lns]
-        ax1.legend(lns, labs)
-    
-        ax1.grid()
-        ax1.set_xlabel('Time', fontsize=14)
-        ax1.set_ylabel('Power flow (kW)', fontsize=14)
-        ax2.set_ylabel('Battery SOC', color='black', fontsize=14)  # we already handled the x-label with ax1
-        ax2.set_ylim(0,120)
-        # plt.title('Power flow during 1st simulated day', fontsize=18)
-        fig.tight_layout()
-        
-        fig, ax1 = plt.subplots(figsize=(12,12))
-    
-        ln1 = ax1.plot(val.p_load[480:960], 'orange', label='load')
-        ln2 = ax1.plot(val.p_pv[480:960], 'r', label='pv')
-        ln3 = ax1.plot(val.p_battery_flow[480:960], 'g', label='batt')
-        ln4 = ax1.plot(val.p_grid_flow[480:960], 'b', label='grid')
-        ax2 = ax1.twinx()
-        ln5 = ax2.plot(val.battery_SOC[480:960], 'black', label='SOC')
-        lns = ln1+ln2+ln3+ln4+ln5
-        labs = [l.get_label() for l in lns]
-        ax1.legend(lns, labs)
-    
-        ax1.grid()
-        ax1.set_xlabel('Time', fontsize=14)
-        ax1.set_ylabel('Power flow (kW)', fontsize=14)
-        ax2.set_ylabel('Battery SOC', color='black', fontsize=14)  # we already handled the x-label with ax1
-        ax2.set_ylim(0,120)
-        # plt.title('Power flow during 1st simulated day', fontsize=18)
-        fig.tight_layout()
-    
-        fig, ax1 = plt.subplots(figsize=(12,12))
-    
-        ln1 = ax1.plot(val.p_load[960:1440], 'orange', label='load')
-        ln2 = ax1.plot(val.p_pv[960:1440], 'r', label='pv')
-        ln3 = ax1.plot(val.p_battery_flow[960:1440], 'g', label='batt')
-        ln4 = ax1.plot(val.p_grid_flow[960:1440], 'b', label='grid')
-        ax2 = ax1.twinx()
-        ln5 = ax2.plot(val.battery_SOC[960:1440], 'black', label='SOC')
-        lns = ln1+ln2+ln3+ln4+ln5
-        labs = [l.get_label() for l in lns]
-        ax1.legend(lns, labs)
-    
-        ax1.grid()
-        ax1.set_xlabel('Time', fontsize=14)
-        ax1.set_ylabel('Power flow (kW)', fontsize=14)
-        ax2.set_ylabel('Battery SOC', color='black', fontsize=14)  # we already handled the x-label with ax1
-        ax2.set_ylim(0,120)
-        # plt.title('Power flow during 1st simulated day', fontsize=18)
-        fig.tight_layout()
\ No newline at end of file
+        # decimated once, then every window is drawn from the pyramid
+        pyramid = Pyramid(val)
+        for start, stop in ((0, 480), (480, 960), (960, 1440)):
+            plot_prosumer(pyramid.window(start, stop))
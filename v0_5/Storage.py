@@ -7,9 +7,30 @@ Created on Fri Feb 21 23:20:35 2020
 
 import pandas as pd
 import numpy as np
-from scipy.integrate import odeint
 import warnings
-from recorder import Recorder
+from v0_5.recorder import Recorder
+from degradation import Rainflow
+
+class BatteryStep(object):
+    """
+    Result of the last timestep processed by a battery
+
+    P : float
+        power accepted by the battery in kW (negative for charge)
+
+    p_reject : float
+        power rejected by the battery in kW (negative for grid supply)
+
+    battery_SOC : float
+        state of charge at the end of the timestep in %
+    """
+
+    __slots__ = ('P', 'p_reject', 'battery_SOC')
+
+    def __init__(self, P, p_reject, battery_SOC):
+        self.P              = P
+        self.p_reject       = p_reject
+        self.battery_SOC    = battery_SOC
 
 class BatterySimple(object):
     """
@@ -37,6 +58,7 @@ class BatterySimple(object):
     state   = None
     mode  = 'self-consumption'
     p_kw    = None
+    last    = None  # BatteryStep of last processed timestep
 
     def __init__(self,
                  battery_capacity   = 7.5,
@@ -52,7 +74,9 @@ class BatterySimple(object):
                                            'p_reject',  # rejected by battery
                                            'battery_SOC', # state of charge
                                            'log',       # occurrences
+                                           categorical = ('log',),
                                            )
+        self.rainflow           = Rainflow()            # cycle counting and wear
         if self.battery_capacity < 0:
             raise AttributeError('Battery capacity cannot be a negative number')
 
@@ -60,22 +84,23 @@ class BatterySimple(object):
         """
         Returns the battery state of charge in %
         """
-        if not self.recorder.meta['battery_SOC']:
+        if self.last is None:
             return self.initial_SOC
         else:
-            return self.recorder.meta['battery_SOC'][-1]
+            return self.last.battery_SOC
 
     def get_battery_state(self):
         """
         Returns the current state of a battery instance as a string log
         """
-        if self.get_battery_soc() == 100:
+        soc = self.get_battery_soc()
+        if soc == 100:
             self.state = 'Fully charged'
             return self.state
-        elif self.get_battery_soc() == 0:
+        elif soc == 0:
             self.state = 'Depleted'
             return self.state
-        elif (self.get_battery_soc()>0) and (self.get_battery_soc()<100):
+        elif (soc>0) and (soc<100):
             self.state = 'Operational'
             return self.state
 
@@ -88,6 +113,18 @@ class BatterySimple(object):
         """
         return self.recorder.get_data()
 
+    def get_battery_cycles(self):
+        """
+        Returns pandas series of rainflow cycles per depth of discharge bin
+        """
+        return self.rainflow.get_histogram()
+
+    def get_battery_soh(self):
+        """
+        Returns the estimated state of health in % of nominal capacity
+        """
+        return self.rainflow.get_soh()
+
     def get_battery_capacity(self):
         """
         Returns the battery capacity in kWh
@@ -160,7 +197,11 @@ class BatterySimple(object):
         """
         Populates an object's recorder meta dictionary with data comming from
         the power flow through the battery after BMS filtering
+
+        Returns the BatteryStep of the processed timestep
         """
+        if self.last is None:
+            self.rainflow.update(self.initial_SOC)
         self.p_kw               = p_kw
         h                       = timestep/3600
         c                       = self.battery_capacity
@@ -169,44 +210,54 @@ class BatterySimple(object):
         if p_acc > 0: # discharge battery
             if Q < 0:
                 self.state = 'Depleted'
-                self.recorder.record(
-                                    p_reject    = Q/h,      # rejected negative power (negative for grid)
-                                    P           = (c*soc/100)/h,
-                                    battery_SOC = 0,
-                                    log         = 'discharged, depleted',
-                                    )
+                step = BatteryStep(
+                                   p_reject    = Q/h,      # rejected negative power (negative for grid)
+                                   P           = (c*soc/100)/h,
+                                   battery_SOC = 0,
+                                   )
+                log  = 'discharged, depleted'
             elif Q >= 0:
                 self.state = 'Operational'
-                self.recorder.record(
-                                    p_reject    = p_rej,    # rejected negative power (negative for grid)
-                                    P           = p_acc,
-                                    battery_SOC = Q/c*100,
-                                    log         = 'discharging',
-                                    )
+                step = BatteryStep(
+                                   p_reject    = p_rej,    # rejected negative power (negative for grid)
+                                   P           = p_acc,
+                                   battery_SOC = Q/c*100,
+                                   )
+                log  = 'discharging'
         elif p_acc < 0: # charge battery
             if Q > c:
                 self.state = 'Fully charged'
-                self.recorder.record(
-                                    p_reject    = (Q-c)/h,          # rejected positive power (positive for grid)
-                                    P           = -c*(1-soc/100)/h, # accepted negative power (charge)
-                                    battery_SOC = 100,
-                                    log         = 'charged, fully charged',
-                                    )
+                step = BatteryStep(
+                                   p_reject    = (Q-c)/h,          # rejected positive power (positive for grid)
+                                   P           = -c*(1-soc/100)/h, # accepted negative power (charge)
+                                   battery_SOC = 100,
+                                   )
+                log  = 'charged, fully charged'
             elif Q <= c:
                 self.state = 'Operational'
-                self.recorder.record(
-                                    p_reject    = p_rej,      # rejected positive power (positive for grid)
-                                    P           = p_acc,      # accepted negative power (charge)
-                                    battery_SOC = Q/c*100,
-                                    log         = 'charging',
-                                    )
+                step = BatteryStep(
+                                   p_reject    = p_rej,      # rejected positive power (positive for grid)
+                                   P           = p_acc,      # accepted negative power (charge)
+                                   battery_SOC = Q/c*100,
+                                   )
+                log  = 'charging'
         elif not p_acc: # no flow in/out battery
-            self.recorder.record(
-                                p_reject    = p_rej,      # rejected positive power (positive for grid)
-                                P           = p_acc,      # accepted negative power (charge)
-                                battery_SOC = soc,
-                                log         = 'No power flow through battery',
-                                )
+            step = BatteryStep(
+                               p_reject    = p_rej,      # rejected positive power (positive for grid)
+                               P           = p_acc,      # accepted negative power (charge)
+                               battery_SOC = soc,
+                               )
+            log  = 'No power flow through battery'
+
+        self.last = step
+        self.rainflow.update(step.battery_SOC)
+        self.recorder.record(
+                             P           = step.P,
+                             p_reject    = step.p_reject,
+                             battery_SOC = step.battery_SOC,
+                             log         = log,
+                             )
+        return step
 
 class Battery(object):
 
@@ -214,13 +265,26 @@ class Battery(object):
     mode      = 'self-consumption'
     overload    = False # boolean
     p_kw        = None  # float
+    last        = None  # BatteryStep of last processed timestep
+
+    # Two RC elements (parallel connection of resistor and capacitor):
+    # represent electrochemical reactions in each electrode of the cell
+    r1          = 0.078 # Resistance of first RC element [Ohm]
+    r2          = 0.078 # Resistance of second RC element [Ohm]
+    c1          = 2     # Capacity of first RC element [Ah]
+    c2          = 2     # Capacity of second RC element [Ah]
+    rs          = 0.078 # Serial resistance [Ohm]: ohmic resistance of cell
 
     def __init__(self, battery_capacity=7.5, initial_SOC=100, min_max_SOC=(0,100),
-                 cn=2.55, vn=3.7, dco=3.0, cco=4.2, max_c_rate=10):
+                 cn=2.55, vn=3.7, dco=3.0, cco=4.2, max_c_rate=10, max_dsoc=2.):
 
         """
         Default properties of battery cell: Li-ion CGR18650E Panasonic
 
+        max_dsoc (float): maximum change of SOC in % within a sub-step of
+        the integration of a timestep. The cell current is updated to the
+        cell voltage at every sub-step. With the default, 60 s timesteps
+        below 1.2 C are integrated in a single step
         """
 
         self.battery_capacity   = battery_capacity  # Capacity of battery [kWh]
@@ -231,6 +295,7 @@ class Battery(object):
         self.dco                = dco               # discharge cut-off [V]
         self.cco                = cco               # charge cut-off [V]
         self.max_c_rate         = max_c_rate        # determines max allowed current
+        self.max_dsoc           = max_dsoc          # max SOC change per sub-step [%]
         self.recorder           = Recorder(
                                     'P',            # Store Power accepted by battery [kW]
                                     'p_reject',     # Store Power rejected by battery [kW]
@@ -240,6 +305,7 @@ class Battery(object):
                                     'Vcell',        # Store cell voltage [V]
                                     'battery_SOC',  # Store cell SOC [%]
                                     )
+        self.rainflow           = Rainflow()        # cycle counting and wear
         
         self.ncells = self.battery_capacity/(self.cn*self.vn)*1000 # number of cells in battery pack
 
@@ -276,19 +342,20 @@ class Battery(object):
     # =========================================================================
 
     def get_battery_soc(self):
-        if not self.recorder.meta['battery_SOC']:
+        if self.last is None:
             return self.initial_SOC
         else:
-            return self.recorder.meta['battery_SOC'][-1]
+            return self.last.battery_SOC
 
     def get_battery_state(self):
-        if self.get_battery_soc() == 100:
+        soc = self.get_battery_soc()
+        if soc == 100:
             self.state = 'Fully charged'
             return self.state
-        elif self.get_battery_soc() == 0:
+        elif soc == 0:
             self.state = 'Depleted'
             return self.state
-        elif (self.get_battery_soc() > 0) and (self.get_battery_soc() < 100):
+        elif (soc > 0) and (soc < 100):
             if self.state == 'Stand-by':
                 return self.state
             else:
@@ -322,6 +389,12 @@ class Battery(object):
     def get_battery_data(self):
         return self.recorder.get_data()
 
+    def get_battery_cycles(self):
+        return self.rainflow.get_histogram()
+
+    def get_battery_soh(self):
+        return self.rainflow.get_soh()
+
     def get_battery_number_of_li_ion_cells(self):
         if not isinstance(self.ncells, int):
             warnings.warn('Number of cells is an approximation. Chosen battery ' +
@@ -438,13 +511,7 @@ class Battery(object):
 
         """
 
-        # CONSTANT PARAMETERS
-        # Two RC elements (parallel connection of resistor and capacitor):
-        # represent electrochemical reactions in each electrode of the cell
-        r1 = 0.078   # Resistance of first RC element [Ohm]
-        r2 = 0.078   # Resistance of second RC element [Ohm]
-        c1 = 2       # Capacity of first RC element [Ah]
-        c2 = 2       # Capacity of second RC element [Ah]
+        r1, r2, c1, c2 = self.r1, self.r2, self.c1, self.c2
 
         # Vector of differentiable variables
         Q, v1, v2, = y
@@ -459,18 +526,62 @@ class Battery(object):
 
         return dydt
 
+    def integrate(self, Qo, v1o, v2o, v_cell, icell, p_acc, timestep):
+        """
+        Integrates the equivalent circuit model over timestep seconds.
+        With a constant cell current the charge is linear in time and each
+        RC voltage relaxes exponentially, so every sub-step is solved
+        exactly. The timestep is split into as many sub-steps as needed to
+        keep the SOC change of each about below max_dsoc. The current of
+        each sub-step is p_acc over the cell voltage at the end of the
+        previous one, as icell does for the timestep, and is checked
+        against max_c_rate. The cost depends on the SOC swing of the
+        timestep, not on its length in seconds
+
+        Returns Q, V1, V2, Vcell at the end of the timestep and the number
+        of seconds the cell operated before reaching full charge or
+        depletion or an overload, or None if none of them happened
+        """
+        q_max   = self.cn * 3600
+        active  = self.state == 'Operational' and icell != 0
+        n       = 1
+        if active:
+            n   = max(1, int(np.ceil(abs(icell)*timestep/q_max*100/self.max_dsoc)))
+        h       = timestep/n
+        e1      = np.exp(-h/(self.r1*self.c1))
+        e2      = np.exp(-h/(self.r2*self.c2))
+        Q, v1, v2, i = Qo, v1o, v2o, icell
+        for k in range(n):
+            if active and k:
+                i = p_acc/v_cell
+                if abs(i) > self.cn * self.max_c_rate:
+                    self.overload   = True
+                    self.state      = 'Stand-by'
+                    return Q, v1, v2, v_cell, k*h
+            q   = Q - i*h
+            if q > q_max or q < 0:
+                # analytic crossing time of the SOC bound within the sub-step
+                bound = q_max if q > q_max else 0
+                return bound, 0, 0, (self.cco if bound else self.dco), k*h + (Q - bound)/i
+            v1  = i*self.r1 + (v1 - i*self.r1)*e1
+            v2  = i*self.r2 + (v2 - i*self.r2)*e2
+            Q   = q
+            if active:
+                v_cell = self.cco - (1.2 - Q/q_max) - v1 - v2 - i*self.rs
+        return Q, v1, v2, v_cell, None
+
     def process(self, p_kw, timestep):
 
         """
-        timestep is needed in seconds -> timesteps of more than 1 hour
-        may hinder the model of the physical process
+        timestep is needed in seconds. Coarse timesteps (15 minutes, 1
+        hour) are integrated in adaptive sub-steps, see integrate
         """
 
+        if self.last is None:
+            self.rainflow.update(self.initial_SOC)
         self.p_kw = p_kw
         if p_kw == 0:
             self.state = 'Stand-by'
-        rs = 0.078          # Serial resistance [Ohm]: ohmic resistance of cell
-        t  = np.linspace(1, timestep, timestep)
 
         if not self.recorder.meta['battery_SOC']:
             Qo     = self.cn*self.get_battery_soc()/100 * 3600      # initial condition for Q
@@ -483,7 +594,7 @@ class Battery(object):
             if not self.recorder.meta['battery_SOC']:
                 v_cell = self.cco - (1.2 - Qo/(self.cn * 3600))
             else:
-                v_cell = self.meta['Vcell'][-1]
+                v_cell = self.recorder.meta['Vcell'][-1]
         else:
             v1o    = self.recorder.meta['V1'][-1] # initial condition for V1
             v2o    = self.recorder.meta['V2'][-1] # initial condition for V2
@@ -492,42 +603,25 @@ class Battery(object):
         p_w             = p_kw*1000
         p_acc, p_rej    = self.bms(v_cell, p_w, Qo)
         icell           = self.icell(p_acc, v_cell)
-        y0              = Qo, v1o, v2o
-        args            = (icell,)
-        sol             = odeint(self.cell_voltage, y0, t, args)
-        Qt, v1t, v2t    = sol[:,0], sol[:,1], sol[:,2]
-        soct            = Qt / (self.cn * 3600)
-        vs              = icell * rs
-        if self.state == 'Operational':
-            vot             = self.cco - (1.2 - soct)
-            v_cell          = vot - v1t - v2t - vs
-        else:
-            v_cell      = [v_cell]
-        if self.state in ['Fully charged', 'Depleted'] or self.overload:
-            sec         = 0
-        else:
-            sec         = timestep
-
-        if np.max(soct) > 1.:
-            sec     = [i for (i,j) in enumerate(soct) if j > 1.][0]
-            v_cell  = [self.cco]
-            Qt      = [self.cn*3600]
-            v1t     = [0]
-            v2t     = [0]
-            soct    = [1.]
-        elif np.min(soct) < 0.:
-            sec     = [i for (i,j) in enumerate(soct) if j < 0.][0]
-            v_cell  = [self.dco]
-            Qt      = [0]
-            v1t     = [0]
-            v2t     = [0]
-            soct    = [0.]
+        Qt, v1t, v2t, v_cell, sec = self.integrate(Qo, v1o, v2o, v_cell, icell, p_acc, timestep)
+        if sec is None:
+            if self.state in ['Fully charged', 'Depleted'] or self.overload:
+                sec     = 0
+            else:
+                sec     = timestep
         # Store data
-        self.recorder.record(P              = sec/timestep*p_acc*self.ncells/1000,
-                             p_reject       = -p_acc/1000*(1-sec/timestep) + p_rej/1000,
-                             Q              = Qt[-1],
-                             V1             = v1t[-1],
-                             V2             = v2t[-1],
-                             Vcell          = v_cell[-1],
-                             battery_SOC    = soct[-1]*100,
-                            )
\ No newline at end of file
+        step = BatteryStep(P              = sec/timestep*p_acc*self.ncells/1000,
+                           p_reject       = -p_acc/1000*(1-sec/timestep) + p_rej/1000,
+                           battery_SOC    = Qt/(self.cn * 3600)*100,
+                           )
+        self.last = step
+        self.rainflow.update(step.battery_SOC)
+        self.recorder.record(P              = step.P,
+                             p_reject       = step.p_reject,
+                             Q              = Qt,
+                             V1             = v1t,
+                             V2             = v2t,
+                             Vcell          = v_cell,
+                             battery_SOC    = step.battery_SOC,
+                            )
+        return step
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 15:22:48 2026
+
+@author: Seta
+"""
+
+import numpy as np
+import pandas as pd
+
+def timestep_hours(index):
+    """
+    Returns the time step in hours of a result matrix index. 1 if the
+    index does not hold timestamps
+    """
+    if isinstance(index, pd.DatetimeIndex) and len(index) > 1:
+        return float(np.median(np.diff(index.asi8))) / 3.6e12
+    return 1.
+
+def run_length_events(values, upper=None, lower=None, kind='violation'):
+    """
+    Finds every event in which an element of a (time x element) result
+    matrix is at or above upper (or at or below lower) with a single
+    vectorized run-length encoding of the whole matrix
+
+    Parameters
+    ----------
+    values : pandas DataFrame
+        (time x element) matrix, e.g. vm_pu or th_overload of a run
+
+    upper : float, default None
+        samples at or above upper are violations
+
+    lower : float, default None
+        samples at or below lower are violations. Only used if upper is None
+
+    kind : str, default 'violation'
+        label of the events found
+
+    Returns
+    -------
+    pandas DataFrame
+        one row per event with its element, start and end timestamps,
+        number of timesteps, duration in hours, maximum excess over the
+        limit and excess integrated over time (unit x h)
+    """
+    x           = values.values.T.astype(float)     # element x time
+    n_el, n_t   = x.shape
+    if upper is not None:
+        excess  = x - upper
+    else:
+        excess  = lower - x
+    mask        = excess >= 0
+    padded      = np.zeros((n_el, n_t + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask
+    d           = np.diff(padded, axis=1)
+    el, start   = np.nonzero(d == 1)
+    _, end      = np.nonzero(d == -1)               # exclusive
+
+    flat        = np.append(np.where(mask, excess, 0.).ravel(), 0.)
+    s, e        = el * n_t + start, el * n_t + end
+    if len(s):
+        max_excess  = np.maximum.reduceat(flat, np.ravel([s, e], order='F'))[::2]
+    else:
+        max_excess  = np.zeros(0)
+    cum         = np.concatenate([[0.], np.cumsum(flat[:-1])])
+    h           = timestep_hours(values.index)
+
+    return pd.DataFrame({
+                         'kind'         : kind,
+                         'element'      : values.columns.values[el],
+                         'start'        : values.index.values[start],
+                         'end'          : values.index.values[end - 1],
+                         'n_steps'      : end - start,
+                         'duration_h'   : (end - start) * h,
+                         'max_excess'   : max_excess,
+                         'excess_h'     : (cum[e] - cum[s]) * h,
+                         })
+
+def voltage_events(vm_pu, vm_max=1.03, vm_min=0.97):
+    """
+    Returns the overvoltage and undervoltage events of every bus of a
+    (time x bus) vm_pu matrix
+    """
+    return pd.concat([run_length_events(vm_pu, upper=vm_max, kind='overvoltage'),
+                      run_length_events(vm_pu, lower=vm_min, kind='undervoltage')],
+                     ignore_index=True)
+
+def overload_events(th_overload, loading_max=80):
+    """
+    Returns the thermal overload events of every line of a (time x line)
+    loading_percent matrix
+    """
+    return run_length_events(th_overload, upper=loading_max, kind='thermal_overload')
+
+def summarize_events(events):
+    """
+    Returns number of events, total and longest duration in hours, first
+    start and worst excess per kind of event and element
+    """
+    return events.groupby(['kind', 'element']).agg(
+                                                   events     = ('n_steps', 'size'),
+                                                   duration_h = ('duration_h', 'sum'),
+                                                   longest_h  = ('duration_h', 'max'),
+                                                   first      = ('start', 'min'),
+                                                   max_excess = ('max_excess', 'max'),
+                                                   excess_h   = ('excess_h', 'sum'),
+                                                   )
+
+def slack_energy(slack_p, p_max):
+    """
+    Energy-not-served style metrics of the power exchanged with the
+    external grid in MWh: imported, exported, and imported / exported
+    beyond p_max (e.g. the transformer rating)
+    """
+    p   = slack_p.values.sum(axis=1)
+    h   = timestep_hours(slack_p.index)
+    return pd.Series({
+                      'e_import'            : np.clip(p, 0, None).sum() * h,
+                      'e_export'            : np.clip(-p, 0, None).sum() * h,
+                      'e_import_over_limit' : np.clip(p - p_max, 0, None).sum() * h,
+                      'e_export_over_limit' : np.clip(-p - p_max, 0, None).sum() * h,
+                      })
+
+def curtailed_energy(results):
+    """
+    Returns the pv energy curtailed by every Prosumer of a
+    NeighborhoodResults cube in kWh, energy that was not delivered to the
+    grid in order to keep it within limits
+    """
+    h = timestep_hours(results.time)
+    return results.variable('p_curtail').sum() * h
+
+def violation_report(vm_pu, th_overload, slack_p=None, vm_max=1.03, vm_min=0.97,
+                     loading_max=80, p_max=None):
+    """
+    Post-run analysis of the grid result matrices of a run
+
+    Returns
+    -------
+    tuple
+        (events DataFrame, per element summary DataFrame, slack energy
+        Series or None)
+    """
+    events  = pd.concat([voltage_events(vm_pu, vm_max, vm_min),
+                         overload_events(th_overload, loading_max)],
+                        ignore_index=True)
+    energy  = None
+    if slack_p is not None:
+        energy = slack_energy(slack_p, np.inf if p_max is None else p_max)
+    return events, summarize_events(events), energy
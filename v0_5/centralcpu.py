@@ -5,7 +5,10 @@ Created on Tue Apr 14 20:21:57 2020
 @author: Seta
 """
 
+import numpy as np
 from v0_5.recorder import Recorder
+from v0_5.gridstats import RollingWindow
+from v0_5.pflow import injection_vector, sensitivity_matrices
 
 class CPU(object):
     """
@@ -15,47 +18,176 @@ class CPU(object):
         vm_pu : voltage of the buses in per-unit
         loading_percent: thermal overload of lines
         ext_grid.p_mw : slack power of the grid
+
+    use_sensitivities : bool, default False
+        if True, the voltage and loading sensitivities of the grid are used
+        to predict the effect of switching the behavior of each prosumer,
+        and only the prosumers needed to clear an overvoltage or thermal
+        overload are switched. The sensitivities are read from the Jacobian
+        of the last power flow, which must be solved at every timestep
+
+    sensitivity_tol : float, default 1e-3
+        change of any load injection in MW since the sensitivities were
+        built after which they are rebuilt
+
+    Checks read online rolling statistics of the grid (see gridstats)
+    kept per bus, line and slack, which are updated once per call to
+    check_net
     """
-    def __init__(self):
+
+    vm_max          = 1.03      # pu
+    vm_min          = 0.97      # pu
+    loading_max     = 80        # %, on the rolling mean loading
+    slack_p_max     = None      # MW, rated power of the transformers if None
+    stats_window    = 10        # timesteps of the rolling statistics
+    persistence     = 1         # timesteps a voltage or slack violation must last
+    # parameters that set_policy accepts
+    policy_parameters = ('vm_max', 'vm_min', 'loading_max', 'slack_p_max',
+                         'persistence', 'behaviors')
+    # prosumer attributes set by switch_behavior for every risk
+    behaviors       = {
+        'overvoltage'       : {
+            'battery_mode'      : 'self-consumption', # or 'buffer-grid' with min_max_SOC = (0, 80) or (0, 75) from beforehand. min_SOC=0 to allow full discharge of battery without penalizatin
+            'pv_strategy'       : 'curtailment',      # avoid feed-in of active power
+            },
+        'undervoltage'      : {
+            'battery_mode'      : 'buffer-grid',      # with min_max_SOC=(20, 80) or (25, 75) because we need to consume from grid or feed into it. Even 'battery-bypass'
+            'pv_strategy'       : 'self-consumption', # allow full feed-in if available
+            },
+        'thermal_overload'  : {
+            'battery_mode'      : 'self-consumption', # allow full charge/discharge without penalization because we need to reduce consumption from grid
+            'pv_strategy'       : 'curtailment',      # avoid feed-in
+            'prosumer_profile'  : 'energy-saving',
+            },
+        'to_default'        : {
+            'battery_mode'      : 'self-consumption', # back to default
+            'pv_strategy'       : 'self-consumption', # back to default
+            'prosumer_profile'  : 'self-consumption', # back to default
+            },
+        }
+
+    def __init__(self, use_sensitivities=False, sensitivity_tol=1e-3):
 
         self.recorder = Recorder('overvoltage',
                                  'undervoltage',
                                  'thermal_overload',
                                  'slack_power',
                                  )
+        self.use_sensitivities  = use_sensitivities
+        self.sensitivity_tol    = sensitivity_tol
+        self.sensitivities      = None  # (dvm_dp, dloading_dp) DataFrames
+        self._sens_x            = None  # injections sensitivities were built at
+        self.switched           = {}    # prosumer -> risk it was switched for
+        self.stats              = None  # RollingWindow per monitored quantity
+
+    def set_time_axis(self, time_axis):
+        """
+        Attaches the CPU recorder to a TimeAxis shared by the simulation run
+        """
+        self.recorder.set_time_axis(time_axis)
+
+    def get_cpu_data(self):
+        """
+        Returns pandas dataframe composed by object's recorder meta dictionary
+        of data
+        """
+        return self.recorder.get_data()
+
+    def set_policy(self, **policy):
+        """
+        Sets CPU thresholds (vm_max, vm_min, loading_max, slack_p_max,
+        persistence) and behaviors of this instance. behaviors is merged
+        into the current behaviors per risk, e.g.
+        behaviors={'overvoltage': {'battery_mode': 'buffer-grid'}} only
+        changes the battery mode commanded on overvoltage. The thresholds
+        of rolling statistics already running are updated as well
+        """
+        for attr in policy:
+            if attr not in self.policy_parameters:
+                raise AttributeError('CPU has no policy parameter %s' % attr)
+        behaviors = policy.pop('behaviors', None)
+        if behaviors is not None:
+            merged = {risk: dict(b) for risk, b in self.behaviors.items()}
+            for risk, b in behaviors.items():
+                merged.setdefault(risk, {}).update(b)
+            self.behaviors = merged
+        for attr, value in policy.items():
+            setattr(self, attr, value)
+        if self.stats is not None:
+            vm, ld, sl = self.stats['vm_pu'], self.stats['loading_percent'], self.stats['slack_p']
+            vm.above.threshold, vm.below.threshold = self.vm_max, self.vm_min
+            ld.above.threshold = self.loading_max
+            if self.slack_p_max is not None:
+                sl.above.threshold, sl.below.threshold = self.slack_p_max, -self.slack_p_max
+
+    def update_stats(self, net):
+        """
+        Adds the current power flow results of net to the rolling
+        statistics of bus voltages, line loadings and slack power
+        """
+        if self.stats is None:
+            slack_p_max = self.slack_p_max
+            if slack_p_max is None:
+                slack_p_max = net.trafo.sn_mva.sum() if len(net.trafo) else np.inf
+            self.stats = {
+                          'vm_pu'           : RollingWindow(net.bus.index, self.stats_window,
+                                                            upper=self.vm_max, lower=self.vm_min),
+                          'loading_percent' : RollingWindow(net.line.index, self.stats_window,
+                                                            upper=self.loading_max),
+                          'slack_p'         : RollingWindow(net.ext_grid.index, self.stats_window,
+                                                            upper=slack_p_max, lower=-slack_p_max),
+                          }
+        self.stats['vm_pu'].update(net.res_bus.vm_pu.values)
+        self.stats['loading_percent'].update(net.res_line.loading_percent.values)
+        self.stats['slack_p'].update(net.res_ext_grid.p_mw.values)
+
+    def get_grid_stats(self, quantity):
+        """
+        Returns pandas dataframe with the rolling statistics and exceedance
+        durations of every element of quantity: 'vm_pu', 'loading_percent'
+        or 'slack_p'
+        """
+        return self.stats[quantity].get_data()
+
+    def overvoltage_buses(self):
+        return np.flatnonzero(self.stats['vm_pu'].above.run >= self.persistence)
+
+    def undervoltage_buses(self):
+        return np.flatnonzero(self.stats['vm_pu'].below.run >= self.persistence)
+
+    def overloaded_lines(self):
+        return np.flatnonzero(self.stats['loading_percent'].mean >= self.loading_max)
 
     def check_overvoltage(self, net):
         """
-        CPU Recorder records 1, if overvoltage is found at any bus of
-        any line, or 0, if no overvoltage is found
+        CPU Recorder records 1, if overvoltage has lasted persistence
+        timesteps at any bus, or 0 otherwise
         """
-        if not net.res_bus.query('vm_pu >= 1.03').vm_pu.any():
-            self.recorder.record(overvoltage=0)
-        else:
-            self.recorder.record(overvoltage=1)
+        self.recorder.record(overvoltage=int(len(self.overvoltage_buses()) > 0))
 
     def check_undervoltage(self, net):
         """
-        CPU Recorder records 1, if undervoltage is found at any bus of
-        any line, or 0, if no undervoltage is found
+        CPU Recorder records 1, if undervoltage has lasted persistence
+        timesteps at any bus, or 0 otherwise
         """
-        if not net.res_bus.query('vm_pu <= 0.97').vm_pu.any():
-            self.recorder.record(undervoltage=0)
-        else:
-            self.recorder.record(undervoltage=1)
+        self.recorder.record(undervoltage=int(len(self.undervoltage_buses()) > 0))
 
     def check_thermal_overload(self, net):
         """
-        CPU Recorder records 1, if thermal overload is found at any line,
-        or 0, if no thermal overload is found
+        CPU Recorder records 1, if the rolling mean loading of any line
+        reaches loading_max, or 0 otherwise
         """
-        if not net.res_line.query('loading_percent >= 0.8').loading_percent.any():
-            self.recorder.record(thermal_overload=0)
-        else:
-            self.recorder.record(thermal_overload=1)
+        self.recorder.record(thermal_overload=int(len(self.overloaded_lines()) > 0))
 
     def check_slack_bus_power(self, net):
-        self.recorder.record(slack_power=0)
+        """
+        CPU Recorder records 1, if the power exchanged with the external
+        grid has exceeded slack_p_max in either direction for persistence
+        timesteps, or 0 otherwise
+        """
+        stats = self.stats['slack_p']
+        run   = np.maximum(stats.above.run, stats.below.run)
+        self.recorder.record(slack_power=int((run >= self.persistence).any()))
 
     def recursive_net_search(self, net, lines):
         """
@@ -93,34 +225,32 @@ class CPU(object):
 
         risks = {}
         if flags['overvoltage']:
-            buses = net.res_bus.query('vm_pu >= 1.03').vm_pu.index.tolist()
+            buses = net.bus.index[self.overvoltage_buses()].tolist()
             ov_in_bus = net.bus.loc[buses, 'name'].tolist()
             risks['overvoltage'] = ov_in_bus
             # ov_bus_to_default = set(net.bus.index.tolist()).difference([*ov_in_bus])
 
         if flags['undervoltage']:
-            buses = net.res_bus.query('vm_pu <= 0.97').vm_pu.index.tolist()
+            buses = net.bus.index[self.undervoltage_buses()].tolist()
             uv_in_bus = net.bus.loc[buses, 'name'].tolist()
             risks['undervoltage'] = uv_in_bus
             # uv_bus_to_default = set(net.bus.index.tolist()).difference([*uv_in_bus])
 
         if flags['thermal_overload']:
-            lines = net.res_line.query('loading_percent >= 80').loading_percent.index.tolist()
+            lines = net.line.index[self.overloaded_lines()].tolist()
             # self.recursive_net_search(net, lines)
             buses = net.line.loc[lines, 'to_bus'].tolist()
             tho_due_to_buses = net.bus.loc[buses, 'name'].tolist()
             risks['thermal_overload'] = tho_due_to_buses
             # tho_bus_to_default = set(net.bus.index.tolist()).difference([*tho_due_to_buses])
 
-        if flags['slack_power']:
-            pass
+        # the slack power flag is only recorded, it commands no prosumer
+        # behavior and does not hold prosumers off their default
 
-        else:
-            bus_with_risk = []
-            for _, buses in risks.items():
-                bus_with_risk.append(buses)
-            prosumers_to_default = set(net.load.bus.tolist()).difference(*bus_with_risk)
-            risks['to_default'] = net.bus.loc[prosumers_to_default, 'name'].tolist()
+        # risks hold bus names, prosumer buses are compared by name
+        bus_with_risk = set().union(*risks.values())
+        load_buses = dict.fromkeys(net.bus.loc[net.load.bus, 'name'])
+        risks['to_default'] = [b for b in load_buses if b not in bus_with_risk]
 
         return risks
 
@@ -146,30 +276,93 @@ class CPU(object):
         has been found to switch their behavior in order to better operate
         the grid
         """
+        behavior = self.behaviors.get(risk, {})
+        for p in prosumers:
+            for attr, value in behavior.items():
+                setattr(neighborhood[p], attr, value)
+
+    def update_sensitivities(self, net):
+        """
+        Builds the voltage and loading sensitivity matrices at the current
+        operating point of net from its power flow Jacobian. They are kept
+        until any load injection moves more than sensitivity_tol
+        """
+        x = injection_vector(net)
+        if self._sens_x is None or len(x) != len(self._sens_x) or \
+           np.max(np.abs(x - self._sens_x)) > self.sensitivity_tol:
+            self.sensitivities  = sensitivity_matrices(net)
+            self._sens_x        = x
+        return self.sensitivities
+
+    def intervention_effect(self, risk, prosumer):
+        """
+        Returns the change of active power injection in MW that switching
+        a prosumer to the behavior commanded for risk causes, with respect
+        to its default behavior, from its last recorded step. Only the
+        pv curtailment and energy saving of overvoltage and thermal
+        overload are scored, 0 otherwise
+        """
+        p_grid      = prosumer.recorder.meta['p_grid_flow'][-1]
+        p_curtail   = prosumer.pvgen.recorder.meta['p_curtail'][-1]
+        p_load      = prosumer.recorder.meta['p_load'][-1]
+        feed_in     = max(p_grid, 0) + p_curtail
         if risk == 'overvoltage':
-            for p in prosumers:
-                neighborhood[p].battery_mode = 'self-consumption' # or 'buffer-grid' with min_max_SOC = (0, 80) or (0, 75) from beforehand. min_SOC=0 to allow full discharge of battery without penalizatin
-                neighborhood[p].pv_strategy = 'curtailment' # avoid feed-in of active power
-        elif risk == 'undervoltage':
-            for p in prosumers:
-                neighborhood[p].battery_mode = 'buffer-grid' # with min_max_SOC=(20, 80) or (25, 75) because we need to consume from grid or feed into it. Even 'battery-bypass'
-                neighborhood[p].pv_strategy = 'self-consumption' # allow full feed-in if available
+            # curtailment removes the feed-in
+            return -feed_in/1000
         elif risk == 'thermal_overload':
-            for p in prosumers:
-                neighborhood[p].battery_mode = 'self-consumption' # allow full charge/discharge without penalization because we need to reduce consumption from grid
-                neighborhood[p].pv_strategy = 'curtailment' # avoid feed-in
-                neighborhood[p].prosumer_profile = 'energy-saving' # back to default
-        elif risk == 'to_default':
-            for p in prosumers:
-                neighborhood[p].battery_mode = 'self-consumption' # back to default
-                neighborhood[p].pv_strategy = 'self-consumption' # back to default
-                neighborhood[p].prosumer_profile = 'self-consumption' # back to default
+            # curtailment removes the feed-in, energy-saving up to 30 % of
+            # the default load, as far as it was supplied from the grid
+            if prosumer.prosumer_profile == 'energy-saving':
+                saving          = p_load*0.3/0.7
+                default_import  = max(-p_grid, 0) + saving
+            else:
+                saving          = 0.3*p_load
+                default_import  = max(-p_grid, 0)
+            return (-feed_in + min(saving, default_import))/1000
+        return 0.
+
+    def select_prosumers(self, risk, net, neighborhood):
+        """
+        Scores switching every prosumer of the neighborhood for risk with
+        the sensitivity matrices and greedily picks the fewest prosumers
+        whose predicted effect clears the risk. Returns None if the
+        predicted effects cannot clear it
+        """
+        dvm_dp, dld_dp  = self.update_sensitivities(net)
+        if risk == 'overvoltage':
+            values, sens, limit, sign = net.res_bus.vm_pu.values, dvm_dp, self.vm_max, 1
+        elif risk == 'thermal_overload':
+            values, sens, limit, sign = self.stats['loading_percent'].mean, dld_dp, self.loading_max, 1
+
+        bus_of          = dict(zip(net.bus.name, net.bus.index))
+        names           = [p for p in neighborhood if p in bus_of]
+        # predicted change of every monitored element for each prosumer
+        delta           = np.column_stack([
+                            sens[bus_of[p]].values * self.intervention_effect(risk, neighborhood[p])
+                            for p in names]) if names else np.zeros((len(values), 0))
+        # operating point if every prosumer switched for this risk reverted
+        reverted        = [k for k, p in enumerate(names) if self.switched.get(p) == risk]
+        x               = values - delta[:, reverted].sum(axis=1)
+
+        selected        = []
+        excess          = np.maximum(sign*(x - limit), 0).sum()
+        while excess > 0:
+            after       = np.maximum(sign*(x[:, None] + delta - limit), 0).sum(axis=0)
+            after[selected] = np.inf
+            k           = int(np.argmin(after))
+            if not after[k] < excess:
+                return None
+            selected.append(k)
+            x           = x + delta[:, k]
+            excess      = after[k]
+        return [names[k] for k in selected]
 
     def check_net(self, net):
         """
         Returns a binary list of the las occurrence with 1 or 0 whether
         a certain operational risk is found or not
         """
+        self.update_stats(net)
         self.check_overvoltage(net)
         self.check_undervoltage(net)
         self.check_thermal_overload(net)
@@ -195,6 +388,34 @@ class CPU(object):
             pass
         else:
             risks = self.risk_identifier(net, flags)
-            for risk, prosumers in risks.items():
-                # prosumers = self.prosumers_to_intervene(neighbodhood, val)
+            if self.use_sensitivities:
+                risks = self.predict_interventions(net, neighbodhood, risks)
+            for risk, buses in risks.items():
+                # risks may list buses without prosumers (e.g. the slack bus)
+                prosumers = self.prosumers_to_intervene(neighbodhood, buses)
                 self.switch_behavior(risk, neighbodhood, prosumers)
+                for p in prosumers:
+                    if risk == 'to_default':
+                        self.switched.pop(p, None)
+                    else:
+                        self.switched[p] = risk
+
+    def predict_interventions(self, net, neighborhood, risks):
+        """
+        Narrows the prosumers of an overvoltage or thermal overload down to
+        those that the sensitivity matrices predict are needed to clear it.
+        Every other prosumer is sent back to default. Undervoltage, whose
+        battery mode switch is not scored, and risks that cannot be cleared
+        by prediction keep the prosumers found by risk_identifier
+        """
+        acting = set()
+        for risk in ('overvoltage', 'undervoltage', 'thermal_overload'):
+            if risk not in risks:
+                continue
+            if risk != 'undervoltage':
+                prosumers = self.select_prosumers(risk, net, neighborhood)
+                if prosumers is not None:
+                    risks[risk] = prosumers
+            acting.update(self.prosumers_to_intervene(neighborhood, risks[risk]))
+        risks['to_default'] = [p for p in neighborhood if p not in acting]
+        return risks
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:12:40 2026
+
+@author: Seta
+"""
+
+import numpy as np
+import pandas as pd
+
+class Rainflow(object):
+    """
+    Streaming rainflow cycle counter of a battery state of charge. Cycles
+    are extracted following the three-point rule of ASTM E1049 as soon as
+    they close, so only the stack of open reversals (the residue) is kept
+    in memory and not the SOC history. The residue is usually short, but
+    it is not bounded: it keeps every reversal of a steadily diverging or
+    converging oscillation, whose ranges never close a cycle, so its
+    length can grow with the series. Counted cycles are binned into a fixed
+    histogram of depths and accumulated into a degradation estimate with a
+    Wöhler curve of cycle life over depth of discharge
+
+    Parameters
+    ----------
+    bins : int, default 20
+        number of cycle depth bins of equal width between 0 and 100 %
+
+    cycle_life : float, default 3000
+        number of full cycles of 100 % depth until end of life
+
+    exponent : float, default 1.5
+        exponent k of the Wöhler curve N(d) = cycle_life * d^-k, with d the
+        depth of discharge as fraction
+
+    eol_soh : float, default 80
+        state of health at end of life in % of the nominal capacity
+
+    Returns
+    ----------
+
+    """
+
+    def __init__(self, bins=20, cycle_life=3000, exponent=1.5, eol_soh=80):
+
+        self.edges      = np.linspace(0, 100, bins + 1)
+        self.cycle_life = cycle_life
+        self.exponent   = exponent
+        self.eol_soh    = eol_soh
+        self.counts     = np.zeros(bins)    # closed cycles per depth bin
+        self.damage     = 0.                # consumed share of cycle life
+        self.stack      = []                # open reversals, last one tentative
+
+    def _wear(self, depth):
+        """
+        Damage of a single full cycle of depth in %
+        """
+        d = min(depth, 100.)/100
+        if d <= 0:
+            return 0.
+        return d**self.exponent / self.cycle_life
+
+    def _count(self, depth, weight):
+        i               = min(np.searchsorted(self.edges, depth, side='right') - 1,
+                              len(self.counts) - 1)
+        self.counts[i]  += weight
+        self.damage     += weight*self._wear(depth)
+
+    def update(self, soc):
+        """
+        Adds the SOC sample in % of the current time step
+        """
+        r = self.stack
+        if not r:
+            r.append(soc)
+            return
+        if soc == r[-1]:
+            return
+        if len(r) > 1 and (soc - r[-1])*(r[-1] - r[-2]) > 0:
+            r[-1] = soc     # same direction: tentative reversal moves on
+        else:
+            r.append(soc)
+        while len(r) > 2:
+            x = abs(r[-1] - r[-2])
+            y = abs(r[-2] - r[-3])
+            if x < y:
+                break
+            if len(r) == 3:
+                # range through the starting point: half cycle
+                self._count(y, 0.5)
+                del r[0]
+            else:
+                self._count(y, 1.)
+                del r[-3:-1]
+
+    def get_histogram(self, residue=True):
+        """
+        Returns pandas series of number of cycles per depth bin. With
+        residue, the ranges still open are added as half cycles
+        """
+        counts = self.counts.copy()
+        if residue:
+            for a, b in zip(self.stack[:-1], self.stack[1:]):
+                depth   = abs(b - a)
+                i       = min(np.searchsorted(self.edges, depth, side='right') - 1,
+                              len(counts) - 1)
+                counts[i] += 0.5
+        index = pd.IntervalIndex.from_breaks(self.edges, closed='left', name='depth')
+        return pd.Series(counts, index=index, name='cycles')
+
+    def get_damage(self, residue=True):
+        """
+        Returns consumed share of cycle life. With residue, the ranges still
+        open are added as half cycles
+        """
+        damage = self.damage
+        if residue:
+            damage += sum(0.5*self._wear(abs(b - a))
+                          for a, b in zip(self.stack[:-1], self.stack[1:]))
+        return damage
+
+    def get_soh(self, residue=True):
+        """
+        Returns estimated state of health in % of the nominal capacity
+        """
+        return 100 - (100 - self.eol_soh)*self.get_damage(residue)
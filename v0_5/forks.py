@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 29 09:27:13 2026
+
+@author: Seta
+"""
+
+import os
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+
+class Snapshot(object):
+    """
+    Frozen copy of the complete state of a simulation run (prosumers,
+    batteries, net and its results, CPU recorder and statistics, power
+    flow helpers) at its last simulated timestep. The state is pickled
+    once, so taking a snapshot is a single serialization and every fork
+    is an independent copy that branches from the same point without
+    recomputing the shared history
+
+    Parameters
+    ----------
+    sim : dict
+        simulation state, as built by net_sim_ex1.build_simulation
+
+    Returns
+    ----------
+
+    """
+
+    def __init__(self, sim):
+
+        self.n      = sim['n']      # timestep the snapshot was taken at
+        self.blob   = pickle.dumps(sim, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def __len__(self):
+        return len(self.blob)
+
+    def fork(self):
+        """
+        Returns an independent copy of the simulation state
+        """
+        return pickle.loads(self.blob)
+
+def _run_branch(snapshot, policy, step):
+    sim = snapshot.fork()
+    sim['cpu'].set_policy(**policy)
+    return step(sim)
+
+def run_branches(snapshot, policies, step, n_workers=None):
+    """
+    Forks snapshot once per policy, applies the policy to the CPU of the
+    fork and continues it with step, in parallel worker processes
+
+    Parameters
+    ----------
+    snapshot : Snapshot
+
+    policies : dict
+        policy name: keyword arguments of CPU.set_policy
+
+    step : callable
+        picklable function that continues a forked simulation state and
+        returns its results, e.g. a functools.partial of a module level
+        function
+
+    n_workers : int, default None
+        number of worker processes. os.cpu_count() if None. With 1 the
+        branches run in this process
+
+    Returns
+    -------
+    dict
+        policy name: results returned by step
+    """
+    names       = list(policies)
+    n_workers   = min(n_workers or os.cpu_count() or 1, len(names))
+    if n_workers <= 1:
+        res = [_run_branch(snapshot, policies[k], step) for k in names]
+    else:
+        with ProcessPoolExecutor(n_workers) as ex:
+            res = list(ex.map(_run_branch, [snapshot] * len(names),
+                              [policies[k] for k in names], [step] * len(names)))
+    return dict(zip(names, res))
+
+def compare_branches(branches, key='grid_kpi'):
+    """
+    Returns a pandas DataFrame with the dictionary results[key] of every
+    branch side by side, one column per policy
+    """
+    return pd.DataFrame({name: res[key] for name, res in branches.items()})
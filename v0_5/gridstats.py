@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 21 10:05:12 2026
+
+@author: Seta
+"""
+
+import numpy as np
+import pandas as pd
+
+class Exceedance(object):
+    """
+    Online durations of the runs of consecutive samples in which each
+    element is above (or below) a threshold, in number of samples
+    """
+
+    def __init__(self, n, threshold, above=True):
+
+        self.threshold  = threshold
+        self.above      = above
+        self.run        = np.zeros(n, dtype=int)    # current run
+        self.longest    = np.zeros(n, dtype=int)
+        self.total      = np.zeros(n, dtype=int)
+        self.events     = np.zeros(n, dtype=int)
+
+    def update(self, x):
+        exceed          = x >= self.threshold if self.above else x <= self.threshold
+        self.events     += exceed & (self.run == 0)
+        self.run        = np.where(exceed, self.run + 1, 0)
+        self.total      += exceed
+        np.maximum(self.longest, self.run, out=self.longest)
+
+class RollingWindow(object):
+    """
+    Online statistics over the last window samples of a vector of
+    elements (buses, lines, slack). Every update is O(1) amortized per
+    element: the rolling sum is kept in a ring buffer and the rolling
+    maximum and minimum follow the van Herk/Gil-Werman block scheme, where
+    the suffix extrema of the previous block are computed once per block
+
+    Parameters
+    ----------
+    labels : list
+        labels of the monitored elements
+
+    window : int, default 10
+        number of samples of the rolling window
+
+    upper : float, default None
+        samples at or above upper are counted as exceedances above
+
+    lower : float, default None
+        samples at or below lower are counted as exceedances below
+
+    Returns
+    ----------
+
+    """
+
+    def __init__(self, labels, window=10, upper=None, lower=None):
+
+        self.labels     = list(labels)
+        self.window     = int(window)
+        self.upper      = upper
+        self.lower      = lower
+        n               = len(self.labels)
+        self.n          = 0                             # samples seen
+        self.last       = np.full(n, np.nan)
+        self._block     = np.zeros((self.window, n))    # ring buffer
+        self._sum       = np.zeros(n)
+        self._pmax      = np.full(n, -np.inf)           # prefix extrema of current block
+        self._pmin      = np.full(n, np.inf)
+        self._smax      = np.full((self.window, n), -np.inf)  # suffix extrema of previous block
+        self._smin      = np.full((self.window, n), np.inf)
+        self.max        = np.full(n, np.nan)
+        self.min        = np.full(n, np.nan)
+        self.above      = Exceedance(n, upper, True) if upper is not None else None
+        self.below      = Exceedance(n, lower, False) if lower is not None else None
+
+    def update(self, values):
+        """
+        Adds the sample of every element at the current time step
+        """
+        x   = np.asarray(values, dtype=float)
+        pos = self.n % self.window
+        if pos == 0 and self.n:
+            b           = self._block
+            self._smax  = np.maximum.accumulate(b[::-1], axis=0)[::-1]
+            self._smin  = np.minimum.accumulate(b[::-1], axis=0)[::-1]
+            self._pmax  = np.full(len(x), -np.inf)
+            self._pmin  = np.full(len(x), np.inf)
+            # exact resum once per block keeps the running sum from drifting
+            self._sum   = b.sum(axis=0)
+        self._sum           += x - self._block[pos]
+        self._block[pos]    = x
+        np.maximum(self._pmax, x, out=self._pmax)
+        np.minimum(self._pmin, x, out=self._pmin)
+        if pos + 1 < self.window:
+            self.max = np.maximum(self._pmax, self._smax[pos + 1])
+            self.min = np.minimum(self._pmin, self._smin[pos + 1])
+        else:
+            self.max = self._pmax.copy()
+            self.min = self._pmin.copy()
+        self.n      += 1
+        self.last   = x
+        for exceedance in (self.above, self.below):
+            if exceedance is not None:
+                exceedance.update(x)
+
+    @property
+    def mean(self):
+        return self._sum / max(min(self.n, self.window), 1)
+
+    def get_data(self):
+        """
+        Returns pandas dataframe with the current rolling statistics and
+        exceedance durations of every element
+        """
+        data = {
+                'last'          : self.last,
+                'rolling_mean'  : self.mean,
+                'rolling_max'   : self.max,
+                'rolling_min'   : self.min,
+                }
+        for side, e in (('above', self.above), ('below', self.below)):
+            if e is not None:
+                data['%s_run' % side]       = e.run
+                data['%s_longest' % side]   = e.longest
+                data['%s_total' % side]     = e.total
+                data['%s_events' % side]    = e.events
+        return pd.DataFrame(data, index=self.labels)
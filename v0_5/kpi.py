@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Wed Oct 28 09:15:47 2026
+
+@author: Seta
+"""
+
+import numpy as np
+import pandas as pd
+
+class ProsumerKPI(object):
+    """
+    Running energy totals of a Prosumer, updated at every timestep of its
+    control. Memory is constant, so sweeps and Monte Carlo runs can keep
+    the KPIs of a run and drop its traces. Energies are in kWh. Signs
+    follow Prosumer.control: p_grid > 0 is feed-in, p_battery < 0 charges
+    the battery
+    """
+
+    __slots__ = ('steps', 'e_load', 'e_pv', 'e_feed_in', 'e_import', 'e_curtail',
+                 'e_charge', 'e_discharge')
+
+    def __init__(self):
+        self.steps          = 0
+        self.e_load         = 0.
+        self.e_pv           = 0.
+        self.e_feed_in      = 0.
+        self.e_import       = 0.
+        self.e_curtail      = 0.
+        self.e_charge       = 0.
+        self.e_discharge    = 0.
+
+    def update(self, p_load, p_pv, p_battery, p_grid, p_curtail, h):
+        """
+        Adds one timestep of h hours with powers in kW
+        """
+        self.steps      += 1
+        self.e_load     += p_load*h
+        self.e_pv       += p_pv*h
+        self.e_curtail  += p_curtail*h
+        if p_grid > 0:
+            self.e_feed_in  += p_grid*h
+        else:
+            self.e_import   -= p_grid*h
+        if p_battery < 0:
+            self.e_charge   -= p_battery*h
+        else:
+            self.e_discharge += p_battery*h
+
+    @property
+    def self_consumption(self):
+        """
+        Share of the pv energy consumed on site, in per unit
+        """
+        if not self.e_pv:
+            return np.nan
+        return (self.e_pv - self.e_feed_in - self.e_curtail) / self.e_pv
+
+    @property
+    def autarky(self):
+        """
+        Share of the load supplied without grid import, in per unit
+        """
+        if not self.e_load:
+            return np.nan
+        return (self.e_load - self.e_import) / self.e_load
+
+    def get_kpis(self):
+        """
+        Returns a dictionary with the energy totals and rates
+        """
+        return {
+                'steps'             : self.steps,
+                'e_load'            : self.e_load,
+                'e_pv'              : self.e_pv,
+                'e_feed_in'         : self.e_feed_in,
+                'e_import'          : self.e_import,
+                'e_curtail'         : self.e_curtail,
+                'e_battery'         : self.e_charge + self.e_discharge,
+                'self_consumption'  : self.self_consumption,
+                'autarky'           : self.autarky,
+                }
+
+class GridKPI(object):
+    """
+    Running totals and extrema of the grid results, updated once per
+    timestep (or per block of timesteps) of the grid loop. Energies are in
+    MWh, slack power is positive when drawn from the external grid
+    """
+
+    def __init__(self):
+        self.steps      = 0
+        self.e_import   = 0.
+        self.e_export   = 0.
+        self.vm_max     = -np.inf
+        self.vm_min     = np.inf
+        self.loading_max = -np.inf
+
+    def update(self, vm_pu, loading_percent, slack_p, h):
+        """
+        Adds the bus voltages, line loadings and slack power of one
+        timestep, or of a block of timesteps as (time x element) arrays, of
+        h hours each
+        """
+        vm          = np.atleast_2d(vm_pu)
+        slack       = np.atleast_2d(slack_p).sum(axis=1)
+        self.steps  += len(vm)
+        self.e_import   += slack[slack > 0].sum()*h
+        self.e_export   -= slack[slack < 0].sum()*h
+        self.vm_max     = max(self.vm_max, np.max(vm))
+        self.vm_min     = min(self.vm_min, np.min(vm))
+        self.loading_max = max(self.loading_max, np.max(loading_percent))
+
+    def get_kpis(self):
+        """
+        Returns a dictionary with the energy totals and extrema
+        """
+        return {
+                'steps'         : self.steps,
+                'e_import'      : self.e_import,
+                'e_export'      : self.e_export,
+                'vm_max'        : self.vm_max,
+                'vm_min'        : self.vm_min,
+                'loading_max'   : self.loading_max,
+                }
+
+def neighborhood_kpis(neighborhood):
+    """
+    Returns a pandas DataFrame with the KPIs of every Prosumer of a
+    neighborhood
+    """
+    return pd.DataFrame({name: p.kpi.get_kpis() for name, p in neighborhood.items()}).T
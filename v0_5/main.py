@@ -9,7 +9,7 @@ import sys
 sys.path.append('..')
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
+from plotting import Pyramid, render_figures
 from Prosumer import Prosumer
 from PVgen import PVgen
 from Storage import BatterySimple, Battery
@@ -92,69 +92,6 @@ prosumer_dict['res_simp'].set_index('timestamp', inplace=True)
 # Show some results
 path = 'E:/Temp/'
 for val in prosumer_dict.values():
-    
-    fig, ax1 = plt.subplots(figsize=(36,12))
-
-    ln1 = ax1.plot(val.p_load[:1440], 'orange', label='load')
-    ln2 = ax1.plot(val.p_pv[:1440], 'r', label='pv')
-    ln3 = ax1.plot(val.p_battery_flow[:1440], 'g', label='batt')
-    ln4 = ax1.plot(val.p_grid_flow[:1440], 'b', label='grid')
-    ax2 = ax1.twinx()
-    ln5 = ax2.plot(val.battery_SOC[:1440], 'black', label='SOC')
-    lns = ln1+ln2+ln3+ln4+ln5
-    labs = [l.get_label() for l in lns]
-    ax1.legend(lns, labs)
-
-    ax1.grid()
-    # ax1.set_ylim(-4.5,6.5)
-    ax1.set_xlabel('Time', fontsize=14)
-    ax1.set_ylabel('Power flow (kW)', fontsize=14)
-    ax2.set_ylabel('Battery SOC', color='black', fontsize=14)  # we already handled the x-label with ax1
-    ax2.set_ylim(0,120)
-    plt.title('PV strategy: %s Battery mode: %s' % (psimp.pv_strategy, psimp.battery_mode), fontsize=16)
-    fig.tight_layout()
-    plt.savefig(path+'day PV strategy %s Battery mode %s' % (psimp.pv_strategy, psimp.battery_mode))
-    
-    # fig, ax1 = plt.subplots(figsize=(12,12))
-
-    # ln1 = ax1.plot(val.p_load[480:960], 'orange', label='load')
-    # ln2 = ax1.plot(val.p_pv[480:960], 'r', label='pv')
-    # ln3 = ax1.plot(val.p_battery_flow[480:960], 'g', label='batt')
-    # ln4 = ax1.plot(val.p_grid_flow[480:960], 'b', label='grid')
-    # ax2 = ax1.twinx()
-    # ln5 = ax2.plot(val.battery_SOC[480:960], 'black', label='SOC')
-    # lns = ln1+ln2+ln3+ln4+ln5
-    # labs = [l.get_label() for l in lns]
-    # ax1.legend(lns, labs)
-
-    # ax1.grid()
-    # # ax1.set_ylim(-4.5,6.5)
-    # ax1.set_xlabel('Time', fontsize=14)
-    # ax1.set_ylabel('Power flow (kW)', fontsize=14)
-    # ax2.set_ylabel('Battery SOC', color='black', fontsize=14)  # we already handled the x-label with ax1
-    # ax2.set_ylim(0,120)
-    # plt.title('PV strategy: %s Battery mode: %s' % (psimp.pv_strategy, psimp.battery_mode), fontsize=16)
-    # fig.tight_layout()
-    # plt.savefig(path+'afternoon PV strategy %s Battery mode %s' % (psimp.pv_strategy, psimp.battery_mode))
-
-    # fig, ax1 = plt.subplots(figsize=(12,12))
-
-    # ln1 = ax1.plot(val.p_load[960:1440], 'orange', label='load')
-    # ln2 = ax1.plot(val.p_pv[960:1440], 'r', label='pv')
-    # ln3 = ax1.plot(val.p_battery_flow[960:1440], 'g', label='batt')
-    # ln4 = ax1.plot(val.p_grid_flow[960:1440], 'b', label='grid')
-    # ax2 = ax1.twinx()
-    # ln5 = ax2.plot(val.battery_SOC[960:1440], 'black', label='SOC')
-    # lns = ln1+ln2+ln3+ln4+ln5
-    # labs = [l.get_label() for l in lns]
-    # ax1.legend(lns, labs)
-
-    # ax1.grid()
-    # # ax1.set_ylim(-4.5,6.5)
-    # ax1.set_xlabel('Time', fontsize=14)
-    # ax1.set_ylabel('Power flow (kW)', fontsize=14)
-    # ax2.set_ylabel('Battery SOC', color='black', fontsize=14)  # we already handled the x-label with ax1
-    # ax2.set_ylim(0,120)
-    # plt.title('PV strategy: %s Battery mode: %s' % (psimp.pv_strategy, psimp.battery_mode), fontsize=16)
-    # fig.tight_layout()
-    # plt.savefig(path+'evening PV strategy %s Battery mode %s' % (psimp.pv_strategy, psimp.battery_mode))
\ No newline at end of file
+    title = 'PV strategy: %s Battery mode: %s' % (psimp.pv_strategy, psimp.battery_mode)
+    render_figures(Pyramid(val), [(0, 1440, title)], path,
+                   prefix='day PV strategy %s Battery mode %s' % (psimp.pv_strategy, psimp.battery_mode))
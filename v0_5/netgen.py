@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Fri Oct 23 10:18:52 2026
+
+@author: Seta
+"""
+
+import numpy as np
+from Storage import BatterySimple
+from PVgen import PVgen
+from v0_5.Prosumer import Prosumer
+
+def _create_lines(pp, net, from_buses, to_buses, lengths, std_type):
+    if not len(from_buses):
+        return
+    if hasattr(pp, 'create_lines'):
+        pp.create_lines(net, from_buses, to_buses, length_km=lengths, std_type=std_type)
+    else:
+        for f, t, l in zip(from_buses, to_buses, lengths):
+            pp.create_line(net, from_bus=f, to_bus=t, length_km=l, std_type=std_type)
+
+def radial_net(
+               n_feeders            = 4,
+               feeder_depth         = 10,
+               branches             = 1,
+               branch_depth         = 3,
+               prosumers_per_bus    = 1,
+               feeder_std_type      = 'NAYY 4x120 SE',
+               branch_std_type      = '15-AL1/3-ST1A 0.4',
+               service_std_type     = 'NAYY 4x50 SE',
+               feeder_length        = 0.08,
+               branch_length        = 0.12,
+               service_length       = 0.02,
+               length_spread        = 0.,
+               sn_mva               = None,
+               p_mw                 = 0.0035,
+               seed                 = None,
+               ):
+    """
+    Builds a radial LV network behind the same external grid and MV/LV
+    transformer as simple_net. Every feeder leaves the transformer LV bus
+    as a trunk of feeder_depth buses, and every trunk bus starts branches
+    side branches of branch_depth buses. Every trunk and branch bus
+    supplies prosumers_per_bus households, each one a load on its own
+    service bus when there is more than one per bus
+
+    Parameters
+    ----------
+    n_feeders : int, default 4
+        number of feeders leaving the transformer LV bus
+
+    feeder_depth : int, default 10
+        number of buses along the trunk of each feeder
+
+    branches : int, default 1
+        number of side branches leaving every trunk bus
+
+    branch_depth : int, default 3
+        number of buses along each side branch
+
+    prosumers_per_bus : int, default 1
+        number of households supplied by every trunk and branch bus
+
+    feeder_std_type, branch_std_type, service_std_type : str
+        pandapower standard types of trunk, branch and service lines
+
+    feeder_length, branch_length, service_length : float
+        length of every trunk, branch and service line in km
+
+    length_spread : float, default 0.
+        relative spread of the uniform random variation of line lengths
+
+    sn_mva : float, default None
+        transformer rating in MVA. If None, 0.4 MVA per 100 households,
+        at least 0.4 MVA
+
+    p_mw : float, default 0.0035
+        initial active power of every load in MW
+
+    seed : int, default None
+        seed of the numpy Generator of the line length variation
+
+    Returns
+    ----------
+    pandapower net with one load named 'Prosumer <bus name>' per household
+    """
+    import pandapower as pp
+    rng = np.random.default_rng(seed)
+
+    names, parents, kinds = [], [], []
+    def add(name, parent, kind):
+        names.append(name)
+        parents.append(parent)
+        kinds.append(kind)
+        return len(names) - 1
+
+    # bus 0: MV bus of the external grid, bus 1: transformer LV bus
+    add('Bus ext grid', None, None)
+    lv0 = add('Bus LV0', None, None)
+    supply = []
+    for f in range(1, n_feeders + 1):
+        prev = lv0
+        for i in range(1, feeder_depth + 1):
+            prev = add('Bus LV%s.%s' % (f, i), prev, 'feeder')
+            supply.append(prev)
+            trunk = prev
+            for b in range(1, branches + 1):
+                last = trunk
+                for j in range(1, branch_depth + 1):
+                    last = add('Bus LV%s.%s.%s.%s' % (f, i, b, j), last, 'branch')
+                    supply.append(last)
+    if prosumers_per_bus > 1:
+        households = [add('%s.%s' % (names[s], k), s, 'service')
+                      for s in supply for k in range(1, prosumers_per_bus + 1)]
+    else:
+        households = supply
+
+    net = pp.create_empty_network()
+    pp.create_bus(net, name=names[0], vn_kv=10., type='b')
+    pp.create_bus(net, name=names[1], vn_kv=0.4, type='n')
+    pp.create_buses(net, len(names) - 2, vn_kv=0.4, type='m', name=names[2:])
+
+    parents = np.array([-1 if p is None else p for p in parents])
+    kinds   = np.array(kinds, dtype=object)
+    for kind, std_type, length in (('feeder', feeder_std_type, feeder_length),
+                                   ('branch', branch_std_type, branch_length),
+                                   ('service', service_std_type, service_length)):
+        to_buses    = np.flatnonzero(kinds == kind)
+        lengths     = length * (1 + length_spread * rng.uniform(-1, 1, len(to_buses)))
+        _create_lines(pp, net, parents[to_buses], to_buses, lengths, std_type)
+
+    pp.create_ext_grid(net, bus=0, va_degree=0, name='External grid',
+                       s_sc_max_mva=10, rx_max=0.1, rx_min=0.1)
+    if sn_mva is None:
+        sn_mva = max(0.4, 0.4 * np.ceil(len(households) / 100))
+    pp.create_transformer_from_parameters(net, hv_bus=0, lv_bus=1, sn_mva=sn_mva,
+                                          vn_hv_kv=10, vn_lv_kv=0.4, vkr_percent=1.325,
+                                          vk_percent=4, pfe_kw=0.95, i0_percent=0.2375,
+                                          tap_side="hv", tap_neutral=0, tap_min=-2,
+                                          tap_max=2, tap_step_percent=2.5, tp_pos=0,
+                                          shift_degree=150, name='MV-LV-Trafo')
+    load_names = ['Prosumer %s' % names[h] for h in households]
+    if hasattr(pp, 'create_loads'):
+        pp.create_loads(net, households, p_mw=p_mw, name=load_names)
+    else:
+        for h, name in zip(households, load_names):
+            pp.create_load(net, bus=h, p_mw=p_mw, name=name)
+    return net
+
+def populate_neighborhood(
+                          net,
+                          profiles,
+                          pv_ratio          = 0.7,
+                          battery_capacity  = 3.5,
+                          initial_SOC       = 60,
+                          min_max_SOC       = (20, 80),
+                          ):
+    """
+    Creates one Prosumer per load of net, keyed by the name of the load
+    bus and in the order of net.load. profiles is the (time x prosumer)
+    array of household load profiles in kW, one column per load. Every
+    Prosumer installs a PV power of pv_ratio times its peak demand
+    """
+    neighborhood    = {}
+    peaks           = np.max(profiles, axis=0)
+    bus_names       = net.bus.name.loc[net.load.bus].tolist()
+    for j, name in enumerate(bus_names):
+        pvgen   = PVgen(installed_pv = peaks[j]*pv_ratio)
+        battery = BatterySimple(battery_capacity = battery_capacity,
+                                initial_SOC = initial_SOC,
+                                min_max_SOC = min_max_SOC)
+        neighborhood[name] = Prosumer(pvgen = pvgen, battery=battery)
+    return neighborhood
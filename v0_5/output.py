@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 26 09:21:05 2026
+
+@author: Seta
+"""
+
+import os
+import numpy as np
+import pandas as pd
+
+class ResultWriter(object):
+    """
+    Incremental columnar writer of simulation results. Every table (bus
+    voltages, line loadings, slack power, prosumer flows...) is buffered in
+    a preallocated (chunk x column) array and appended to a compressed
+    file once the chunk is full, so results stream to disk while the
+    simulation runs and memory stays bounded by the chunk size.
+    read_results loads column subsets and time ranges of a table without
+    reading the whole file
+
+    Parameters
+    ----------
+    path : str
+        directory with one file per table (fmt 'parquet') or HDF5 file
+        (fmt 'hdf5')
+
+    chunk_size : int, default 1440
+        number of timesteps buffered per table before they are written
+
+    fmt : str, default 'parquet'
+        'parquet' for a parquet file per table with one row group per
+        chunk, 'hdf5' for a PyTables table per table with blosc
+        compression. Both need their optional dependency (pyarrow or
+        tables)
+
+    complevel : int, default 5
+        compression level of the hdf5 tables
+
+    Returns
+    ----------
+
+    """
+
+    def __init__(self, path, chunk_size=1440, fmt='parquet', complevel=5):
+
+        if fmt not in ('hdf5', 'parquet'):
+            raise AttributeError('Unknown output format %s' % fmt)
+        self.path       = path
+        self.chunk_size = chunk_size
+        self.fmt        = fmt
+        self.complevel  = complevel
+        self.tables     = {}    # name: [columns, values buffer, timestamps buffer, rows]
+        self._store     = None
+        self._parquet   = {}    # name: pyarrow ParquetWriter
+        if fmt == 'hdf5':
+            self._store = pd.HDFStore(path, mode='w', complevel=complevel, complib='blosc')
+        else:
+            os.makedirs(path, exist_ok=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add_table(self, name, columns):
+        """
+        Declares a table with one column per element (bus, line, prosumer)
+        """
+        columns = [str(c) for c in columns]
+        self.tables[name] = [columns,
+                             np.empty((self.chunk_size, len(columns))),
+                             np.empty(self.chunk_size, dtype='datetime64[ns]'),
+                             0]
+
+    def record(self, name, timestamp, values):
+        """
+        Buffers the values of every column of table name at timestamp
+        """
+        t           = self.tables[name]
+        k           = t[3]
+        t[1][k]     = values
+        t[2][k]     = np.datetime64(pd.Timestamp(timestamp), 'ns')
+        t[3]        = k + 1
+        if t[3] == self.chunk_size:
+            self.flush(name)
+
+    def append(self, name, index, values):
+        """
+        Writes a whole block of timesteps of table name at once
+        """
+        self.flush(name)
+        columns = self.tables[name][0]
+        self._write(name, pd.DataFrame(np.asarray(values, dtype=float),
+                                       index=pd.DatetimeIndex(index, name='timestamp'),
+                                       columns=columns))
+
+    def flush(self, name=None):
+        """
+        Writes the buffered timesteps of table name (all tables if None)
+        """
+        for key in ([name] if name else list(self.tables)):
+            columns, values, stamps, k = self.tables[key]
+            if not k:
+                continue
+            self._write(key, pd.DataFrame(values[:k].copy(),
+                                          index=pd.DatetimeIndex(stamps[:k], name='timestamp'),
+                                          columns=columns))
+            self.tables[key][3] = 0
+
+    def _write(self, name, df):
+        if self.fmt == 'hdf5':
+            self._store.append(name, df, format='table', index=False)
+            return
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        if name not in self._parquet:
+            self._parquet[name] = pq.ParquetWriter(os.path.join(self.path, name + '.parquet'),
+                                                   table.schema, compression='zstd')
+        self._parquet[name].write_table(table)
+
+    def close(self):
+        """
+        Writes every buffered timestep and closes the files
+        """
+        self.flush()
+        if self._store is not None:
+            for name in self.tables:
+                if name in self._store:
+                    self._store.create_table_index(name, columns=['index'], optlevel=6)
+            self._store.close()
+            self._store = None
+        for writer in self._parquet.values():
+            writer.close()
+        self._parquet = {}
+
+def read_results(path, name, columns=None, start=None, stop=None):
+    """
+    Reads table name of a file written by ResultWriter. Only the given
+    columns and the timesteps in [start, stop) are loaded
+
+    Parameters
+    ----------
+    path : str
+        hdf5 file or parquet directory of the ResultWriter
+
+    name : str
+        table name
+
+    columns : list, default None
+        column names to read. All if None
+
+    start, stop : timestamp-like, default None
+        time range to read. Open ended if None
+
+    Returns
+    -------
+    pandas DataFrame indexed by timestamp
+    """
+    columns = [str(c) for c in columns] if columns is not None else None
+    if os.path.isdir(path):
+        filters = []
+        if start is not None:
+            filters.append(('timestamp', '>=', pd.Timestamp(start)))
+        if stop is not None:
+            filters.append(('timestamp', '<', pd.Timestamp(stop)))
+        return pd.read_parquet(os.path.join(path, name + '.parquet'), columns=columns,
+                               filters=filters or None)
+    where = []
+    if start is not None:
+        where.append('index >= %r' % str(pd.Timestamp(start)))
+    if stop is not None:
+        where.append('index < %r' % str(pd.Timestamp(stop)))
+    return pd.read_hdf(path, name, columns=columns, where=where or None)
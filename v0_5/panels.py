@@ -5,6 +5,7 @@ Created on Wed Apr  8 20:44:40 2020
 @author: Seta
 """
 
+import numpy as np
 
 class SolarPanel(object):
 
@@ -58,4 +59,23 @@ class SolarPanel(object):
             p_prod = self.panel_peak_p
         else:
             p_prod = p_sun_kw
-        return p_prod
\ No newline at end of file
+        return p_prod
+
+    def production_series(self, irradiance, timestep):
+        """
+        Vectorized production of a single solar panel over a whole
+        irradiance series
+
+        irradiance : array-like
+            irradiance in Wh/m2 at every timestep, assumed global inclined
+
+        timestep : int
+            time resolution of irradiation data in seconds
+
+        Return
+        --------
+        numpy array
+            power production yielded by a single solar panel in kW
+        """
+        p_sun_kw = np.asarray(irradiance, dtype=float) * self.module_area / timestep * 3.6
+        return np.minimum(p_sun_kw, self.panel_peak_p)
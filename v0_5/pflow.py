@@ -0,0 +1,474 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:41 2026
+
+@author: Seta
+"""
+
+import os
+import pickle
+import hashlib
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from v0_5.recorder import Recorder
+
+def runpp(net, **kwargs):
+    """
+    Solves the power flow of net with pandapower, which is only imported
+    once a power flow is actually solved
+    """
+    import pandapower as pp
+    pp.runpp(net, **kwargs)
+
+def injection_vector(net):
+    """
+    Returns a flat numpy array with the active and reactive power of every
+    load (and static generator, if any) of the net in MW / Mvar. This is
+    the vector that characterizes the operating point a power flow is
+    solved for
+    """
+    x = [net.load.p_mw.values, net.load.q_mvar.values]
+    if len(net.sgen):
+        x.extend([net.sgen.p_mw.values, net.sgen.q_mvar.values])
+    return np.concatenate(x).astype(float)
+
+def bus_injection(net):
+    """
+    Returns a pandas Series with the net active power injection at every
+    bus of the net in MW (generator convention: loads count negative)
+    """
+    p = pd.Series(0., index=net.bus.index)
+    p = p.sub(net.load.groupby('bus').p_mw.sum(), fill_value=0.)
+    if len(net.sgen):
+        p = p.add(net.sgen.groupby('bus').p_mw.sum(), fill_value=0.)
+    return p
+
+def linearize(net):
+    """
+    Factorizes the Jacobian of the last Newton-Raphson power flow solved on
+    net. Returns the data linear_response needs, which stays valid for
+    that operating point after net is solved again. All elements of the
+    net are assumed in service
+    """
+    return _linearize(net._ppc, net._pd2ppc_lookups, net.bus.index.values,
+                      net.res_line.loading_percent.values)
+
+def _linearize(ppc, lookups, buses, loading):
+    from scipy.sparse.linalg import splu
+    internal    = ppc['internal']
+    pv, pq      = internal['pv'], internal['pq']
+    pvpq        = np.r_[pv, pq]
+    p_row       = np.full(len(internal['V']), -1)
+    p_row[pvpq] = np.arange(len(pvpq))
+    ppc_bus     = lookups['bus'][buses]
+    f, t        = lookups['branch'].get('line', (0, 0))
+    return {
+            'lu'        : splu(internal['J'].tocsc()),
+            'pvpq'      : pvpq,
+            'pq'        : pq,
+            'V'         : internal['V'],
+            'base'      : internal['baseMVA'],
+            'Yf'        : internal['Yf'][f:t],
+            'p_row'     : p_row[ppc_bus],
+            'ppc_bus'   : ppc_bus,
+            'loading'   : np.array(loading, dtype=float),
+            }
+
+def linear_response(lin, dp):
+    """
+    Returns the first-order change of the bus voltages in pu and of the
+    line loadings in % for the active power injections dp in MW, at the
+    operating point of lin (see linearize). dp is a vector over the buses
+    of the net, or a (bus x k) array of k injection patterns solved at
+    once
+    """
+    dp          = np.asarray(dp, dtype=float)
+    cols        = dp.reshape(len(dp), -1)
+    V           = lin['V']
+    n           = len(lin['pvpq'])
+    rhs         = np.zeros((lin['lu'].shape[0], cols.shape[1]))
+    mask        = lin['p_row'] >= 0
+    # several buses of the net can map to the same bus of the power flow
+    np.add.at(rhs, lin['p_row'][mask], cols[mask] / lin['base'])
+    x           = lin['lu'].solve(rhs)
+    dva         = np.zeros((len(V), cols.shape[1]))
+    dvm         = np.zeros((len(V), cols.shape[1]))
+    dva[lin['pvpq']]    = x[:n]
+    dvm[lin['pq']]      = x[n:]
+
+    # d|I|/dP of every line from the complex voltage variation
+    dV          = V[:, None] / np.abs(V)[:, None] * dvm + 1j * V[:, None] * dva
+    i_f         = lin['Yf'] @ V
+    di_f        = lin['Yf'] @ dV
+    i_abs2      = np.abs(i_f)**2
+    i_abs2[i_abs2 == 0] = np.inf
+    dld         = lin['loading'][:, None] * np.real(np.conj(i_f)[:, None] * di_f) / i_abs2[:, None]
+    dvm         = dvm[lin['ppc_bus']]
+    if dp.ndim == 1:
+        return dvm[:, 0], dld[:, 0]
+    return dvm, dld
+
+def sensitivity_matrices(net):
+    """
+    Derives the voltage and line loading sensitivities to active power
+    injections from the Jacobian of the last Newton-Raphson power flow
+    solved on the net. All elements of the net are assumed in service.
+    The matrices are dense (bus x bus), use linear_response for the effect
+    of a few injection patterns on large nets
+
+    net : pandapower net object
+        net on which pp.runpp has been successfully run
+
+    Return
+        dvm_dp : pandas DataFrame (bus x bus) of voltage change in pu per MW
+        of active power injected at each bus
+
+        dloading_dp : pandas DataFrame (line x bus) of line loading change
+        in % per MW of active power injected at each bus
+    """
+    buses       = net.bus.index
+    dvm, dld    = linear_response(linearize(net), np.eye(len(buses)))
+    return (pd.DataFrame(dvm, index=buses, columns=buses),
+            pd.DataFrame(dld, index=net.line.index, columns=buses))
+
+class LazyPowerFlow(object):
+    """
+    Change-triggered power flow. The power flow of the net is only solved
+    when any load injection has moved by more than tol since the last
+    solve. Otherwise the results of the last solve are reused in
+    res_bus, res_line and res_ext_grid, optionally corrected to first
+    order around the last operating point. The Jacobian of that point is
+    only factorized once a result is corrected, and every correction is a
+    single sparse solve for the injection change
+
+    The error of reused results is not known when they are reused. It is
+    measured at the next solve instead: the result the reuse would have
+    returned for the injections that triggered the solve, which have
+    moved further than those of any reuse before it, is compared with the
+    solved one. max_error returns the largest such error
+
+    Parameters
+    ----------
+    tol : float, default 1e-4
+        maximum absolute change of any load injection in MW (or Mvar)
+        tolerated before the power flow is solved again
+
+    correct : bool, default True
+        if True, reused results are corrected by the first-order voltage
+        and loading changes derived from the last Jacobian
+
+    solver : callable, default None
+        function that solves the power flow of a net. pp.runpp if None
+
+    Returns
+    ----------
+
+    """
+
+    def __init__(self, tol=1e-4, correct=True, solver=None):
+
+        self.tol        = tol
+        self.correct    = correct
+        self.solver     = solver or runpp
+        self._x         = None      # injections of last solve
+        self._p         = None      # bus injections of last solve
+        self._res       = {}        # results of last solve
+        self._ppc       = None      # internal power flow data of last solve
+        self._lookups   = None
+        self._lin       = None      # factorized Jacobian of last solve, once needed
+        self._reused    = False     # True if results were reused since last solve
+        self.solved     = None      # True if the last call solved the power flow
+        self.recorder   = Recorder(
+                                   'solved',        # 1 if solved, 0 if reused
+                                   'max_delta',     # max injection change since last solve [MW]
+                                   'correction',    # largest voltage correction applied [pu]
+                                   'error',         # voltage error of a reuse, measured at the solve [pu]
+                                   )
+
+    def _linearization(self, net):
+        if self._lin is None:
+            # the Jacobian of the last solve, even if net has been solved
+            # for another operating point since
+            self._lin = _linearize(self._ppc, self._lookups, net.bus.index.values,
+                                   self._res['res_line'].loading_percent.values)
+        return self._lin
+
+    def _predict(self, net):
+        """
+        Writes the results the reuse of the last solve gives for the current
+        injections of net. Returns the largest voltage correction in pu
+        """
+        for table, res in self._res.items():
+            net[table] = res.copy()
+        if not self.correct:
+            return 0.
+        dp          = (bus_injection(net) - self._p).values
+        dvm, dld    = linear_response(self._linearization(net), dp)
+        net.res_bus['vm_pu']                += dvm
+        net.res_line['loading_percent']     += dld
+        net.res_ext_grid['p_mw']            -= dp.sum() / len(net.res_ext_grid)
+        return np.max(np.abs(dvm))
+
+    def _solve(self, net, x):
+        error = np.nan
+        if self._reused:
+            # what reusing would have returned, to compare with the solution
+            self._predict(net)
+            predicted = net.res_bus.vm_pu.values.copy()
+        self.solver(net)
+        if self._reused:
+            error = np.nanmax(np.abs(net.res_bus.vm_pu.values - predicted))
+        self._x         = x
+        self._p         = bus_injection(net)
+        self._res       = {
+                           'res_bus'     : net.res_bus.copy(),
+                           'res_line'    : net.res_line.copy(),
+                           'res_ext_grid': net.res_ext_grid.copy(),
+                           }
+        self._ppc       = net._ppc
+        self._lookups   = net._pd2ppc_lookups
+        self._lin       = None
+        self._reused    = False
+        self.solved     = True
+        self.recorder.record(solved=1, max_delta=0., correction=0., error=error)
+
+    def _reuse(self, net, delta):
+        correction      = self._predict(net)
+        self._reused    = True
+        self.solved     = False
+        self.recorder.record(solved=0, max_delta=delta, correction=correction, error=np.nan)
+
+    def run(self, net):
+        """
+        Solves or reuses the power flow of net for its current load
+        injections
+        """
+        x = injection_vector(net)
+        if self._x is None or len(x) != len(self._x):
+            self._reused = False
+            self._solve(net, x)
+            return
+        delta = np.max(np.abs(x - self._x))
+        if delta > self.tol:
+            self._solve(net, x)
+        else:
+            self._reuse(net, delta)
+
+    def skip_rate(self):
+        """
+        Returns the share of calls to run in which the power flow was not
+        solved
+        """
+        solved = self.recorder.meta['solved']
+        if not solved:
+            return 0.
+        return 1 - sum(solved) / len(solved)
+
+    def max_error(self):
+        """
+        Returns the largest voltage error in pu of reused results measured
+        at the following solves, nan if no reuse has been checked yet.
+        Each is measured at injections that had moved beyond tol, so it
+        overestimates the error of the reuses that preceded it
+        """
+        errors = np.array(self.recorder.meta['error'], dtype=float)
+        if np.isnan(errors).all():
+            return np.nan
+        return np.nanmax(errors)
+
+    def get_data(self):
+        """
+        Returns pandas dataframe composed by object's recorder meta dictionary
+        of data
+        """
+        return self.recorder.get_data()
+
+def _nbytes(obj):
+    """
+    Returns the memory taken by the numpy arrays and sparse matrices of a
+    nested dictionary, e.g. the internal power flow data net._ppc
+    """
+    if isinstance(obj, dict):
+        return sum(_nbytes(v) for v in obj.values())
+    if isinstance(obj, np.ndarray):
+        return obj.nbytes
+    if hasattr(obj, 'data') and hasattr(obj, 'indices'):
+        return obj.data.nbytes + obj.indices.nbytes + obj.indptr.nbytes
+    return 0
+
+class PowerFlowCache(object):
+    """
+    Least recently used cache in front of the power flow of a net. Results
+    are keyed by the signature of the net and the load injection vector
+    quantized to resolution, so operating points that repeat (daily
+    profiles, Monte Carlo runs) skip the Newton-Raphson solve, and
+    switching lines or elements in and out of service never serves results
+    of another topology
+
+    Parameters
+    ----------
+    resolution : float, default 1e-4
+        quantization step of the injection vector in MW (or Mvar)
+
+    max_entries : int, default 10000
+        maximum number of cached operating points. None for no limit
+
+    max_bytes : int, default None
+        maximum memory taken by cached results in bytes. None for no limit
+
+    path : str, default None
+        pickle file the cache is loaded from, if it exists, and saved to
+        when calling save
+
+    solver : callable, default None
+        function that solves the power flow of a net. pp.runpp if None.
+        A LazyPowerFlow run method can be passed to skip solves on cache
+        misses as well. Results it reused instead of solving are not cached
+
+    Returns
+    ----------
+
+    """
+
+    tables = ('res_bus', 'res_line', 'res_ext_grid', 'res_trafo', 'res_load')
+
+    def __init__(self,
+                 resolution     = 1e-4,
+                 max_entries    = 10000,
+                 max_bytes      = None,
+                 path           = None,
+                 solver         = None,
+                 ):
+
+        self.resolution     = resolution
+        self.max_entries    = max_entries
+        self.max_bytes      = max_bytes
+        self.path           = path
+        self.solver         = solver or runpp
+        self.entries        = OrderedDict()
+        self.nbytes         = 0
+        self.hits           = 0
+        self.misses         = 0
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @staticmethod
+    def net_signature(net):
+        """
+        Returns a hash of the topology, in service flags, switch states and
+        numeric element parameters of net that cached results are only
+        valid for. Only the raw bytes of numeric columns are hashed, so it
+        is cheap enough to be computed at every call
+        """
+        h = hashlib.sha1()
+        for table in ('bus', 'line', 'trafo', 'ext_grid', 'load', 'sgen', 'switch'):
+            if table not in net:
+                continue
+            df = net[table]
+            h.update(table.encode())
+            h.update(np.ascontiguousarray(df.index.values).tobytes())
+            for col in df.columns:
+                if col in ('p_mw', 'q_mvar'):
+                    continue
+                values = df[col].values
+                if values.dtype.kind in 'biuf':
+                    h.update(col.encode())
+                    h.update(np.ascontiguousarray(values).tobytes())
+            if table == 'switch':
+                h.update(''.join(df.et.astype(str)).encode())
+        return h.digest()
+
+    def key(self, net):
+        """
+        Returns the cache key of the current topology and load injections
+        of net
+        """
+        q = np.round(injection_vector(net) / self.resolution).astype(np.int64)
+        return self.net_signature(net) + q.tobytes()
+
+    def _evict(self):
+        while self.entries and (
+                (self.max_entries is not None and len(self.entries) > self.max_entries) or
+                (self.max_bytes is not None and self.nbytes > self.max_bytes)):
+            _, (_, size) = self.entries.popitem(last=False)
+            self.nbytes -= size
+
+    def run(self, net):
+        """
+        Writes the results of the power flow of net for its current load
+        injections, either from cache or from solving it
+        """
+        k = self.key(net)
+        if k in self.entries:
+            self.entries.move_to_end(k)
+            res, _ = self.entries[k]
+            for table in self.tables:
+                if table in res:
+                    net[table] = res[table].copy()
+            # internal power flow data (Jacobian, admittances) of the entry
+            net['_ppc'] = res.get('_ppc')
+            net['converged'] = True
+            self.hits += 1
+            return
+        self.misses += 1
+        self.solver(net)
+        lazy = getattr(self.solver, '__self__', None)
+        if isinstance(lazy, LazyPowerFlow) and not lazy.solved:
+            return
+        res  = {table: net[table].copy() for table in self.tables if table in net}
+        size = sum(int(df.memory_usage(index=True).sum()) for df in res.values())
+        # a solve builds a new _ppc, so the entry keeps a reference to it
+        res['_ppc'] = net.get('_ppc')
+        size += _nbytes(res['_ppc'])
+        self.entries[k] = (res, size)
+        self.nbytes += size
+        self._evict()
+
+    def hit_rate(self):
+        """
+        Returns the share of calls to run served from cache
+        """
+        calls = self.hits + self.misses
+        return self.hits / calls if calls else 0.
+
+    def get_stats(self):
+        """
+        Returns a dictionary with hit/miss counts, hit rate, number of
+        entries and memory taken by the cache
+        """
+        return {
+                'hits'      : self.hits,
+                'misses'    : self.misses,
+                'hit_rate'  : self.hit_rate(),
+                'entries'   : len(self.entries),
+                'nbytes'    : self.nbytes,
+                }
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
+
+    def save(self, path=None):
+        """
+        Persists the cached results to a pickle file
+        """
+        path = path or self.path
+        with open(path, 'wb') as f:
+            pickle.dump({
+                         'resolution'   : self.resolution,
+                         'entries'      : self.entries,
+                         }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def load(self, path):
+        """
+        Loads cached results from a pickle file written by save
+        """
+        with open(path, 'rb') as f:
+            d = pickle.load(f)
+        if d['resolution'] != self.resolution:
+            raise AttributeError('Cache file %s was built with resolution %s'
+                                 % (path, d['resolution']))
+        self.entries    = d['entries']
+        self.nbytes     = sum(size for _, size in self.entries.values())
+        self._evict()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 09:31:55 2026
+
+@author: Seta
+"""
+
+import os
+import copy
+import math
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from v0_5.pflow import runpp
+
+def simulate_prosumers(neighborhood, irrad_data, load_data, timestep):
+    """
+    Phase 1 of an uncontrolled (bypass_control) run. Every Prosumer of the
+    neighborhood is simulated over the whole horizon, one after the other,
+    since their behavior does not depend on grid results
+
+    Parameters
+    ----------
+    neighborhood : dict
+        Prosumer instances. Their order matches the order of net.load
+
+    irrad_data : pandas Series or array
+        irradiation data in Wh/m2 at every timestep
+
+    load_data : pandas Series, array or 2-D array
+        power requirements in kW at every timestep, either shared by every
+        Prosumer or one column (time x prosumer) per Prosumer
+
+    timestep : float
+        number of seconds between every time step of the simulation
+
+    Returns
+    -------
+    numpy array
+        (time x prosumer) matrix of load injections into the grid in MW
+    """
+    irr         = np.asarray(irrad_data, dtype=float)
+    load        = np.asarray(load_data, dtype=float)
+    if load.ndim == 1:
+        load    = np.repeat(load[:, None], len(neighborhood), axis=1)
+    n           = min(len(irr), len(load))
+    timestamps  = irrad_data.index[:n] if hasattr(irrad_data, 'index') else range(n)
+    p_mw        = np.empty((n, len(neighborhood)))
+    for j, p in enumerate(neighborhood.values()):
+        for i in range(n):
+            p.run_pflow(irr[i], load[i, j], timestep, timestamps[i])
+        p_mw[:, j] = -np.asarray(p.recorder.meta['p_grid_flow'][-n:]) / 1000
+    return p_mw
+
+def _solve_chunk(net, injections, backend):
+    """
+    Solves the power flow of net for every row of injections (MW of every
+    load) and returns bus voltages, line loadings and slack power
+    """
+    if backend == 'runpp':
+        vm_pu   = np.empty((len(injections), len(net.bus)))
+        loading = np.empty((len(injections), len(net.line)))
+        slack   = np.empty((len(injections), len(net.ext_grid)))
+        for i, row in enumerate(injections):
+            net.load['p_mw'] = row
+            runpp(net)
+            vm_pu[i]    = net.res_bus.vm_pu.values
+            loading[i]  = net.res_line.loading_percent.values
+            slack[i]    = net.res_ext_grid.p_mw.values
+        return vm_pu, loading, slack
+
+    elif backend == 'timeseries':
+        from pandapower.timeseries import DFData, OutputWriter, run_timeseries
+        from pandapower.control import ConstControl
+        profiles    = pd.DataFrame(injections, columns=net.load.index)
+        ConstControl(net, element='load', variable='p_mw',
+                     element_index=net.load.index, profile_name=net.load.index,
+                     data_source=DFData(profiles))
+        ow          = OutputWriter(net, profiles.index, output_path=None,
+                                   log_variables=[('res_bus', 'vm_pu'),
+                                                  ('res_line', 'loading_percent'),
+                                                  ('res_ext_grid', 'p_mw')])
+        run_timeseries(net, profiles.index, verbose=False)
+        return (ow.output['res_bus.vm_pu'].values,
+                ow.output['res_line.loading_percent'].values,
+                ow.output['res_ext_grid.p_mw'].values)
+
+    raise AttributeError('Unknown power flow backend %s' % backend)
+
+def solve_power_flows(net, injections, n_workers=None, chunk_size=None, backend='runpp'):
+    """
+    Phase 2 of an uncontrolled run. The power flows of the whole injection
+    matrix are solved in time chunks on a process pool. Each worker solves
+    its chunk on its own copy of net
+
+    Parameters
+    ----------
+    net : pandapower net object
+
+    injections : numpy array
+        (time x load) matrix of load injections in MW
+
+    n_workers : int, default None
+        number of worker processes. os.cpu_count() if None. With 1 the
+        chunks are solved in this process
+
+    chunk_size : int, default None
+        number of timesteps per chunk. Horizon split evenly among workers
+        if None
+
+    backend : str, default 'runpp'
+        'runpp' to loop pp.runpp over the chunk, 'timeseries' to use
+        pandapower timeseries with DFData/ConstControl
+
+    Returns
+    -------
+    tuple
+        (vm_pu, loading_percent, slack_p) numpy arrays over time
+    """
+    n_workers   = n_workers or os.cpu_count() or 1
+    n           = len(injections)
+    chunk_size  = chunk_size or max(1, math.ceil(n / n_workers))
+    chunks      = [injections[s:s + chunk_size] for s in range(0, n, chunk_size)]
+    if n_workers == 1:
+        res = [_solve_chunk(copy.deepcopy(net), c, backend) for c in chunks]
+    else:
+        with ProcessPoolExecutor(n_workers) as ex:
+            res = list(ex.map(_solve_chunk, [net] * len(chunks), chunks,
+                              [backend] * len(chunks)))
+    return tuple(np.concatenate(r) for r in zip(*res))
+
+def run_pipeline(net, neighborhood, irrad_data, load_data, timestep,
+                 time_axis=None, n_workers=None, chunk_size=None, backend='runpp'):
+    """
+    Two-phase decoupled simulation of an uncontrolled neighborhood. All
+    prosumers are first simulated for the whole horizon, then the power
+    flows of the resulting injection matrix are solved in parallel
+
+    Returns
+    -------
+    tuple
+        (th_overload, vm_pu, slack_p) pandas DataFrames indexed by time
+    """
+    injections              = simulate_prosumers(neighborhood, irrad_data, load_data, timestep)
+    vm_pu, loading, slack   = solve_power_flows(net, injections, n_workers=n_workers,
+                                                chunk_size=chunk_size, backend=backend)
+    if time_axis is not None:
+        index = time_axis.index(len(injections))
+    elif hasattr(irrad_data, 'index'):
+        index = irrad_data.index[:len(injections)]
+    else:
+        index = pd.RangeIndex(len(injections))
+    th_overload = pd.DataFrame(loading, index=index, columns=net.line.index)
+    vm_pu       = pd.DataFrame(vm_pu, index=index, columns=net.bus.index)
+    slack_p     = pd.DataFrame(slack, index=index, columns=net.ext_grid.index)
+    return th_overload, vm_pu, slack_p
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 27 09:34:18 2026
+
+@author: Seta
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+
+# (trace, color, label) of the prosumer power flows
+FLOWS = (
+         ('p_load',         'orange',   'load'),
+         ('p_pv',           'r',        'pv'),
+         ('p_battery_flow', 'g',        'batt'),
+         ('p_grid_flow',    'b',        'grid'),
+         )
+
+class Pyramid(object):
+    """
+    Min/max downsampling pyramid of the traces of a DataFrame. Level 0
+    holds the raw samples and every level above merges pairs of buckets of
+    the level below, keeping the position of the minimum and maximum of
+    every bucket. It is built once in O(n) and any time window is then
+    drawn from the finest level that fits in max_points points, with the
+    extrema of the raw series preserved
+
+    Parameters
+    ----------
+    data : pandas DataFrame
+        (time x trace) results, e.g. Prosumer.get_prosumer_data()
+
+    columns : list, default None
+        numeric columns to keep. Every numeric column if None
+
+    Returns
+    ----------
+
+    """
+
+    def __init__(self, data, columns=None):
+
+        if columns is None:
+            columns = data.select_dtypes(include='number').columns
+        self.columns    = list(columns)
+        self.index      = data.index
+        values          = data[self.columns].to_numpy(dtype=float)
+        pos             = np.broadcast_to(np.arange(len(values))[:, None], values.shape)
+        # every level: (argmin, argmax) positions in the raw series
+        self.levels     = [(pos, pos)]
+        self.values     = values
+        lo, hi          = pos, pos
+        while len(lo) > 1:
+            m       = len(lo) // 2 * 2
+            a, b    = lo[:m:2], lo[1:m:2]
+            lo2     = np.where(values[b, np.arange(values.shape[1])] <
+                               values[a, np.arange(values.shape[1])], b, a)
+            a, b    = hi[:m:2], hi[1:m:2]
+            hi2     = np.where(values[b, np.arange(values.shape[1])] >
+                               values[a, np.arange(values.shape[1])], b, a)
+            if m < len(lo):
+                lo2, hi2 = np.vstack([lo2, lo[m:]]), np.vstack([hi2, hi[m:]])
+            lo, hi  = lo2, hi2
+            self.levels.append((lo, hi))
+
+    def level(self, start, stop, max_points):
+        """
+        Returns the finest level with at most max_points/2 buckets in
+        [start, stop), or the raw level 0 if it has at most max_points rows
+        """
+        k = 0
+        if stop - start <= max_points:
+            return k
+        while k + 1 < len(self.levels) and 2 * (stop - start) / 2**k > max_points:
+            k += 1
+        return k
+
+    def window(self, start=0, stop=None, max_points=2000):
+        """
+        Returns the rows [start, stop) decimated to the minimum and maximum
+        of at most max_points/2 buckets per trace, in time order. Traces
+        share the union of their sampled positions
+        """
+        stop    = len(self.values) if stop is None else min(stop, len(self.values))
+        k       = self.level(start, stop, max_points)
+        if k == 0:
+            return pd.DataFrame(self.values[start:stop], index=self.index[start:stop],
+                                columns=self.columns)
+        lo, hi  = self.levels[k]
+        w       = 2**k
+        # buckets of level k that lie entirely in [start, stop)
+        s, e    = -(-start // w), stop // w
+        parts   = []
+        edges   = [(start, stop)]
+        if s < e:
+            parts   = [lo[s:e].ravel(), hi[s:e].ravel()]
+            edges   = [(start, s*w), (e*w, stop)]
+        # partial buckets at the edges are reduced from the raw samples
+        for a, b in edges:
+            if b > a:
+                v       = self.values[a:b]
+                parts   += [a + np.argmin(v, axis=0), a + np.argmax(v, axis=0)]
+        pos     = np.unique(np.concatenate(parts))
+        return pd.DataFrame(self.values[pos], index=self.index[pos], columns=self.columns)
+
+def plot_prosumer(data, ax1=None, title=None):
+    """
+    Plots the power flows and battery SOC of a (possibly decimated)
+    Prosumer result DataFrame. Returns the figure
+    """
+    import matplotlib.pyplot as plt
+    if ax1 is None:
+        fig, ax1 = plt.subplots(figsize=(12,12))
+    fig = ax1.figure
+    lns = []
+    for key, color, label in FLOWS:
+        lns += ax1.plot(data[key], color, label=label)
+    ax2 = ax1.twinx()
+    lns += ax2.plot(data['battery_SOC'], 'black', label='SOC')
+    ax1.legend(lns, [l.get_label() for l in lns])
+
+    ax1.grid()
+    ax1.set_xlabel('Time', fontsize=14)
+    ax1.set_ylabel('Power flow (kW)', fontsize=14)
+    ax2.set_ylabel('Battery SOC', color='black', fontsize=14)
+    ax2.set_ylim(0,120)
+    if title:
+        ax1.set_title(title, fontsize=16)
+    fig.tight_layout()
+    return fig
+
+def _init_worker():
+    # worker processes draw off screen
+    import matplotlib
+    matplotlib.use('Agg')
+
+def _render(data, path, title):
+    import matplotlib.pyplot as plt
+    fig = plot_prosumer(data, title=title)
+    fig.savefig(path)
+    plt.close(fig)
+    return path
+
+def render_figures(pyramid, windows, path, n_workers=None, max_points=2000, prefix='prosumer'):
+    """
+    Renders one figure per window of the prosumer traces of pyramid to
+    png files in path. The decimated traces are selected here and only
+    they are sent to the worker processes that draw the figures
+
+    Parameters
+    ----------
+    pyramid : Pyramid
+        pyramid of Prosumer results
+
+    windows : list
+        (start, stop) row ranges, or (start, stop, title)
+
+    path : str
+        output directory
+
+    n_workers : int, default None
+        number of worker processes. os.cpu_count() if None. With 1 the
+        figures are drawn in this process with its matplotlib backend
+
+    max_points : int, default 2000
+        approximate number of points per trace and figure
+
+    Returns
+    -------
+    list of paths of the written figures
+    """
+    os.makedirs(path, exist_ok=True)
+    jobs = []
+    for w in windows:
+        start, stop = w[0], w[1]
+        title       = w[2] if len(w) > 2 else None
+        jobs.append((pyramid.window(start, stop, max_points),
+                     os.path.join(path, '%s_%s_%s.png' % (prefix, start, stop)),
+                     title))
+    n_workers = min(n_workers or os.cpu_count() or 1, len(jobs))
+    if n_workers <= 1:
+        return [_render(*job) for job in jobs]
+    with ProcessPoolExecutor(n_workers, initializer=_init_worker) as ex:
+        return list(ex.map(_render, *zip(*jobs)))
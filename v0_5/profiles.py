@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 09:47:30 2026
+
+@author: Seta
+"""
+
+import numpy as np
+import pandas as pd
+
+class ProfileGenerator(object):
+    """
+    Generates distinct household load profiles from a single base profile.
+    Every household profile is built from day blocks of the base profile
+    drawn with replacement, shifted in time, scaled and perturbed with
+    noise. All random draws come from numpy Generators spawned from one
+    seed, one stream per kind of draw, so runs with the same seed are
+    reproducible and a longer horizon extends a shorter one unchanged
+
+    Parameters
+    ----------
+    base : pandas Series or array
+        base load profile in kW at every timestep
+
+    steps_per_day : int, default None
+        number of timesteps per day. Inferred from the base index if None
+
+    seed : int, default None
+        seed of the numpy Generator
+
+    scale : tuple, default (0.7, 1.0)
+        interval of the uniform scaling factor of each household
+
+    max_shift : int, default 60
+        maximum time shift of each household in timesteps, either way. It
+        may exceed a day, e.g. with hourly base profiles
+
+    noise : float, default 0.03
+        standard deviation of the multiplicative noise at every timestep
+
+    bootstrap : bool, default True
+        if True, every day of a household profile is a day of the base
+        profile drawn at random. Otherwise the base days are kept in order
+
+    Returns
+    ----------
+
+    """
+
+    def __init__(self,
+                 base,
+                 steps_per_day  = None,
+                 seed           = None,
+                 scale          = (0.7, 1.0),
+                 max_shift      = 60,
+                 noise          = 0.03,
+                 bootstrap      = True,
+                 ):
+
+        self.base       = np.asarray(base, dtype=float)
+        if steps_per_day is None:
+            if isinstance(base, pd.Series) and isinstance(base.index, pd.DatetimeIndex):
+                step            = pd.Timedelta(np.median(np.diff(base.index.asi8)))
+                steps_per_day   = int(round(pd.Timedelta(days=1) / step))
+            else:
+                steps_per_day   = len(self.base)
+        self.steps_per_day  = steps_per_day
+        # independent streams for day blocks, shifts, scaling and noise
+        self.rng            = [np.random.default_rng(s)
+                               for s in np.random.SeedSequence(seed).spawn(4)]
+        self.scale          = scale
+        self.max_shift      = max_shift
+        self.noise          = noise
+        self.bootstrap      = bootstrap
+
+    def generate(self, n, n_steps=None):
+        """
+        Returns a (time x household) numpy array of n household load
+        profiles in kW of n_steps timesteps (length of the base if None)
+        """
+        n_steps     = n_steps or len(self.base)
+        d           = self.steps_per_day
+        days        = self.base[:len(self.base) // d * d].reshape(-1, d)
+        days_rng, shift_rng, scale_rng, noise_rng = self.rng
+        # padded by max_shift on both sides, which can exceed a day
+        n_days      = -(-(n_steps + 2 * self.max_shift) // d)
+        if self.bootstrap:
+            choice  = days_rng.integers(len(days), size=(n_days, n)).T
+        else:
+            choice  = np.broadcast_to(np.arange(n_days) % len(days), (n, n_days))
+        profiles    = days[choice].reshape(n, n_days * d)
+
+        shift       = shift_rng.integers(-self.max_shift, self.max_shift + 1, size=n)
+        t           = np.arange(n_steps)[None, :] + self.max_shift - shift[:, None]
+        profiles    = np.take_along_axis(profiles, t, axis=1)
+
+        factor      = scale_rng.uniform(*self.scale, size=n)
+        profiles    = profiles * factor[:, None]
+        if self.noise:
+            profiles *= 1 + self.noise * noise_rng.standard_normal((n_steps, n)).T
+        return np.clip(profiles, 0, None).T
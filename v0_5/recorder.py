@@ -5,20 +5,200 @@ Created on Tue Apr  7 18:28:30 2020
 @author: Seta
 """
 
+from array import array
+import numpy as np
 import pandas as pd
 
+class CodeTable(object):
+    """
+    Maps recorded values (status flags, log strings) to small integer
+    codes. A single table is shared by all recorders by default, as long
+    as this module is always imported as v0_5.recorder. Values are keyed
+    with their type, so 0, 0.0 and False get distinct codes
+    """
+    def __init__(self):
+        self.values = []
+        self.codes  = {}    # (type, value): code
+
+    def encode(self, val):
+        key  = (type(val), val)
+        code = self.codes.get(key)
+        if code is None:
+            code = len(self.values)
+            self.values.append(val)
+            self.codes[key] = code
+        return code
+
+    def decode(self, code):
+        return self.values[code]
+
+CODES = CodeTable()
+
+class TimeAxis(object):
+    """
+    Time axis of a simulation run shared by every recorder of the run.
+    Timestamps are stored once as int64 nanoseconds since epoch and
+    recorders attached to the axis are indexed by its first timestamps
+
+    n_steps : int, default 0
+        number of timestamps preallocated. The axis grows if exceeded
+    """
+    def __init__(self, n_steps=0):
+        self._ns    = np.empty(max(n_steps, 1), dtype=np.int64)
+        self.n      = 0
+
+    @classmethod
+    def from_index(cls, index):
+        """
+        Returns a TimeAxis holding every timestamp of a pandas DatetimeIndex
+        """
+        index       = pd.DatetimeIndex(index)
+        axis        = cls(len(index))
+        axis._ns[:len(index)] = index.asi8
+        axis.n      = len(index)
+        return axis
+
+    def append(self, timestamp):
+        if self.n == len(self._ns):
+            self._ns = np.concatenate([self._ns, np.empty(len(self._ns), dtype=np.int64)])
+        self._ns[self.n] = pd.Timestamp(timestamp).value
+        self.n += 1
+
+    def extend(self, index):
+        """
+        Appends every timestamp of a pandas DatetimeIndex
+        """
+        ns = pd.DatetimeIndex(index).asi8
+        if self.n + len(ns) > len(self._ns):
+            grown       = np.empty(max(2*len(self._ns), self.n + len(ns)), dtype=np.int64)
+            grown[:self.n] = self._ns[:self.n]
+            self._ns    = grown
+        self._ns[self.n:self.n + len(ns)] = ns
+        self.n += len(ns)
+
+    def __len__(self):
+        return self.n
+
+    @property
+    def values(self):
+        """
+        Returns the timestamps as a datetime64[ns] view
+        """
+        return self._ns[:self.n].view('datetime64[ns]')
+
+    def index(self, n=None):
+        """
+        Returns the first n timestamps (all if None) as a DatetimeIndex
+        """
+        n = self.n if n is None else n
+        if n > self.n:
+            raise IndexError('Time axis holds %s timestamps, %s requested' % (self.n, n))
+        return pd.DatetimeIndex(self._ns[:n].view('datetime64[ns]'), name='timestamp')
+
 class Recorder(object):
-    def __init__(self, *args):
+    """
+    Stores the data of a simulated object at every timestep in its meta
+    dictionary of lists
+
+    *args : str
+        names of the recorded variables
+
+    categorical : tuple, default ()
+        names of variables stored as small integer codes of a shared
+        CodeTable instead of python objects. They are expanded to
+        pd.Categorical on get_data
+
+    run_length : bool, default Recorder.run_length
+        if True, categorical variables are only stored when their value
+        changes
+
+    code_table : CodeTable, default CODES
+        table categorical values are encoded with
+    """
+
+    run_length = False
+    time_axis  = None   # TimeAxis indexing the recorded data
+
+    def __init__(self, *args, categorical=(), run_length=None, code_table=None):
         self.meta = {}
         for key in args:
             self.meta[key] = []
+        self.categorical    = set(categorical)
+        self.code_table     = code_table or CODES
+        if run_length is not None:
+            self.run_length = run_length
+        self._starts        = {}    # step at which every run starts
+        self._count         = {}    # number of recorded steps
+        for key in self.categorical:
+            self.meta[key]      = array('H')
+            self._starts[key]   = array('L')
+            self._count[key]    = 0
 
     def record(self, **kwargs):
+        meta = self.meta
+        if not self.categorical:
+            for key, val in kwargs.items():
+                meta[key].append(val)
+            return
+        categorical = self.categorical
+        codes       = self.code_table.codes
         for key, val in kwargs.items():
-            self.meta[key].append(val)
+            if key in categorical:
+                code = codes.get((type(val), val))
+                if code is None:
+                    code = self.code_table.encode(val)
+                if not self.run_length:
+                    meta[key].append(code)
+                elif not meta[key] or meta[key][-1] != code:
+                    meta[key].append(code)
+                    self._starts[key].append(self._count[key])
+                self._count[key] += 1
+            else:
+                meta[key].append(val)
+
+    def get_codes(self, key):
+        """
+        Returns a numpy array with the code of a categorical variable at
+        every recorded step
+        """
+        codes = np.array(self.meta[key], dtype=np.uint16)
+        if not self.run_length:
+            return codes
+        starts = np.append(np.array(self._starts[key], dtype=np.int64), self._count[key])
+        return np.repeat(codes, np.diff(starts))
+
+    def get_categorical(self, key):
+        """
+        Returns a categorical variable as pd.Categorical, or as an object
+        array if it holds values of different types that compare equal
+        (e.g. 0 and False), which pandas cannot tell apart as categories
+        """
+        codes       = self.get_codes(key)
+        used        = np.unique(codes)
+        categories  = [self.code_table.decode(c) for c in used]
+        if len(set(categories)) < len(categories):
+            values = np.empty(len(categories), dtype=object)
+            values[:] = categories
+            return values[np.searchsorted(used, codes)]
+        return pd.Categorical.from_codes(np.searchsorted(used, codes), categories)
+
+    def set_time_axis(self, time_axis):
+        self.time_axis = time_axis
+
+    def with_time_axis(self, df):
+        """
+        Indexes df with the first len(df) timestamps of the time axis of
+        the recorder, if any
+        """
+        if self.time_axis is not None:
+            df.index = self.time_axis.index(len(df))
+        return df
 
     def get_data(self):
-         return pd.DataFrame(self.meta)
+        data = dict(self.meta)
+        for key in self.categorical:
+            data[key] = self.get_categorical(key)
+        return self.with_time_axis(pd.DataFrame(data))
 
     def last_occurrence(self, with_name=False):
         """
@@ -32,7 +212,10 @@ class Recorder(object):
         """
         d = {}
         for key, val in self.meta.items():
-            d[key] = val[-1]
+            if key in self.categorical:
+                d[key] = self.code_table.decode(val[-1])
+            else:
+                d[key] = val[-1]
         return d
 
 class Counter(object):
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 17:40:03 2026
+
+@author: Seta
+"""
+
+import numpy as np
+import pandas as pd
+
+class NeighborhoodResults(object):
+    """
+    Results of every Prosumer of a neighborhood as one dense
+    (time x prosumer x variable) cube with labelled axes
+
+    Parameters
+    ----------
+    data : numpy array
+        cube of shape (time, prosumer, variable)
+
+    time : pandas Index
+        labels of the time axis
+
+    prosumers : list
+        labels of the prosumer axis
+
+    variables : list
+        labels of the variable axis
+
+    Returns
+    ----------
+
+    """
+
+    # variables collected from the Prosumer, PVgen and battery recorders
+    prosumer_vars   = ('p_load', 'p_pv', 'p_battery_flow', 'battery_SOC',
+                       'p_grid_flow', 'grid_status', 'battery_status')
+    pv_vars         = ('p_prod', 'irr_sol', 'p_curtail')
+    battery_vars    = ('p_reject',)
+
+    def __init__(self, data, time, prosumers, variables):
+
+        self.data       = data
+        self.time       = pd.Index(time)
+        self.prosumers  = list(prosumers)
+        self.variables  = list(variables)
+        self._p         = {name: j for j, name in enumerate(self.prosumers)}
+        self._v         = {name: k for k, name in enumerate(self.variables)}
+
+    @classmethod
+    def from_neighborhood(cls, neighborhood):
+        """
+        Builds the cube straight from the recorders of every Prosumer of
+        a neighborhood dictionary, without building intermediate DataFrames
+        """
+        prosumers   = list(neighborhood.keys())
+        variables   = list(cls.prosumer_vars + cls.pv_vars + cls.battery_vars)
+        first       = neighborhood[prosumers[0]]
+        n           = len(first.recorder.meta['p_load'])
+        data        = np.empty((n, len(prosumers), len(variables)))
+        for j, name in enumerate(prosumers):
+            p       = neighborhood[name]
+            columns = [cls._column(p.recorder, key) for key in cls.prosumer_vars]
+            columns += [cls._pv_column(p.pvgen, key) for key in cls.pv_vars]
+            columns += [cls._column(p.battery.recorder, key) for key in cls.battery_vars]
+            for k, col in enumerate(columns):
+                data[:, j, k] = np.asarray(col, dtype=float)[:n]
+
+        if first.recorder.time_axis is not None:
+            time = first.recorder.time_axis.index(n)
+        elif len(first.recorder.meta.get('timestamp', [])) == n:
+            time = pd.DatetimeIndex(first.recorder.meta['timestamp'], name='timestamp')
+        else:
+            time = pd.RangeIndex(n, name='timestamp')
+        return cls(data, time, prosumers, variables)
+
+    @staticmethod
+    def _column(recorder, key):
+        """
+        Returns a recorded variable as numbers. Categorical status codes
+        are decoded to their numeric value
+        """
+        if key in recorder.categorical:
+            values = [v if isinstance(v, (int, float)) else np.nan
+                      for v in recorder.code_table.values]
+            return np.array(values, dtype=float)[recorder.get_codes(key)]
+        return recorder.meta[key]
+
+    @classmethod
+    def _pv_column(cls, pvgen, key):
+        if key == 'p_prod':
+            return pvgen.get_p_prod()
+        if key == 'irr_sol' and pvgen.shared is not None:
+            return pvgen.shared.irr_sol
+        return cls._column(pvgen.recorder, key)
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def household(self, name):
+        """
+        Returns a (time x variable) DataFrame of a single Prosumer
+        """
+        return pd.DataFrame(self.data[:, self._p[name], :],
+                            index=self.time, columns=self.variables)
+
+    def variable(self, name):
+        """
+        Returns a (time x prosumer) DataFrame of a single variable
+        """
+        return pd.DataFrame(self.data[:, :, self._v[name]],
+                            index=self.time, columns=self.prosumers)
+
+    def window(self, start=None, end=None):
+        """
+        Returns the results between timestamps start and end (both
+        included) as a NeighborhoodResults sharing the data of this one
+        """
+        s = self.time.slice_indexer(start, end)
+        return NeighborhoodResults(self.data[s], self.time[s],
+                                   self.prosumers, self.variables)
+
+    def sel(self, prosumers=None, variables=None, start=None, end=None):
+        """
+        Returns a subset of the results by prosumer labels, variable labels
+        and time window
+        """
+        res = self.window(start, end)
+        j   = [self._p[p] for p in prosumers] if prosumers is not None \
+              else slice(None)
+        k   = [self._v[v] for v in variables] if variables is not None \
+              else slice(None)
+        return NeighborhoodResults(res.data[:, j][:, :, k], res.time,
+                                   prosumers if prosumers is not None else self.prosumers,
+                                   variables if variables is not None else self.variables)
+
+    def to_frame(self):
+        """
+        Returns the cube as a wide DataFrame with one 'prosumer/variable'
+        column per prosumer and variable
+        """
+        t, n, v = self.data.shape
+        columns = ['%s/%s' % (p, var) for p in self.prosumers for var in self.variables]
+        return pd.DataFrame(self.data.reshape(t, n * v), index=self.time, columns=columns)
+
+    def to_file(self, path):
+        """
+        Exports the cube to a single columnar file. Parquet for .parquet
+        paths, HDF5 for .h5/.hdf5 paths
+        """
+        df = self.to_frame()
+        if path.endswith('.parquet'):
+            df.to_parquet(path)
+        elif path.endswith(('.h5', '.hdf5')):
+            df.to_hdf(path, key='neighborhood', format='table')
+        else:
+            raise AttributeError('Unsupported file format %s. Use .parquet or .h5' % path)
+
+    @classmethod
+    def from_file(cls, path, prosumers=None, variables=None):
+        """
+        Reads a cube exported by to_file, optionally only the columns of
+        the given prosumers and variables
+        """
+        if path.endswith('.parquet'):
+            columns = None
+            if prosumers is not None and variables is not None:
+                columns = ['%s/%s' % (p, v) for p in prosumers for v in variables]
+            df = pd.read_parquet(path, columns=columns)
+        else:
+            df = pd.read_hdf(path, key='neighborhood')
+        pairs       = [c.rsplit('/', 1) for c in df.columns]
+        found_p     = list(dict.fromkeys(p for p, _ in pairs))
+        found_v     = list(dict.fromkeys(v for _, v in pairs))
+        prosumers   = [p for p in (prosumers or found_p) if p in found_p]
+        variables   = [v for v in (variables or found_v) if v in found_v]
+        columns     = ['%s/%s' % (p, v) for p in prosumers for v in variables]
+        data        = df[columns].values.reshape(len(df), len(prosumers), len(variables))
+        return cls(data, df.index, prosumers, variables)
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Thu Oct 22 14:36:09 2026
+
+@author: Seta
+"""
+
+import os
+import re
+import glob
+import json
+import pickle
+import hashlib
+
+_file_digests = {}
+
+def file_digest(path):
+    """
+    Returns the sha256 hex digest of the content of a file. Digests are
+    kept in memory per path, size and modification time
+    """
+    st  = os.stat(path)
+    k   = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if k not in _file_digests:
+        h = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+        _file_digests[k] = h.hexdigest()
+    return _file_digests[k]
+
+def code_version(*paths):
+    """
+    Returns a digest of the source code of the given python files and of
+    every python file in the given directories
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*.py'))))
+        else:
+            files.append(path)
+    h = hashlib.sha256()
+    for f in files:
+        h.update(os.path.basename(f).encode())
+        h.update(file_digest(f).encode())
+    return h.hexdigest()
+
+def scenario_key(params, files=(), code=None):
+    """
+    Returns the key of a scenario: a digest of its parameters, of the
+    content of its input files and of the code version it was run with
+
+    Parameters
+    ----------
+    params : dict
+        every parameter of the scenario (pv and battery parameters, modes,
+        CPU thresholds, seeds...). Values must be json serializable or
+        have a stable repr
+
+    files : list, default ()
+        paths of the input data files of the scenario
+
+    code : str, default None
+        code version, as returned by code_version
+    """
+    doc = {
+           'params' : params,
+           'files'  : [file_digest(f) for f in files],
+           'code'   : code,
+           }
+    blob = json.dumps(doc, sort_keys=True, default=repr)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+class ScenarioCache(object):
+    """
+    On-disk cache of completed scenario runs. Every run is pickled under
+    its scenario key and the number of simulated timesteps, so a run can be
+    served as is or resumed from the longest cached prefix of its horizon
+
+    Parameters
+    ----------
+    directory : str, default '.scenario_cache'
+        directory of the cache. Created if it does not exist
+
+    Returns
+    ----------
+
+    """
+
+    def __init__(self, directory='.scenario_cache'):
+
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key, n_steps):
+        return os.path.join(self.directory, key, '%d.pkl' % n_steps)
+
+    def horizons(self, key):
+        """
+        Returns the sorted numbers of timesteps cached for key
+        """
+        folder = os.path.join(self.directory, key)
+        if not os.path.isdir(folder):
+            return []
+        return sorted(int(m.group(1)) for m in
+                      (re.match(r'(\d+)\.pkl$', f) for f in os.listdir(folder)) if m)
+
+    def longest_prefix(self, key, n_steps):
+        """
+        Returns the longest cached horizon of key not exceeding n_steps,
+        or None if there is none
+        """
+        cached = [n for n in self.horizons(key) if n <= n_steps]
+        return cached[-1] if cached else None
+
+    def get(self, key, n_steps):
+        """
+        Returns the run cached for key and n_steps, or None
+        """
+        path = self._path(key, n_steps)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'rb') as f:
+            return pickle.load(f)
+
+    def put(self, key, n_steps, run):
+        """
+        Stores a completed run of n_steps timesteps under key
+        """
+        path = self._path(key, n_steps)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp  = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            pickle.dump(run, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    def clear(self, key=None):
+        """
+        Removes every run cached for key, or the whole cache if None
+        """
+        keys = [key] if key is not None else os.listdir(self.directory)
+        for k in keys:
+            folder = os.path.join(self.directory, k)
+            for n in self.horizons(k):
+                os.remove(self._path(k, n))
+            if os.path.isdir(folder) and not os.listdir(folder):
+                os.rmdir(folder)
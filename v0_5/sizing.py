@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:02:17 2026
+
+@author: Seta
+"""
+
+import numpy as np
+import pandas as pd
+from PVgen import PVgen
+
+class SizingOptimizer(object):
+    """
+    Evaluates a grid of K installed pv powers x L battery capacities of a
+    single Prosumer in one pass over the load and irradiation data. The
+    Prosumer control and the BatterySimple BMS are broadcast across a
+    (K x L) parameter axis instead of simulating one Prosumer per pair
+
+    Parameters
+    ----------
+    irrad_data : pandas Series or array
+        irradiation data in Wh/m2 at every timestep
+
+    load_data : pandas Series or array
+        power requirements of the Prosumer in kW at every timestep
+
+    timestep : float
+        number of seconds between every time step of the simulation
+
+    battery_mode : str, default 'self-consumption'
+        BatterySimple mode. Also: 'buffer-grid'
+
+    pv_strategy : str, default 'self-consumption'
+        Prosumer pv strategy. Also: 'curtailment'
+
+    prosumer_profile : str, default 'self-consumption'
+        Prosumer profile. Also: 'energy-saving'
+
+    initial_SOC : float, default 100
+        initial state of charge of the battery in %
+
+    min_max_SOC : tuple, default (0, 100)
+        buffer interval for buffer-grid battery mode in %
+
+    Returns
+    ----------
+
+    """
+
+    def __init__(self,
+                 irrad_data,
+                 load_data,
+                 timestep,
+                 battery_mode       = 'self-consumption',
+                 pv_strategy        = 'self-consumption',
+                 prosumer_profile   = 'self-consumption',
+                 initial_SOC        = 100,
+                 min_max_SOC        = (0, 100),
+                 ):
+
+        self.irr                = np.asarray(irrad_data, dtype=float)
+        self.load               = np.asarray(load_data, dtype=float)
+        self.timestep           = timestep
+        self.battery_mode       = battery_mode
+        self.pv_strategy        = pv_strategy
+        self.prosumer_profile   = prosumer_profile
+        self.initial_SOC        = initial_SOC
+        self.min_max_SOC        = min_max_SOC
+        if self.prosumer_profile == 'energy-saving':
+            self.load = 0.7 * self.load
+        n = min(len(self.irr), len(self.load))
+        self.irr, self.load = self.irr[:n], self.load[:n]
+
+    def quantize_pv(self, pv_sizes):
+        """
+        Returns the installed pv powers in kW and number of panels that PVgen
+        adjusts each of pv_sizes to
+        """
+        kw, panels = [], []
+        for size in pv_sizes:
+            pvgen = PVgen(installed_pv=size)
+            # sized at construction. Sizing again fails when the float
+            # number of panels does not give installed_pv back exactly
+            n     = pvgen.num_panels or 0
+            kw.append(n * pvgen.panel_peak_p)
+            panels.append(n)
+        return np.array(kw), np.array(panels)
+
+    def evaluate(self, pv_sizes, battery_capacities):
+        """
+        Simulates every (pv size, battery capacity) pair at once
+
+        Parameters
+        ----------
+        pv_sizes : list of float
+            installed pv powers in kW. Sizes that PVgen quantizes to the
+            same number of panels are only evaluated once
+
+        battery_capacities : list of float
+            battery capacities in kWh
+
+        Returns
+        -------
+        pandas DataFrame
+            indexed by (installed_pv, battery_capacity) with energy totals
+            in kWh and self_consumption and autarky rates in per unit
+        """
+        kw, panels      = self.quantize_pv(pv_sizes)
+        kw, idx         = np.unique(kw, return_index=True)
+        panels          = panels[idx]
+        c               = np.asarray(battery_capacities, dtype=float)[None, :]
+        if (c < 0).any():
+            raise AttributeError('Battery capacity cannot be a negative number')
+        panel           = PVgen(num_panels=1)
+        h               = self.timestep / 3600
+        lb, ub          = self.min_max_SOC
+        buffer          = self.battery_mode == 'buffer-grid'
+        curtail         = self.pv_strategy == 'curtailment'
+
+        # pv production of each installation (T x K)
+        p_pv            = np.outer(panel.production_series(self.irr, self.timestep), panels)
+        p_flow          = self.load[:, None] - p_pv
+
+        shape           = (len(kw), c.shape[1])
+        soc             = np.full(shape, float(self.initial_SOC))
+        e_import        = np.zeros(shape)
+        e_export        = np.zeros(shape)
+        e_curtail       = np.zeros(shape)
+        e_throughput    = np.zeros(shape)
+        safe_c          = np.where(c > 0, c, 1.)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for pf in p_flow:
+                p           = np.broadcast_to(pf[:, None], shape)
+                q0          = c * soc / 100
+                # BatterySimple.bms: share of power accepted by the battery
+                acc         = np.ones(shape)
+                if buffer:
+                    acc     = np.where((p < 0) & (soc >= ub), (100 - soc) / (100 - ub), acc)
+                    acc     = np.where((p > 0) & (soc <= lb), soc / lb, acc)
+                acc         = np.where(((p < 0) & (soc == 100)) | ((p > 0) & (soc == 0)), 0., acc)
+                p_acc       = p * acc
+                p_rej       = -p * (1 - acc)
+                Q           = q0 - p_acc * h
+                # BatterySimple.process: saturation at depletion / full charge
+                empty       = (p_acc > 0) & (Q < 0)
+                full        = (p_acc < 0) & (Q > c)
+                p_reject    = np.where(empty, Q / h, np.where(full, (Q - c) / h, p_rej))
+                p_batt      = np.where(empty, q0 / h, np.where(full, -(c - q0) / h, p_acc))
+                soc         = np.where(empty, 0., np.where(full, 100.,
+                              np.where(p_acc != 0, Q / safe_c * 100, soc)))
+                # Prosumer.control: grid flow and curtailment
+                feed_in     = np.maximum(p_reject, 0)
+                if curtail:
+                    e_curtail   += feed_in * h
+                else:
+                    e_export    += feed_in * h
+                e_import        += np.maximum(-p_reject, 0) * h
+                e_throughput    += np.abs(p_batt) * h
+
+        e_load          = self.load.sum() * h
+        e_pv            = np.broadcast_to((p_pv.sum(axis=0) * h)[:, None], shape)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self_cons   = np.where(e_pv > 0, (e_pv - e_export - e_curtail) / e_pv, 0.)
+        autarky         = (e_load - e_import) / e_load if e_load else np.zeros(shape)
+        index           = pd.MultiIndex.from_product([kw, c[0]],
+                                                     names=['installed_pv', 'battery_capacity'])
+        return pd.DataFrame({
+                             'num_panels'       : np.repeat(panels, c.shape[1]),
+                             'e_load'           : e_load,
+                             'e_pv'             : e_pv.ravel(),
+                             'e_import'         : e_import.ravel(),
+                             'e_export'         : e_export.ravel(),
+                             'e_curtail'        : e_curtail.ravel(),
+                             'e_grid_exchange'  : (e_import + e_export).ravel(),
+                             'e_battery'        : e_throughput.ravel(),
+                             'self_consumption' : self_cons.ravel(),
+                             'autarky'          : autarky.ravel(),
+                             }, index=index)
+
+    def optimize(self,
+                 pv_range,
+                 battery_range,
+                 objective  = None,
+                 n          = (8, 8),
+                 levels     = 3,
+                 ):
+        """
+        Coarse-to-fine search of the best (pv size, battery capacity) pair.
+        An n grid is evaluated over the given ranges, the ranges are then
+        narrowed to one grid spacing around the best pair and the search is
+        repeated levels times
+
+        Parameters
+        ----------
+        pv_range : tuple
+            (min, max) installed pv power in kW
+
+        battery_range : tuple
+            (min, max) battery capacity in kWh
+
+        objective : str or callable, default None
+            column of the evaluate output to maximize, or function of that
+            DataFrame returning a score Series to maximize. If None, the
+            product of self_consumption and autarky is maximized
+
+        n : tuple, default (8, 8)
+            number of pv sizes and battery capacities per level
+
+        levels : int, default 3
+            number of refinement levels
+
+        Returns
+        -------
+        tuple
+            (best (installed_pv, battery_capacity) pair, DataFrame of every
+            evaluated pair)
+        """
+        if objective is None:
+            objective = lambda df: df.self_consumption * df.autarky
+        elif isinstance(objective, str):
+            column    = objective
+            objective = lambda df: df[column]
+
+        results = []
+        (pv_lo, pv_hi), (c_lo, c_hi) = pv_range, battery_range
+        for _ in range(levels):
+            pv_sizes    = np.linspace(pv_lo, pv_hi, n[0])
+            capacities  = np.linspace(c_lo, c_hi, n[1])
+            res         = self.evaluate(pv_sizes, capacities)
+            results.append(res)
+            best_pv, best_c = objective(res).idxmax()
+            d_pv        = (pv_hi - pv_lo) / max(n[0] - 1, 1)
+            d_c         = (c_hi - c_lo) / max(n[1] - 1, 1)
+            pv_lo, pv_hi = max(pv_range[0], best_pv - d_pv), min(pv_range[1], best_pv + d_pv)
+            c_lo, c_hi  = max(battery_range[0], best_c - d_c), min(battery_range[1], best_c + d_c)
+
+        results = pd.concat(results)
+        results = results[~results.index.duplicated(keep='last')].sort_index()
+        return objective(results).idxmax(), results
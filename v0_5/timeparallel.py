@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Sun Oct 25 10:02:44 2026
+
+@author: Seta
+"""
+
+import os
+import copy
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from v0_5.pipeline import simulate_prosumers
+from Storage import BatterySimple
+
+def battery_state(battery):
+    """
+    Returns the state a BatterySimple hands over to the next time window:
+    its state of charge in % and its operating state. This is its whole
+    state, the equivalent circuit of Battery is not handed over
+    """
+    return (battery.get_battery_soc(), battery.state)
+
+def set_battery_state(battery, state):
+    """
+    Restarts a BatterySimple that has not processed any timestep yet from
+    a state returned by battery_state
+    """
+    battery.initial_SOC, battery.state = state
+    battery.last = None
+
+def coarse_soc(neighborhood, irr, load, timestep, bounds):
+    """
+    Predicts the state of charge of every battery at the start of every
+    window with one clipped energy balance per window. Returns a (window x
+    prosumer) array in %
+    """
+    h   = timestep / 3600
+    soc = np.empty((len(bounds), len(neighborhood)))
+    for j, p in enumerate(neighborhood.values()):
+        p_flow  = load[:, j] - p.pvgen.production_series(irr, timestep)
+        c       = p.battery.battery_capacity
+        x       = p.battery.get_battery_soc()
+        for w, (s, e) in enumerate(bounds):
+            soc[w, j]   = x
+            if c > 0:
+                x       = min(max(x - p_flow[s:e].sum() * h / c * 100, 0.), 100.)
+    return soc
+
+# inputs of a worker process
+_worker = {}
+
+def _init_worker(neighborhood, irr, load, timestep, timestamps, bounds):
+    _worker.update(neighborhood=neighborhood, irr=irr, load=load, timestep=timestep,
+                   timestamps=timestamps, bounds=bounds)
+
+def _run_window(w, starts):
+    """
+    Simulates every Prosumer over window w from the battery states starts.
+    Returns the grid flow and state of charge over the window and the
+    battery states at its end
+    """
+    d       = _worker
+    s, e    = d['bounds'][w]
+    nh      = copy.deepcopy(d['neighborhood'])
+    p_grid  = np.empty((e - s, len(nh)))
+    soc     = np.empty((e - s, len(nh)))
+    ends    = []
+    for j, p in enumerate(nh.values()):
+        set_battery_state(p.battery, starts[j])
+        if p.pvgen.shared is not None:
+            p.pvgen._k = s
+        for i in range(s, e):
+            p.run_pflow(d['irr'][i], d['load'][i, j], d['timestep'], d['timestamps'][i])
+        p_grid[:, j]    = p.recorder.meta['p_grid_flow'][-(e - s):]
+        soc[:, j]       = p.recorder.meta['battery_SOC'][-(e - s):]
+        ends.append(battery_state(p.battery))
+    return p_grid, soc, ends
+
+class ParallelInTime(object):
+    """
+    Parallel-in-time simulation of an uncontrolled neighborhood. The
+    horizon is split into windows that are simulated concurrently, each
+    from a predicted battery state of charge at its start. Every window is
+    then simulated again from the true battery states at the end of the
+    previous window until no start state changes. Since batteries saturate
+    at full charge or depletion, a wrong start state is usually forgotten
+    within the window and only a few rounds are needed. The converged
+    result is that of the serial run
+
+    Only BatterySimple can be handed over between windows, since its
+    state of charge is its whole state. Battery carries the charge and RC
+    voltages of its equivalent circuit from step to step and is rejected
+
+    Parameters
+    ----------
+    neighborhood : dict
+        Prosumer instances with a BatterySimple that have not been
+        simulated yet. They are used as templates and not modified
+
+    window : int, default 1440
+        number of timesteps of every window
+
+    n_workers : int, default None
+        number of worker processes. os.cpu_count() if None. With 1 the
+        windows are simulated in this process
+
+    tol : float, default 1e-9
+        maximum difference of the state of charge in % between the start
+        of a window and the end of the previous one at convergence
+
+    max_rounds : int, default None
+        maximum number of rounds. Number of windows if None, which
+        guarantees convergence
+
+    Returns
+    ----------
+
+    """
+
+    def __init__(self, neighborhood, window=1440, n_workers=None, tol=1e-9, max_rounds=None):
+
+        for name, p in neighborhood.items():
+            if type(p.battery) is not BatterySimple:
+                raise AttributeError('Prosumer %s: only BatterySimple states can be handed '
+                                     'over between windows, not %s'
+                                     % (name, type(p.battery).__name__))
+            if len(p.recorder.meta['p_grid_flow']) or p.battery.last is not None:
+                raise AttributeError('Prosumer %s has already been simulated' % name)
+        self.neighborhood   = neighborhood
+        self.window         = window
+        self.n_workers      = n_workers
+        self.tol            = tol
+        self.max_rounds     = max_rounds
+        self.stats          = {}
+        self.end_states     = None  # battery states at the end of the horizon
+
+    def run(self, irrad_data, load_data, timestep, compare=False):
+        """
+        Simulates the neighborhood over the horizon of irrad_data and
+        load_data, as simulate_prosumers does for a serial run
+
+        compare : bool, default False
+            if True, the serial run is simulated as well on a copy of the
+            neighborhood and its wall time, the speedup and the largest
+            deviation of the grid flow are added to stats
+
+        Returns
+        -------
+        tuple
+            (p_grid_flow, battery_SOC) pandas DataFrames (time x prosumer)
+            in kW and %
+        """
+        now         = time.time()
+        irr         = np.asarray(irrad_data, dtype=float)
+        load        = np.asarray(load_data, dtype=float)
+        if load.ndim == 1:
+            load    = np.repeat(load[:, None], len(self.neighborhood), axis=1)
+        n           = min(len(irr), len(load))
+        irr, load   = irr[:n], load[:n]
+        timestamps  = irrad_data.index[:n] if hasattr(irrad_data, 'index') else range(n)
+        bounds      = [(s, min(s + self.window, n)) for s in range(0, n, self.window)]
+        starts      = coarse_soc(self.neighborhood, irr, load, timestep, bounds)
+        states      = [[(x, p.battery.state) for x, p in zip(row, self.neighborhood.values())]
+                       for row in starts]
+        # the first window starts from the true initial states
+        states[0]   = [battery_state(p.battery) for p in self.neighborhood.values()]
+        results     = [None] * len(bounds)
+        todo        = list(range(len(bounds)))
+        n_workers   = min(self.n_workers or os.cpu_count() or 1, len(bounds))
+        max_rounds  = self.max_rounds or len(bounds)
+        args        = (self.neighborhood, irr, load, timestep, timestamps, bounds)
+        pool        = None
+        if n_workers > 1:
+            pool    = ProcessPoolExecutor(n_workers, initializer=_init_worker, initargs=args)
+        else:
+            _init_worker(*args)
+        rounds, runs = 0, 0
+        try:
+            while todo and rounds < max_rounds:
+                if pool is None:
+                    res = [_run_window(w, states[w]) for w in todo]
+                else:
+                    res = list(pool.map(_run_window, todo, [states[w] for w in todo]))
+                for w, r in zip(todo, res):
+                    results[w] = r
+                rounds  += 1
+                runs    += len(todo)
+                # hand the end states over and rerun the windows whose start changed
+                todo    = []
+                for w in range(1, len(bounds)):
+                    end = results[w - 1][2]
+                    # convergence is judged on the state of charge, the
+                    # operating state is handed over with it
+                    if any(abs(a[0] - b[0]) > self.tol for a, b in zip(end, states[w])):
+                        states[w] = end
+                        todo.append(w)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+
+        columns     = list(self.neighborhood.keys())
+        index       = timestamps if hasattr(irrad_data, 'index') else pd.RangeIndex(n)
+        p_grid      = pd.DataFrame(np.concatenate([r[0] for r in results]), index=index, columns=columns)
+        soc         = pd.DataFrame(np.concatenate([r[1] for r in results]), index=index, columns=columns)
+        self.end_states = results[-1][2]
+        self.stats  = {
+                       'windows'    : len(bounds),
+                       'rounds'     : rounds,
+                       'window_runs': runs,
+                       'converged'  : not todo,
+                       'time'       : time.time() - now,
+                       }
+        if compare:
+            now     = time.time()
+            serial  = -1000 * simulate_prosumers(copy.deepcopy(self.neighborhood),
+                                                 irrad_data, load_data, timestep)
+            self.stats['serial_time']   = time.time() - now
+            self.stats['speedup']       = self.stats['serial_time'] / self.stats['time']
+            self.stats['max_deviation'] = float(np.max(np.abs(serial - p_grid.values)))
+        return p_grid, soc